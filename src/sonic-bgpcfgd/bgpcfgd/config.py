@@ -1,23 +1,407 @@
+import re
+import time
+from collections import OrderedDict
+
+from .log import log_debug, log_info
+
+
+class ConfigNode(object):
+    """ A configuration command and the commands nested under it """
+    __slots__ = ('line', 'parent', 'children')
+
+    def __init__(self, line, parent=None):
+        self.line = line
+        self.parent = parent
+        self.children = OrderedDict()
+
+    def top(self):
+        """ Return the top level command the node belongs to """
+        node = self
+        while node.parent is not None and node.parent.parent is not None:
+            node = node.parent
+        return node
+
+
+class RunningConfig(object):
+    """
+    Indexed model of the FRR running configuration.
+    The configuration is kept as a tree of commands. The prefix-lists, route-maps,
+    community-lists and the neighbors of the bgp instances are indexed by their names.
+    The model is loaded from the output of "show running-config" and updated with
+    the configuration bgpcfgd writes to FRR.
+    """
+    RE_PREFIX_LIST = re.compile(r'^(ip|ipv6) prefix-list (\S+) seq (\d+) (.+)$')
+    RE_ROUTE_MAP = re.compile(r'^route-map (\S+) (permit|deny) (\d+)$')
+    RE_COMMUNITY_LIST = re.compile(r'^bgp community-list (?:standard |expanded )?(\S+) ((?:permit|deny) .+)$')
+    RE_NEIGHBOR = re.compile(r'^neighbor (\S+)')
+    RE_PEER = re.compile(r'^neighbor (\S+) (?:interface )?(?:remote-as|peer-group) \S+')
+    # Commands with a single value. A new value of the command replaces the old one
+    RE_SINGLE_VALUE = [re.compile(regexp) for regexp in (
+        r'^(neighbor \S+ (?:route-map|prefix-list|filter-list|unsuppress-map) )\S+( in| out)$',
+        r'^(neighbor \S+ (?:remote-as|peer-group|description|update-source|ebgp-multihop|local-as|timers|allowas-in|password)\b)',
+        r'^(bgp router-id )',
+        r'^((?:match|set) (?:community|tag|metric|local-preference|origin|src|ip address prefix-list|ipv6 address prefix-list)\b)',
+        r'^(call )',
+        r'^(on-match )',
+    )]
+    # Top level commands which open a configuration node
+    NODE_COMMANDS = ('router ', 'route-map ', 'vrf ', 'interface ', 'line ', 'key chain ', 'segment-routing', 'bfd')
+    # Top level commands which don't open a configuration node
+    LEAF_COMMANDS = ('ip prefix-list ', 'ipv6 prefix-list ', 'bgp community-list ', 'bgp large-community-list ',
+                     'bgp extcommunity-list ', 'bgp as-path ', 'ip protocol ', 'ipv6 protocol ', 'ip route ',
+                     'ipv6 route ', 'ip nht ', 'ipv6 nht ', 'ip import-table ', 'ip forwarding', 'ipv6 forwarding',
+                     'hostname ', 'log ', 'password ', 'enable ', 'service ', 'debug ', 'agentx', 'frr ',
+                     'access-list ', 'ipv6 access-list ', 'zebra ')
+    ROUTE_MAP_COMMANDS = ('match', 'set', 'call', 'on-match', 'continue', 'description')
+    VRF_COMMANDS = ('ip route ', 'ipv6 route ', 'ip protocol ', 'ipv6 protocol ', 'ip nht ', 'ipv6 nht ', 'vni ')
+
+    def __init__(self):
+        self.root = ConfigNode(None)
+        self.prefix_lists = {}     # (family, name) -> {seq: rule}
+        self.route_maps = {}       # name -> {seq: route-map node}
+        self.community_lists = {}  # name -> {"permit|deny value": community-list node}
+        self.neighbors = {}        # neighbor or peer-group name -> list of its command nodes in "router bgp"
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Build the model from the running configuration
+        :param text: configuration in FRR format. Type: String or List of Strings
+        :return: the model
+        """
+        model = cls()
+        model.load(text)
+        return model
+
+    def load(self, text):
+        """
+        Load the running configuration. The nesting of the commands is read from their indentation
+        :param text: configuration in FRR format. Type: String or List of Strings
+        """
+        lines = text.split('\n') if isinstance(text, str) else text
+        stack = [(-1, self.root)]
+        for line in lines:
+            command = line.strip()
+            if command == '' or command.startswith('!') or command.startswith('exit') or command == 'end':
+                continue
+            indent = len(line) - len(line.lstrip())
+            while stack[-1][0] >= indent:
+                stack.pop()
+            parent = stack[-1][1]
+            node = parent.children.get(command)
+            if node is None:
+                node = self.__attach(parent, command)
+            stack.append((indent, node))
+
+    def lines(self):
+        """ Return the configuration in FRR format. Type: List of Strings """
+        out = []
+        stack = [(0, iter(self.root.children.values()))]
+        while stack:
+            depth, nodes = stack[-1]
+            node = next(nodes, None)
+            if node is None:
+                stack.pop()
+                continue
+            out.append(" " * depth + node.line)
+            if node.children:
+                stack.append((depth + 1, iter(node.children.values())))
+        return out
+
+    def apply(self, text):
+        """
+        Apply configuration written to FRR to the model. Like vtysh, the node a command belongs to
+        is found from the command itself, an unknown command of a node is tried in the parent node.
+        :param text: configuration written to FRR. Type: String
+        """
+        node = self.root
+        for line in text.split('\n'):
+            command = line.strip()
+            if command == '' or command.startswith('!'):
+                continue
+            if command == 'end' or command == 'exit-vrf':
+                node = self.root
+                continue
+            if command == 'exit' or command == 'exit-address-family':
+                node = node.parent if node.parent is not None else node
+                continue
+            while node is not self.root and not self.__accepts(node, command):
+                node = node.parent
+            if command.startswith('no '):
+                self.__remove(node, command[3:])
+            else:
+                child = self.__add(node, command)
+                if child is not None:
+                    node = child
+
+    def get_prefix_list(self, family, name):
+        """
+        Get entries of a prefix-list
+        :param family: "ip" or "ipv6"
+        :param name: prefix-list name
+        :return: dictionary: sequence number -> rule of the entry. None if the prefix-list doesn't exist
+        """
+        return self.prefix_lists.get((family, name))
+
+    def get_route_map(self, name, action=None):
+        """
+        Get entries of a route-map
+        :param name: route-map name
+        :param action: return only entries with the action: "permit" or "deny". All entries if None
+        :return: dictionary: sequence number -> list of the commands of the entry. Empty if the route-map doesn't exist
+        """
+        entries = self.route_maps.get(name, {})
+        return OrderedDict((seq, list(node.children)) for seq, node in entries.items()
+                           if action is None or node.line.split()[2] == action)
+
+    def get_community_list(self, name):
+        """
+        Get entries of a community-list
+        :param name: community-list name
+        :return: list of entries. Empty if the community-list doesn't exist
+        """
+        return list(self.community_lists.get(name, {}))
+
+    def get_peer_groups(self):
+        """ Return names of the peer-groups defined in "router bgp". Type: List of Strings """
+        return [name for name, nodes in self.neighbors.items()
+                if any(node.line == 'neighbor %s peer-group' % name for node in nodes)]
+
+    def get_peers(self):
+        """
+        Get the peers configured in the bgp instances: the neighbors with a remote-as or a peer-group.
+        The peer-groups themselves are not peers
+        :return: set of (vrf, peer address) pairs. The vrf of "router bgp" without a vrf is "default"
+        """
+        peers = set()
+        for name, nodes in self.neighbors.items():
+            if any(node.line == 'neighbor %s peer-group' % name for node in nodes):
+                continue
+            for node in nodes:
+                top = node.top()
+                if node.parent is top and self.RE_PEER.match(node.line):
+                    words = top.line.split()
+                    peers.add((words[4] if len(words) > 4 and words[3] == 'vrf' else 'default', name))
+        return peers
+
+    def get_neighbor(self, name):
+        """
+        Get commands of a neighbor or a peer-group in all address-families
+        :param name: neighbor or peer-group name
+        :return: list of commands
+        """
+        return [node.line for node in self.neighbors.get(name, [])]
+
+    def __accepts(self, node, command):
+        """ Check that the command belongs to the node """
+        words = command[3:] if command.startswith('no ') else command
+        top = node.top()
+        if top.line.startswith('route-map '):
+            return words.split(' ', 1)[0] in self.ROUTE_MAP_COMMANDS
+        if top.line.startswith('vrf '):
+            return words.startswith(self.VRF_COMMANDS)
+        if node is not top and words.startswith('address-family '):
+            return False
+        return not words.startswith(self.NODE_COMMANDS + self.LEAF_COMMANDS)
+
+    def __add(self, node, command):
+        """
+        Add a command to the node
+        :return: the node the command opens, None for a command which doesn't open a node
+        """
+        if command.startswith('address-family ') and command.count(' ') == 1:
+            command += ' unicast'  # FRR shows "address-family ipv4" as "address-family ipv4 unicast"
+        opens_node = command.startswith('address-family ') if node is not self.root else command.startswith(self.NODE_COMMANDS)
+        child = node.children.get(command)
+        if child is None:
+            if node is self.root:
+                child = self.__replace_top(command)
+            else:
+                node.children.pop('no ' + command, None)
+                self.__replace_single_value(node, command)
+            if child is None:
+                child = self.__attach(node, command)
+        return child if opens_node else None
+
+    def __replace_single_value(self, node, command):
+        """ Remove the old value of a command with a single value from the node """
+        for regexp in self.RE_SINGLE_VALUE:
+            m = regexp.match(command)
+            if m:
+                break
+        else:
+            return
+        neighbor = self.RE_NEIGHBOR.match(command)
+        if neighbor:
+            siblings = [n for n in self.neighbors.get(neighbor.group(1), []) if n.parent is node]
+        else:
+            siblings = list(node.children.values())
+        for sibling in siblings:
+            old = regexp.match(sibling.line)
+            if old and old.groups() == m.groups():
+                self.__detach(sibling)
+
+    def __replace_top(self, command):
+        """
+        Replace the top level command, which has the same name and sequence number as the command
+        :return: node of the command if the replaced command was moved into it, None otherwise
+        """
+        m = self.RE_PREFIX_LIST.match(command)
+        if m:
+            family, name, seq, _ = m.groups()
+            rule = self.prefix_lists.get((family, name), {}).get(int(seq))
+            if rule is not None:
+                self.__detach(self.root.children['%s prefix-list %s seq %s %s' % (family, name, seq, rule)])
+            return None
+        m = self.RE_ROUTE_MAP.match(command)
+        if m:
+            old = self.route_maps.get(m.group(1), {}).get(int(m.group(3)))
+            if old is not None:  # the action of the entry is changed
+                self.__detach(old)
+                node = self.__attach(self.root, command)
+                for line in old.children:
+                    self.__attach(node, line)
+                return node
+        return None
+
+    def __remove(self, node, command):
+        """ Remove commands matching the negated command from the node """
+        if node is self.root:
+            targets = self.__find_top(command)
+        else:
+            m = self.RE_NEIGHBOR.match(command)
+            if m and command == m.group(0):  # the neighbor is removed from all address-families
+                top = node.top()
+                targets = [n for n in self.neighbors.get(m.group(1), []) if n.top() is top]
+            elif m:
+                targets = [n for n in self.neighbors.get(m.group(1), []) if n.parent is node
+                           and (n.line == command or n.line.startswith(command + ' '))]
+            else:
+                targets = [child for line, child in node.children.items()
+                           if line == command or line.startswith(command + ' ')]
+            if not targets and not command.startswith('neighbor '):
+                # a negated default, like "no bgp ebgp-requires-policy", is a part of the configuration
+                self.__attach(node, 'no ' + command)
+        for target in targets:
+            self.__detach(target)
+
+    def __find_top(self, command):
+        """ Find top level commands removed by the negated command """
+        words = command.split()
+        if len(words) >= 3 and words[1] == 'prefix-list' and words[0] in ('ip', 'ipv6'):
+            entries = self.prefix_lists.get((words[0], words[2]), {})
+            seqs = [int(words[4])] if len(words) >= 5 and words[3] == 'seq' else list(entries)
+            lines = ['%s prefix-list %s seq %d %s' % (words[0], words[2], seq, entries[seq]) for seq in seqs if seq in entries]
+            return [self.root.children[line] for line in lines]
+        if len(words) >= 2 and words[0] == 'route-map':
+            entries = self.route_maps.get(words[1], {})
+            if len(words) >= 4:
+                return [entries[int(words[3])]] if int(words[3]) in entries else []
+            return list(entries.values())
+        if len(words) >= 3 and words[:2] == ['bgp', 'community-list']:
+            pos = 3 if words[2] in ('standard', 'expanded') and len(words) > 3 else 2
+            name, value = words[pos], ' '.join(words[pos + 1:])
+            entries = self.community_lists.get(name, {})
+            return [node for entry, node in entries.items() if value in ('', entry)]
+        return [self.root.children[command]] if command in self.root.children else []
+
+    def __attach(self, parent, line):
+        node = ConfigNode(line, parent)
+        parent.children[line] = node
+        self.__index(node, True)
+        return node
+
+    def __detach(self, node):
+        del node.parent.children[node.line]
+        self.__index(node, False)
+
+    def __index(self, node, add):
+        """ Add or remove the node and the nodes nested in it to/from the indexes """
+        if node.parent is self.root:
+            self.__index_top(node, add)
+        elif node.top().line.startswith('router bgp'):
+            m = self.RE_NEIGHBOR.match(node.line)
+            if m:
+                nodes = self.neighbors.setdefault(m.group(1), [])
+                if add:
+                    nodes.append(node)
+                else:
+                    nodes.remove(node)
+                    if not nodes:
+                        del self.neighbors[m.group(1)]
+        if not add:
+            for child in node.children.values():
+                self.__index(child, False)
+
+    def __index_top(self, node, add):
+        m = self.RE_PREFIX_LIST.match(node.line)
+        if m:
+            family, name, seq, rule = m.groups()
+            self.__update_index(self.prefix_lists, (family, name), int(seq), rule, add)
+            return
+        m = self.RE_ROUTE_MAP.match(node.line)
+        if m:
+            self.__update_index(self.route_maps, m.group(1), int(m.group(3)), node, add)
+            return
+        m = self.RE_COMMUNITY_LIST.match(node.line)
+        if m:
+            self.__update_index(self.community_lists, m.group(1), m.group(2), node, add)
+
+    @staticmethod
+    def __update_index(index, name, key, value, add):
+        if add:
+            index.setdefault(name, OrderedDict())[key] = value
+        else:
+            del index[name][key]
+            if not index[name]:
+                del index[name]
+
+
 class ConfigMgr(object):
     """ The class represents frr configuration """
-    def __init__(self, frr):
+    RESYNC_INTERVAL = 300  # seconds. The model is reread from FRR at least this often
+
+    def __init__(self, frr, resync_interval=RESYNC_INTERVAL, restart_scheduler=None):
+        """
+        Initialize the object
+        :param frr: FRR proxy
+        :param resync_interval: number of seconds the model of the running configuration is trusted for
+        :param restart_scheduler: PeerGroupRestartScheduler. Peer-groups are restarted on every commit, if it isn't set
+        """
         self.frr = frr
+        self.resync_interval = resync_interval
+        self.restart_scheduler = restart_scheduler
         self.current_config = None
         self.current_config_raw = None
         self.changes = ""
         self.peer_groups_to_restart = []
+        self.model = None
+        self.synced_at = None
+        self.generation = 0  # incremented when the running configuration can differ from the changes pushed before
 
     def reset(self):
-        """ Reset stored config """
-        self.current_config = None
-        self.current_config_raw = None
+        """ Reset changes, which were not committed yet """
         self.changes = ""
         self.peer_groups_to_restart = []
 
-    def update(self):
-        """ Read current config from FRR """
+    def invalidate(self):
+        """ Drop the model of the running configuration. It will be reread on the next update """
+        self.generation += 1
         self.current_config = None
         self.current_config_raw = None
+        self.model = None
+        self.synced_at = None
+
+    def update(self, force=False):
+        """
+        Read current config from FRR. FRR is queried on the first call, after a commit has failed,
+        and after the model hasn't been reread for resync_interval seconds. Otherwise the model is kept
+        up to date with the changes committed by bgpcfgd
+        :param force: reread the configuration regardless of the state of the model
+        """
+        if not force and self.model is not None and time.monotonic() - self.synced_at < self.resync_interval:
+            return
+        self.invalidate()
         out = self.frr.get_config()
         text = []
         for line in out.split('\n'):
@@ -27,6 +411,9 @@ class ConfigMgr(object):
         text += ["     "]  # Add empty line to have something to work on, if there is no text
         self.current_config_raw = text
         self.current_config = self.to_canonical(out)  # FIXME: use text as an input
+        self.model = RunningConfig.from_text(text)
+        self.synced_at = time.monotonic()
+        log_debug("ConfigMgr::update(): the running configuration was read from FRR")
 
     def push_list(self, cmdlist):
         """
@@ -43,6 +430,10 @@ class ConfigMgr(object):
         self.changes += cmd + "\n"
         return True
 
+    def has_changes(self):
+        """ Return True if there are changes, which were pushed but not committed yet """
+        return self.changes.strip() != ""
+
     def restart_peer_groups(self, peer_groups):
         """
         Schedule peer_groups for restart on commit
@@ -57,14 +448,42 @@ class ConfigMgr(object):
         """
         if self.changes.strip() == "":
             return True
-        rc_write = self.frr.write(self.changes)
-        rc_restart = self.frr.restart_peer_groups(self.peer_groups_to_restart)
+        changes = self.changes
+        rc_write = self.frr.write(changes)
+        if self.restart_scheduler is None:
+            rc_restart = self.frr.restart_peer_groups(self.peer_groups_to_restart)
+        else:
+            self.restart_scheduler.schedule(self.peer_groups_to_restart)
+            rc_restart = self.restart_scheduler.run()
+        if not rc_write:
+            log_info("ConfigMgr::commit(): the running configuration will be reread from FRR")
+            self.invalidate()
+        elif self.model is not None:
+            self.model.apply(changes)
+            self.current_config = None
+            self.current_config_raw = None
         self.reset()
         return rc_write and rc_restart
 
+    def restart_pending_peer_groups(self):
+        """
+        Restart the peer-groups, which restart was postponed by the restart scheduler
+        :return: True if the restarts were successful, False otherwise
+        """
+        if self.restart_scheduler is None:
+            return True
+        return self.restart_scheduler.run()
+
     def get_text(self):
+        """ Return the running configuration. Type: List of Strings """
+        if self.current_config_raw is None and self.model is not None:
+            self.current_config_raw = self.model.lines() + ["     "]
         return self.current_config_raw
 
+    def get_model(self):
+        """ Return the indexed model of the running configuration. Type: RunningConfig """
+        return self.model
+
     @staticmethod
     def to_canonical(raw_config):
         """
@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 from .log import log_err
 
@@ -8,7 +8,38 @@ class Directory(object):
         as some value is changed. This class works as DB cache mostly """
     def __init__(self):
         self.data = defaultdict(dict)  # storage. A key is a slot name, a value is a dictionary with data
-        self.notify = defaultdict(lambda: defaultdict(list))  # registered callbacks: slot -> path -> handlers[]
+        self.notify = defaultdict(lambda: defaultdict(list))  # registered callbacks: slot -> first path component -> (seq, path, handler)[]
+        self.split_paths = {}  # cache of paths split into tuples: path -> tuple of path components
+        self.subscriptions = 0  # number of subscriptions, keeps handlers in the order they were registered
+        self.held = False  # when True notifications of coalesced handlers are queued until release_notifications() is called
+        self.pending = OrderedDict()  # queued notifications: handler -> None
+        self.coalesced = set()  # handlers which can be queued while notifications are held
+
+    def split_path(self, path):
+        """
+        Split a path into a tuple of its components. An empty path is an empty tuple
+        :param path: storage path as a string where each internal key is separated by '/'
+        :return: tuple of path components
+        """
+        parts = self.split_paths.get(path)
+        if parts is None:
+            parts = tuple(path.split("/")) if path != '' else ()
+            self.split_paths[path] = parts
+        return parts
+
+    @staticmethod
+    def traverse(d, parts):
+        """
+        Traverse a dictionary through a sequence of keys
+        :param d: dictionary to traverse
+        :param parts: sequence of keys
+        :return: a pair: True if the path was found, object if it was found
+        """
+        for p in parts:
+            if not isinstance(d, dict) or p not in d:
+                return False, None
+            d = d[p]
+        return True, d
 
     @staticmethod
     def get_slot_name(db, table):
@@ -29,14 +60,7 @@ class Directory(object):
         """
         if slot not in self.data:
             return False, None
-        elif path == '':
-            return True, self.data[slot]
-        d = self.data[slot]
-        for p in path.split("/"):
-            if p not in d:
-                return False, None
-            d = d[p]
-        return True, d
+        return self.traverse(self.data[slot], self.split_path(path))
 
     def path_exist(self, db, table, path):
         """
@@ -62,7 +86,11 @@ class Directory(object):
 
     def put(self, db, table, key, value):
         """
-        Put information into the storage. Notify handlers which are dependant to the information
+        Put information into the storage. Notify handlers which are dependant to the information.
+        A handler is notified when the path it subscribed to has appeared or has changed.
+        Handlers subscribed to the whole slot are notified on every change of the slot.
+        A put of a "<key>|<suffix>" key notifies the handlers subscribed to an existing "<key>" path too,
+        as for "Loopback0" and its "Loopback0|<ip prefix>" keys.
         :param db: db name
         :param table: table name
         :param key: key to change
@@ -70,12 +98,64 @@ class Directory(object):
         :return:
         """
         slot = self.get_slot_name(db, table)
-        self.data[slot][key] = value
-        if slot in self.notify:
-            for path in self.notify[slot].keys():
-                if self.path_exist(db, table, path):
-                    for handler in self.notify[slot][path]:
-                        handler()
+        slot_data = self.data[slot]
+        existed = key in slot_data
+        old_value = slot_data.get(key)
+        slot_data[key] = value
+        if existed and old_value is not value and old_value == value:
+            return  # nothing has changed
+        if slot not in self.notify:
+            return
+        subscriptions = self.notify[slot]
+        handlers = {}  # handler -> sequence number of its first subscription
+        for seq, _, handler in subscriptions.get(None, []):
+            handlers.setdefault(handler, seq)
+        for seq, path, handler in subscriptions.get(key, []):
+            found, new = self.traverse(value, path[1:])
+            if not found:
+                continue
+            if existed and old_value is not value:  # the same object could have been modified in place
+                found, old = self.traverse(old_value, path[1:])
+                if found and old == new:
+                    continue
+            handlers[handler] = min(seq, handlers.get(handler, seq))
+        if '|' in key:
+            prefix = key.split('|', 1)[0]
+            for seq, path, handler in subscriptions.get(prefix, []):
+                if self.traverse(slot_data, path)[0]:
+                    handlers[handler] = min(seq, handlers.get(handler, seq))
+        for handler in sorted(handlers, key=handlers.get):
+            self.notify_handler(handler)
+
+    def notify_handler(self, handler):
+        """
+        Run the handler, or queue it once when notifications are held and the handler is coalesced
+        :param handler: handler to notify
+        """
+        if self.held and handler in self.coalesced:
+            self.pending[handler] = None
+        else:
+            handler()
+
+    def hold_notifications(self):
+        """
+        Queue notifications of the coalesced handlers instead of running them right away.
+        A handler is queued only once, however many times it was notified.
+        Other handlers, which update state the table handlers read, are still run right away
+        """
+        self.held = True
+
+    def release_notifications(self):
+        """
+        Run the queued handlers, including the ones notified while running them, and stop queueing
+        """
+        try:
+            while self.pending:
+                handler, _ = self.pending.popitem(last=False)
+                handler()
+        finally:
+            self.held = False
+            self.pending.clear()
 
     def get(self, db, table, key):
         """
@@ -142,18 +222,24 @@ class Directory(object):
         :param deps: list of dependencies
         :return: True if all dependencies are presented, False otherwise
         """
-        res = True
         for db, table, path in deps:
-            res = res and self.path_exist(db, table, path)
-        return res
+            if not self.path_exist(db, table, path):
+                return False
+        return True
 
-    def subscribe(self, deps, handler):
+    def subscribe(self, deps, handler, coalesce=False):
         """
         Subscribe the handler to be run as soon as all dependencies are presented
         :param deps:
         :param handler:
+        :param coalesce: the handler can be queued while notifications are held, see hold_notifications()
         :return:
         """
+        if coalesce:
+            self.coalesced.add(handler)
         for db, table, path in deps:
             slot = self.get_slot_name(db, table)
-            self.notify[slot][path].append(handler)
\ No newline at end of file
+            parts = self.split_path(path)
+            first = parts[0] if parts else None
+            self.notify[slot][first].append((self.subscriptions, parts, handler))
+            self.subscriptions += 1
@@ -1,17 +1,117 @@
 import os
 import datetime
+import socket
 import time
 import tempfile
 
-from bgpcfgd.log import log_err, log_info, log_warn, log_crit
+from bgpcfgd.log import log_err, log_info, log_warn, log_crit, log_debug
+from .config import RunningConfig
 from .vars import g_debug
 from .utils import run_command
 
 
+class VtyClient(object):
+    """ Persistent connection to the vty unix socket of a FRR daemon """
+    VTY_DIR = '/run/frr'
+    TIMEOUT = 120  # seconds to wait for a reply of the daemon
+
+    def __init__(self, daemon, vty_dir=None):
+        self.daemon = daemon
+        self.path = os.path.join(vty_dir or self.VTY_DIR, '%s.vty' % daemon)
+        self.sock = None
+
+    def connect(self):
+        """
+        Connect to the daemon and enter the enable node, if not connected yet
+        :return: True if the connection is ready, False otherwise
+        """
+        if self.sock is not None:
+            return True
+        if not os.path.exists(self.path):
+            return False
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.TIMEOUT)
+            sock.connect(self.path)
+            self.sock = sock
+            rc, out = self.send("enable")
+        except (socket.error, EOFError) as e:
+            log_warn("Can't connect to the vty of '%s': %s" % (self.daemon, str(e)))
+            self.close(sock)
+            return False
+        if rc != 0:
+            log_err("Can't enable the vty of '%s': rc=%d out='%s'" % (self.daemon, rc, out))
+            self.close()
+            return False
+        return True
+
+    def close(self, sock=None):
+        """ Drop the connection """
+        sock = sock or self.sock
+        self.sock = None
+        if sock is not None:
+            sock.close()
+
+    def send(self, command):
+        """
+        Run a command on the daemon. The daemon terminates its reply with three zero bytes and the return code
+        :param command: command to run
+        :return: a pair: return code of the command, its output
+        """
+        self.sock.sendall(command.encode('utf-8') + b'\0')
+        reply = bytearray()
+        while len(reply) < 4 or reply[-4:-1] != b'\0\0\0':
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise EOFError("connection closed by %s" % self.daemon)
+            reply += chunk
+        return reply[-1], reply[:-4].decode('utf-8', 'replace')
+
+    def execute(self, command):
+        """
+        Run a command in the enable node, reconnecting once if the connection was lost
+        :param command: command to run
+        :return: a pair: return code of the command, its output. None if the daemon can't be reached
+        """
+        for _ in range(2):
+            if not self.connect():
+                return None
+            try:
+                return self.send(command)
+            except (socket.error, EOFError) as e:
+                log_warn("Lost the vty connection to '%s': %s" % (self.daemon, str(e)))
+                self.close()
+        return None
+
+
 class FRR(object):
     """Proxy object with FRR"""
-    def __init__(self, daemons):
+    # Daemons which a top level configuration command is sent to, by the first words of the command.
+    # The lines nested under the command are sent to the same daemons. A line is applied
+    # successfully if at least one of its daemons accepted it. A change with any other top level
+    # command is written through vtysh, which knows the commands of every daemon.
+    CONFIG_DAEMONS = [
+        ('router bgp', ['bgpd']),
+        ('bgp', ['bgpd']),
+        ('route-map', ['bgpd', 'zebra']),
+        ('ip prefix-list', ['bgpd', 'zebra']),
+        ('ipv6 prefix-list', ['bgpd', 'zebra']),
+        ('ip protocol', ['zebra']),
+        ('ipv6 protocol', ['zebra']),
+        ('ip route', ['staticd']),
+        ('ipv6 route', ['staticd']),
+        ('vrf', ['zebra', 'staticd']),
+    ]
+
+    def __init__(self, daemons, use_vty=True, vty_dir=None):
+        """
+        Initialize the proxy
+        :param daemons: FRR daemons bgpcfgd depends on
+        :param use_vty: talk to the daemons through their vty sockets, instead of running vtysh
+        :param vty_dir: directory of the vty sockets
+        """
         self.daemons = daemons
+        self.vty = {daemon: VtyClient(daemon, vty_dir) for daemon in daemons} if use_vty else {}
 
     def wait_for_daemons(self, seconds):
         """
@@ -21,6 +121,9 @@ class FRR(object):
         stop_time = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
         log_info("Start waiting for FRR daemons: %s" % str(datetime.datetime.now()))
         while datetime.datetime.now() < stop_time:
+            if self.vty and all(self.vty[daemon].connect() for daemon in self.daemons):
+                log_info("All required daemons have accepted vty connections: %s" % str(datetime.datetime.now()))
+                return
             ret_code, out, err = run_command(["vtysh", "-c", "show daemons"], hide_errors=True)
             if ret_code == 0 and all(daemon in out for daemon in self.daemons):
                 log_info("All required daemons have connected to vtysh: %s" % str(datetime.datetime.now()))
@@ -30,16 +133,111 @@ class FRR(object):
             time.sleep(0.1)  # sleep 100 ms
         raise RuntimeError("FRR daemons hasn't been started in %d seconds" % seconds)
 
-    @staticmethod
-    def get_config():
+    def execute(self, daemon, command):
+        """
+        Run a command on the vty of a daemon
+        :param daemon: daemon name
+        :param command: command to run
+        :return: a pair: return code of the command, its output. None if vty connections aren't used or the daemon can't be reached
+        """
+        if daemon not in self.vty:
+            return None
+        return self.vty[daemon].execute(command)
+
+    def get_config(self):
+        """
+        Read the running configuration. Through the vty the running configurations of all the daemons
+        are read and merged, as vtysh does. vtysh is used when a daemon can't be reached through its vty
+        """
+        outputs = []
+        for daemon in self.daemons:
+            res = self.execute(daemon, "show running-config")
+            if res is None or res[0] != 0:
+                break
+            outputs.append(res[1])
+        else:
+            if outputs:
+                return "\n".join(RunningConfig.from_text("\n".join(outputs)).lines()) + "\n"
         ret_code, out, err = run_command(["vtysh", "-c", "show running-config"])
         if ret_code != 0:
             log_crit("can't update running config: rc=%d out='%s' err='%s'" % (ret_code, out, err))
             return ""
         return out
 
+    @classmethod
+    def split_config(cls, config_text):
+        """
+        Split configuration text into the lines to send and the daemons to send them to
+        :param config_text: configuration text
+        :return: list of (index of the top level command the line belongs to, line, daemons), None if a top level command can't be routed
+        """
+        lines = []
+        block, daemons = None, None
+        for line in config_text.split('\n'):
+            command = line.strip()
+            if command == '' or command.startswith('!'):
+                continue
+            if not line[0].isspace():
+                block, daemons = len(lines), None
+                words = command[3:] if command.startswith('no ') else command
+                for prefix, prefix_daemons in cls.CONFIG_DAEMONS:
+                    if words == prefix or words.startswith(prefix + ' '):
+                        daemons = prefix_daemons
+                        break
+                if daemons is None:
+                    log_debug("FRR: no vty route for '%s'" % command)
+                    return None
+            elif daemons is None:
+                return None
+            lines.append((block, line.rstrip(), daemons))
+        return lines
+
+    def write_vty(self, config_text):
+        """
+        Write configuration through the vty sockets
+        :param config_text: configuration text
+        :return: a pair: False if a line failed to apply, configuration left to write through vtysh (None if nothing is left)
+        """
+        lines = self.split_config(config_text)
+        if lines is None or not self.vty:
+            return True, config_text
+        daemons = sorted(set(daemon for _, _, line_daemons in lines for daemon in line_daemons))
+        if not all(daemon in self.vty and self.vty[daemon].connect() for daemon in daemons):
+            return True, config_text
+        res = True
+        block = 0
+        try:
+            for daemon in daemons:
+                rc, out = self.vty[daemon].send("configure terminal")
+                if rc != 0:
+                    log_err("Can't enter the configuration node of '%s': rc=%d out='%s'" % (daemon, rc, out))
+                    raise EOFError("configure terminal failed")
+            for block, line, line_daemons in lines:
+                command = line.strip()
+                replies = [(daemon,) + self.vty[daemon].send(command) for daemon in line_daemons]
+                if all(rc != 0 for _, rc, _ in replies):
+                    err = ", ".join("%s: rc=%d out='%s'" % (daemon, rc, out.strip()) for daemon, rc, out in replies)
+                    log_err("ConfigMgr::commit(): can't apply '%s': %s" % (command, err))
+                    res = False
+            for daemon in daemons:
+                self.vty[daemon].send("end")
+        except (socket.error, EOFError) as e:
+            # The configuration nodes the daemons were in are lost with the connections,
+            # write the rest starting from the current top level command through vtysh
+            log_warn("Can't write configuration through the vty: %s" % str(e))
+            for daemon in daemons:
+                self.vty[daemon].close()
+            return res, "\n".join(line for line_block, line, _ in lines if line_block >= block)
+        return res, None
+
+    def write(self, config_text):
+        res, config_text = self.write_vty(config_text)
+        if config_text is None:
+            return res
+        return self.write_vtysh(config_text) and res
+
     @staticmethod
-    def write(config_text):
+    def write_vtysh(config_text):
         fd, tmp_filename = tempfile.mkstemp(dir='/tmp')
         os.close(fd)
         with open(tmp_filename, 'w') as fp:
@@ -54,15 +252,20 @@ class FRR(object):
                 os.remove(tmp_filename)
         return ret_code == 0
 
-    @staticmethod
-    def restart_peer_groups(peer_groups):
+    def restart_peer_groups(self, peer_groups):
         """ Restart peer-groups which support BBR
         :param peer_groups: List of peer_groups to restart
         :return: True if restart of all peer-groups was successful, False otherwise
         """
         res = True
         for peer_group in sorted(peer_groups):
-            rc, out, err = run_command(["vtysh", "-c", "clear bgp peer-group %s soft in" % peer_group])
+            command = "clear bgp peer-group %s soft in" % peer_group
+            reply = self.execute('bgpd', command)
+            if reply is not None:
+                rc, out = reply
+                err = ""
+            else:
+                rc, out, err = run_command(["vtysh", "-c", command])
             if rc != 0:
                 log_value = peer_group, rc, out, err
                 log_crit("Can't restart bgp peer-group '%s'. rc='%d', out='%s', err='%s'" % log_value)
@@ -13,7 +13,7 @@ from .log import log_notice, log_crit
 from .managers_advertise_rt import AdvertiseRouteMgr
 from .managers_allow_list import BGPAllowListMgr
 from .managers_bbr import BBRMgr
-from .managers_bgp import BGPPeerMgrBase
+from .managers_bgp import BGPPeerMgrBase, BGPPeerInventory
 from .managers_db import BGPDataBaseMgr
 from .managers_intf import InterfaceMgr
 from .managers_setsrc import ZebraSetSrc
@@ -21,6 +21,7 @@ from .managers_static_rt import StaticRouteMgr
 from .managers_rm import RouteMapMgr
 from .managers_device_global import DeviceGlobalCfgMgr
 from .static_rt_timer import StaticRouteTimer
+from .restart_scheduler import PeerGroupRestartScheduler
 from .runner import Runner, signal_handler
 from .template import TemplateFabric
 from .utils import read_constants
@@ -34,12 +35,26 @@ def do_work():
     thr.start()
     frr = FRR(["bgpd", "zebra", "staticd"])
     frr.wait_for_daemons(seconds=20)
+    constants = read_constants()
+    resync_interval = constants.get('bgp', {}).get('config_resync_interval', ConfigMgr.RESYNC_INTERVAL)
+    restart_constants = constants.get('bgp', {}).get('peer_group_restart', {})
+    state_db = swsscommon.SonicV2Connector()
+    state_db.connect(state_db.STATE_DB)
+    restart_scheduler = PeerGroupRestartScheduler(
+        frr,
+        restart_constants.get('hold_down', PeerGroupRestartScheduler.HOLD_DOWN),
+        restart_constants.get('max_concurrent', PeerGroupRestartScheduler.MAX_CONCURRENT),
+        state_db,
+    )
+    cfg_mgr = ConfigMgr(frr, resync_interval, restart_scheduler)
     #
     common_objs = {
         'directory': Directory(),
-        'cfg_mgr':   ConfigMgr(frr),
-        'tf':        TemplateFabric(),
-        'constants': read_constants(),
+        'cfg_mgr':   cfg_mgr,
+        'tf':        TemplateFabric(use_cache=True),
+        'constants': constants,
+        'peer_inventory': BGPPeerInventory(cfg_mgr),
+        'static_route_timer': st_rt_timer,
     }
     managers = [
         # Config DB managers
@@ -73,7 +88,7 @@ def do_work():
         # Device Global Manager
         DeviceGlobalCfgMgr(common_objs, "CONFIG_DB", swsscommon.CFG_BGP_DEVICE_GLOBAL_TABLE_NAME),
     ]
-    runner = Runner(common_objs['cfg_mgr'])
+    runner = Runner(common_objs['cfg_mgr'], common_objs['directory'])
     for mgr in managers:
         runner.add_manager(mgr)
     runner.run()
@@ -20,7 +20,7 @@ class Manager(object):
         self.db_name = database
         self.table_name = table_name
         self.set_queue = []
-        self.directory.subscribe(deps, self.on_deps_change)  # subscribe this class method on directory changes
+        self.directory.subscribe(deps, self.on_deps_change, coalesce=True)  # subscribe this class method on directory changes
 
     def get_database(self):
         """ Return associated database """
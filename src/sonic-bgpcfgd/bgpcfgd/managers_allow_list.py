@@ -2,7 +2,9 @@
 Implementation of "allow-list" feature
 """
 import re
+import bisect
 import ipaddress
+from collections import OrderedDict
 
 from .log import log_debug, log_info, log_err, log_warn
 from .template import TemplateFabric
@@ -24,6 +26,7 @@ class BGPAllowListMgr(Manager):
     ROUTE_MAP_ENTRY_WITHOUT_COMMUNITY_START = 30000
     ROUTE_MAP_ENTRY_WITHOUT_COMMUNITY_END = 65530
     PREFIX_LIST_POS = 1 # the position of the ip prefix in the permit string.
+    PREFIX_LIST_SEQ_STEP = 10  # distance between sequence numbers of new prefix-list entries
 
     V4 = "v4"  # constant for af enum: V4
     V6 = "v6"  # constant for af enum: V6
@@ -44,6 +47,7 @@ class BGPAllowListMgr(Manager):
         self.key_re = re.compile(r"^DEPLOYMENT_ID\|\d+\|\S+$|^DEPLOYMENT_ID\|\d+$|^DEPLOYMENT_ID\|\d+\|\S+\|NEIGHBOR_TYPE\|\S+$|^DEPLOYMENT_ID\|\d+\|NEIGHBOR_TYPE\|\S+")
         self.enabled = self.__get_enabled()
         self.prefix_match_tag = self.__get_routemap_tag()
+        self.aggregate_prefixes = self.__get_aggregate_prefixes()
         self.__load_constant_lists()
 
     def set_handler(self, key, data):
@@ -263,12 +267,15 @@ class BGPAllowListMgr(Manager):
         """
         assert af == self.V4 or af == self.V6
         constant_list = self.__get_constant_list(af)
+        if self.aggregate_prefixes:
+            allow_list = self.__aggregate(af, allow_list)
         allow_list = self.__to_prefix_list(af, allow_list)
         log_debug("BGPAllowListMgr::__update_prefix_list. af='%s' prefix-list name=%s" % (af, pl_name))
         '''
             Need to check exist and equality of the allowed prefix list.
             A. If exist and equal, no operation needed. 
-            B. If exist but not equal, first delete then add prefix based on the data from condig db and constants. 
+            B. If exist but not equal, add the missing entries and remove the stale ones.
+               The entries which are kept don't change their sequence numbers.
             C. If non-exist, directly add prefix based on the data from condig db and constants.
         '''
         exist, correct = self.__is_prefix_list_valid(af, pl_name, allow_list, constant_list)
@@ -276,15 +283,177 @@ class BGPAllowListMgr(Manager):
             log_debug("BGPAllowListMgr::__update_prefix_list. the prefix-list '%s' exists and correct" % pl_name)
             return []
         family = self.__af_to_family(af)
-        cmds = []
-        seq_no = 10
-        if exist:
-            cmds.append('no %s prefix-list %s' % (family, pl_name))
-        for entry in self.__normalize_ipnetwork(af, constant_list + allow_list):
-            cmds.append('%s prefix-list %s seq %d %s' % (family, pl_name, seq_no, entry))
-            seq_no += 10
+        rules = self.__normalize_ipnetwork(af, constant_list + allow_list)
+        entries = self.cfg_mgr.get_model().get_prefix_list(family, pl_name) if exist else {}
+        cmds = self.__diff_prefix_list(family, pl_name, entries, rules)
+        if cmds is None:
+            log_info("BGPAllowListMgr::__update_prefix_list. No free sequence numbers in '%s'. Rewriting it" % pl_name)
+            cmds = ['no %s prefix-list %s' % (family, pl_name)]
+            cmds += self.__diff_prefix_list(family, pl_name, {}, rules)
         return cmds
 
+    @staticmethod
+    def __diff_prefix_list(family, pl_name, entries, rules):
+        """
+        Generate commands which turn the entries of the prefix-list into the rules.
+        The longest chain of the entries which are already in the order of the rules keeps its
+        sequence numbers, the other rules are inserted into the gaps between them, at sequence numbers
+        no current entry uses. New entries are added before the stale ones are removed, so the
+        prefix-list is never empty. Only the entries of the rules which are moved are removed first
+        :param family: prefix-list family: "ip" or "ipv6"
+        :param pl_name: prefix-list name
+        :param entries: current prefix-list entries: dictionary sequence number -> rule
+        :param rules: expected prefix-list rules in the order of matching
+        :return: a list of commands. None if there are no free sequence numbers to insert a rule
+        """
+        rules = list(OrderedDict.fromkeys(rules))  # FRR doesn't accept duplicated entries
+        position = {rule: i for i, rule in enumerate(rules)}
+        current = sorted(entries.items())
+        kept = BGPAllowListMgr.__longest_chain([(seq, position[rule]) for seq, rule in current if rule in position])
+        kept_seq = {pos: seq for seq, pos in kept}
+        added = {}
+        prev_seq, i = 0, 0
+        while i < len(rules):
+            if i in kept_seq:
+                prev_seq = kept_seq[i]
+                i += 1
+                continue
+            j = i
+            while j < len(rules) and j not in kept_seq:
+                j += 1
+            seqs = BGPAllowListMgr.__allocate_seqs(prev_seq, kept_seq.get(j), j - i, entries)
+            if seqs is None:
+                return None
+            for seq, rule in zip(seqs, rules[i:j]):
+                added[seq] = rule
+            i = j
+        kept_entries = set(seq for seq, _ in kept)
+        # Entries of the moved rules are removed first, FRR doesn't accept the rule twice
+        remove_first, remove_last = [], []
+        for seq, rule in current:
+            if seq in kept_entries:
+                continue
+            cmd = 'no %s prefix-list %s seq %d %s' % (family, pl_name, seq, rule)
+            if rule in position:
+                remove_first.append(cmd)
+            else:
+                remove_last.append(cmd)
+        add = ['%s prefix-list %s seq %d %s' % (family, pl_name, seq, rule) for seq, rule in sorted(added.items())]
+        return remove_first + add + remove_last
+
+    @staticmethod
+    def __allocate_seqs(low, high, count, used):
+        """
+        Allocate increasing sequence numbers between two sequence numbers, which are not used
+        :param low: the sequence numbers are greater than low
+        :param high: the sequence numbers are less than high. None if there is no upper bound
+        :param count: number of sequence numbers to allocate
+        :param used: sequence numbers which are used
+        :return: list of the sequence numbers. None if there are not enough free sequence numbers
+        """
+        step = BGPAllowListMgr.PREFIX_LIST_SEQ_STEP
+        if high is None:
+            low = max([low] + [seq for seq in used if seq > low])  # after the stale entries
+            return [low + step * (k + 1) for k in range(count)]
+        gap = max(1, min(step, (high - low) // (count + 1)))
+        seqs = []
+        seq = low
+        for _ in range(count):
+            seq += gap
+            while seq in used:
+                seq += 1
+            seqs.append(seq)
+        if not seqs or seqs[-1] < high:
+            return seqs
+        # Not enough room with the gap: spread the rules over the free sequence numbers
+        free = [seq for seq in range(low + 1, high) if seq not in used]
+        if len(free) < count:
+            return None
+        return [free[len(free) * (k + 1) // (count + 1)] for k in range(count)]
+
+    @staticmethod
+    def __longest_chain(pairs):
+        """
+        Find the longest chain of pairs, which is increasing in the second element
+        :param pairs: list of (sequence number, position) pairs, sorted by the sequence number
+        :return: the pairs of the chain
+        """
+        tails = []  # tails[k] is the index of the pair with the smallest position ending a chain of length k + 1
+        tail_positions = []
+        parents = []
+        for i, (_, pos) in enumerate(pairs):
+            k = bisect.bisect_left(tail_positions, pos)
+            parents.append(tails[k - 1] if k > 0 else None)
+            if k == len(tails):
+                tails.append(i)
+                tail_positions.append(pos)
+            else:
+                tails[k] = i
+                tail_positions[k] = pos
+        chain = []
+        i = tails[-1] if tails else None
+        while i is not None:
+            chain.append(pairs[i])
+            i = parents[i]
+        return chain[::-1]
+
+    def __aggregate(self, af, allow_list):
+        """
+        Aggregate "allow list" prefixes. A prefix which is covered by another prefix with a wider
+        ge/le range is dropped. Two sibling prefixes with the same "ge" and "le", where "ge" is longer
+        than the prefixes, are replaced by their parent prefix. Both keep the set of matched routes
+        :param af: address-family
+        :param allow_list: "allow list" prefix list: prefixes with optional ge/le
+        :return: aggregated "allow list" prefix list
+        """
+        max_len = 32 if af == self.V4 else 128
+        parsed = {}  # network -> list of (ge, le, original prefix)
+        for prefix in allow_list:
+            words = prefix.split()
+            network = ipaddress.ip_network(words[0], strict=False)
+            options = dict(zip(words[1::2], (int(value) for value in words[2::2])))
+            ge = options.get('ge', network.prefixlen)
+            le = options.get('le', max_len)
+            items = parsed.setdefault(network, [])
+            if not any(item[:2] == (ge, le) for item in items):
+                items.append((ge, le, prefix.strip()))
+
+        # merge siblings, starting from the longest prefixes
+        for length in range(max_len, 0, -1):
+            for network in [n for n in parsed if n.prefixlen == length]:
+                if network not in parsed:
+                    continue
+                parent = network.supernet()
+                sibling = next(n for n in parent.subnets() if n != network)
+                for ge, le, prefix in list(parsed[network]):
+                    if ge <= length:
+                        continue
+                    match = [item for item in parsed.get(sibling, []) if item[:2] == (ge, le)]
+                    if not match:
+                        continue
+                    parsed[network].remove((ge, le, prefix))
+                    parsed[sibling].remove(match[0])
+                    suffix = prefix.split(None, 1)[1]
+                    parsed.setdefault(parent, []).append((ge, le, "%s %s" % (parent, suffix)))
+                for n in (network, sibling):
+                    if n in parsed and not parsed[n]:
+                        del parsed[n]
+
+        # drop prefixes covered by a wider prefix
+        res = []
+        for network in sorted(parsed, key=lambda n: (n.prefixlen, n)):
+            for ge, le, prefix in parsed[network]:
+                covered = False
+                for length in range(network.prefixlen, -1, -1):
+                    supernet = network.supernet(new_prefix=length)
+                    if any(s_ge <= ge and le <= s_le and (supernet != network or (s_ge, s_le) != (ge, le))
+                           for s_ge, s_le, _ in parsed.get(supernet, [])):
+                        covered = True
+                        break
+                if not covered:
+                    res.append(prefix)
+        return res
+
     def __remove_prefix_list(self, af, pl_name):
         """
         Remove prefix-list in the address-family af.
@@ -332,19 +501,13 @@ class BGPAllowListMgr(Manager):
         """
         assert af == self.V4 or af == self.V6
         family = self.__af_to_family(af)
-        match_string = '%s prefix-list %s seq ' % (family, pl_name)
-        conf = self.cfg_mgr.get_text()
-        if not any(line.strip().startswith(match_string) for line in conf):
+        entries = self.cfg_mgr.get_model().get_prefix_list(family, pl_name)
+        if not entries:
             return False, False  # if the prefix list is not exists, it is not correct
         expect_set = set(self.__normalize_ipnetwork(af, constant_list))
         expect_set.update(set(self.__normalize_ipnetwork(af, allow_list)))
 
-        config_list = []
-        for line in conf:
-            if line.startswith(match_string):
-                found = line[len(match_string):].strip().split(' ')
-                rule = " ".join(found[1:])
-                config_list.append(rule)
+        config_list = list(entries.values())
 
         # Return double Ture, when running configuraiton is identical with config db + constants.
         return True, expect_set == set(self.__normalize_ipnetwork(af, config_list))  
@@ -398,12 +561,12 @@ class BGPAllowListMgr(Manager):
                           Second element: community value if the first element is True no value otherwise
         """
         log_debug("BGPAllowListMgr::__is_community_presented. community='%s'" % community_name)
-        match_string = 'bgp community-list standard %s permit ' % community_name
-        conf = self.cfg_mgr.get_text()
-        found = [line.strip() for line in conf if line.strip().startswith(match_string)]
+        match_string = 'permit '
+        entries = self.cfg_mgr.get_model().get_community_list(community_name)
+        found = [entry for entry in entries if entry.startswith(match_string)]
         if not found:
             return False, None
-        community_value = found[0].replace(match_string, '')
+        community_value = found[0][len(match_string):]
         return True, community_value
 
     def __update_allow_route_map_entry(self, af, allow_address_pl_name, community_name, route_map_name):
@@ -460,23 +623,17 @@ class BGPAllowListMgr(Manager):
         :return: a community value used for default action
         """
         log_debug("BGPAllowListMgr::__parse_default_action_route_map_entries. rm='%s'" % route_map_name)
-        match_string = 'route-map %s permit 65535' % route_map_name
         match_community = re.compile(r'^set community (\S+) additive$')
-        inside_route_map = False
         community_value = ""
-        conf = self.cfg_mgr.get_text()
-        for line in conf + [""]:
-            s_line = line.strip()
-            if inside_route_map:
-                matched = match_community.match(s_line)
+        entry = self.cfg_mgr.get_model().get_route_map(route_map_name, 'permit').get(65535)
+        if entry is not None:
+            for line in entry:
+                matched = match_community.match(line)
                 if matched:
                     community_value = matched.group(1)
                     break
-                else:
-                    log_err("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=65535" % route_map_name)
-                inside_route_map = False
-            elif s_line == match_string:
-                inside_route_map = True
+            else:
+                log_err("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=65535" % route_map_name)
         if community_value == "":
             log_err("BGPAllowListMgr::Default action community value is not found. route-map '%s' entry. seq_no=65535" % route_map_name)
         return community_value
@@ -526,44 +683,28 @@ class BGPAllowListMgr(Manager):
         """
         assert af == self.V4 or af == self.V6
         log_debug("BGPAllowListMgr::__parse_allow_route_map_entries. af='%s', rm='%s'" % (af, route_map_name))
-        match_string = 'route-map %s permit ' % route_map_name
         entries = {}
-        inside_route_map = False
-        route_map_seq_number = None
-        pl_allow_list_name = None
-        community_name = self.EMPTY_COMMUNITY
         if af == self.V4:
             match_pl_allow_list = 'match ip address prefix-list '
         else:  # self.V6
             match_pl_allow_list = 'match ipv6 address prefix-list '
         match_community = 'match community '
-        conf = self.cfg_mgr.get_text()
-        for line in conf + [""]:
-            if inside_route_map:
-                if line.strip().startswith(match_pl_allow_list):
-                    pl_allow_list_name = line.strip()[len(match_pl_allow_list):]
-                    continue
-                elif line.strip().startswith(match_community):
-                    community_name = line.strip()[len(match_community):]
-                    continue
-                else:
-                    if pl_allow_list_name is not None:
-                        entries[route_map_seq_number] = {
-                            'pl_allow_list': pl_allow_list_name,
-                            'community': community_name,
-                        }
-                    else:
-                        if route_map_seq_number != 65535:
-                            log_warn("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=%d" % (route_map_name, route_map_seq_number))
-                    inside_route_map = False
-                    pl_allow_list_name = None
-                    community_name = self.EMPTY_COMMUNITY
-                    route_map_seq_number = None
-            if line.startswith(match_string):
-                found = line[len(match_string):]
-                assert found.isdigit()
-                route_map_seq_number = int(found)
-                inside_route_map = True
+        route_map = self.cfg_mgr.get_model().get_route_map(route_map_name, 'permit')
+        for route_map_seq_number, lines in route_map.items():
+            pl_allow_list_name = None
+            community_name = self.EMPTY_COMMUNITY
+            for line in lines:
+                if line.startswith(match_pl_allow_list):
+                    pl_allow_list_name = line[len(match_pl_allow_list):]
+                elif line.startswith(match_community):
+                    community_name = line[len(match_community):]
+            if pl_allow_list_name is not None:
+                entries[route_map_seq_number] = {
+                    'pl_allow_list': pl_allow_list_name,
+                    'community': community_name,
+                }
+            elif route_map_seq_number != 65535:
+                log_warn("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=%d" % (route_map_name, route_map_seq_number))
         return entries
 
     @staticmethod
@@ -597,14 +738,7 @@ class BGPAllowListMgr(Manager):
         Extract names of all peer-groups defined in the config
         :return: list of peer-group names
         """
-        # Find all peer-groups entries
-        re_peer_group = re.compile(r'^\s*neighbor (\S+) peer-group$')
-        peer_groups = []
-        for line in self.cfg_mgr.get_text():
-            result = re_peer_group.match(line)
-            if result:
-                peer_groups.append(result.group(1))
-        return peer_groups
+        return self.cfg_mgr.get_model().get_peer_groups()
 
     def __get_peer_group_to_route_map(self, peer_groups):
         """
@@ -614,9 +748,10 @@ class BGPAllowListMgr(Manager):
                  for the peer_group.
         """
         pg_2_rm = {}
+        model = self.cfg_mgr.get_model()
         for pg in peer_groups:
-            re_peer_group_rm = re.compile(r'^\s*neighbor %s route-map (\S+) in$' % pg)
-            for line in self.cfg_mgr.get_text():
+            re_peer_group_rm = re.compile(r'^neighbor %s route-map (\S+) in$' % re.escape(pg))
+            for line in model.get_neighbor(pg):
                 result = re_peer_group_rm.match(line)
                 if result:
                     pg_2_rm[pg] = result.group(1)
@@ -630,25 +765,24 @@ class BGPAllowListMgr(Manager):
         :return: a dictionary: key - name of a route-map, value - name of a route-map call defined for the route-map
         """
         rm_2_call = {}
-        re_rm = re.compile(r'^route-map (\S+) permit \d+$')
-        re_call = re.compile(r'^\s*call (\S+)$')
-        inside_name = None
-        for line in self.cfg_mgr.get_text():
-            if inside_name:
-                inside_result = re_call.match(line)
-                if inside_result:
-                    rm_2_call[inside_name] = inside_result.group(1)
-                    inside_name = None
-                    continue
-            result = re_rm.match(line)
-            if not result:
-                continue
-            inside_name = None
-            if result.group(1) not in rms:
-                continue
-            inside_name = result.group(1)
+        re_call = re.compile(r'^call (\S+)$')
+        model = self.cfg_mgr.get_model()
+        for rm in rms:
+            for lines in model.get_route_map(rm, 'permit').values():
+                for line in lines:
+                    result = re_call.match(line)
+                    if result:
+                        rm_2_call[rm] = result.group(1)
+                        break
         return rm_2_call
 
+    def __get_aggregate_prefixes(self):
+        """
+        Check if the "allow list" prefixes should be aggregated before they are written into prefix-lists
+        :return: True if "aggregate_prefixes" is enabled in constants.yml, False otherwise
+        """
+        return bool(self.constants.get("bgp", {}).get("allow_list", {}).get("aggregate_prefixes", False))
+
     def __get_routemap_tag(self):
         """
         Find if any user define tag is provided to be used when allow prefifx list is matched
@@ -1,13 +1,11 @@
-import json
 from swsscommon import swsscommon
 
 import jinja2
 import netaddr
 
-from .log import log_warn, log_err, log_info, log_debug, log_crit
+from .log import log_warn, log_err, log_info, log_debug
 from .manager import Manager
 from .template import TemplateFabric
-from .utils import run_command
 from .managers_device_global import DeviceGlobalCfgMgr
 
 
@@ -22,9 +20,10 @@ class BGPPeerGroupMgr(object):
         self.cfg_mgr = common_objs['cfg_mgr']
         self.constants = common_objs['constants']
         tf = common_objs['tf']
-        self.policy_template = tf.from_file(base_template + "policies.conf.j2")
-        self.peergroup_template = tf.from_file(base_template + "peer-group.conf.j2")
+        self.policy_template = tf.from_file_memoized(base_template + "policies.conf.j2")
+        self.peergroup_template = tf.from_file_memoized(base_template + "peer-group.conf.j2")
         self.device_global_cfgmgr = DeviceGlobalCfgMgr(common_objs, "CONFIG_DB", swsscommon.CFG_BGP_DEVICE_GLOBAL_TABLE_NAME)
+        self.pushed = {}  # entity -> (commands, generation of the configuration they were pushed to)
 
     def update(self, name, **kwargs):
         """
@@ -47,7 +46,7 @@ class BGPPeerGroupMgr(object):
         except jinja2.TemplateError as e:
             log_err("Can't render policy template name: '%s': %s" % (name, str(e)))
             return False
-        self.update_entity(policy, "Routing policy for peer '%s'" % name)
+        self.update_entity(policy, "Routing policy for peer '%s'" % name, "policy")
         return True
 
     def update_pg(self, name, **kwargs):
@@ -67,16 +66,23 @@ class BGPPeerGroupMgr(object):
             cmd = ('router bgp %s\n' % kwargs['bgp_asn']) + pg + tsa_rm
         else:
             cmd = ('router bgp %s vrf %s\n' % (kwargs['bgp_asn'], kwargs['vrf'])) + pg + tsa_rm
-        self.update_entity(cmd, "Peer-group for peer '%s'" % name)
+        self.update_entity(cmd, "Peer-group for peer '%s'" % name, ("peer-group", kwargs['vrf']))
         return True
 
-    def update_entity(self, cmd, txt):
+    def update_entity(self, cmd, txt, entity=None):
         """
         Send commands to FRR
         :param cmd: commands to send in a raw form
         :param txt: text for the syslog output
+        :param entity: the configured entity. The commands aren't sent again, if they were sent for the entity already
         :return:
         """
+        if entity is not None:
+            pushed = (cmd, self.cfg_mgr.generation)
+            if self.pushed.get(entity) == pushed:
+                log_debug("%s is up to date" % txt)
+                return True
+            self.pushed[entity] = pushed
         self.cfg_mgr.push(cmd)
         log_info("%s has been scheduled to be updated" % txt)
         return True
@@ -138,7 +144,9 @@ class BGPPeerMgrBase(Manager):
             table_name,
         )
 
-        self.peers = self.load_peers()
+        self.peer_inventory = common_objs.get('peer_inventory')
+        self.peers_generation = self.cfg_mgr.generation
+        self.peers = self.peer_inventory.get_peers() if self.peer_inventory is not None else self.load_peers()
         self.peer_group_mgr = BGPPeerGroupMgr(self.common_objs, base_template)
         return
 
@@ -150,7 +158,7 @@ class BGPPeerMgrBase(Manager):
         """
         vrf, nbr = self.split_key(key)
         peer_key = (vrf, nbr)
-        if peer_key not in self.peers:
+        if peer_key not in self.get_peers():
             return self.add_peer(vrf, nbr, data)
         else:
             return self.update_peer(vrf, nbr, data)
@@ -285,7 +293,7 @@ class BGPPeerMgrBase(Manager):
         """
         vrf, nbr = self.split_key(key)
         peer_key = (vrf, nbr)
-        if peer_key not in self.peers:
+        if peer_key not in self.get_peers():
             log_warn("Peer '(%s|%s)' has not been found" % (vrf, nbr))
             return
         cmd = self.templates["delete"].render(neighbor_addr=nbr)
@@ -372,30 +380,72 @@ class BGPPeerMgrBase(Manager):
         else:
             return tuple(key.split('|', 1))
 
-    @staticmethod
-    def load_peers():
+    def get_peers(self):
+        """
+        Get peers installed in FRR. The peers are reloaded after the running configuration was
+        resynced or a push to FRR has failed, as the peers added or removed before may be not in FRR.
+        The reload waits for the pending changes to be committed: a resync in between rereads FRR,
+        which doesn't have the peers pushed since the last commit yet
+        :return: set of (vrf, peer address) pairs
+        """
+        if self.peers_generation != self.cfg_mgr.generation and not self.cfg_mgr.has_changes():
+            self.peers_generation = self.cfg_mgr.generation
+            if self.peer_inventory is not None:
+                self.peer_inventory.refresh(self.peers_generation)
+                self.peers = self.peer_inventory.get_peers()
+            else:
+                self.peers = self.load_peers()
+        return self.peers
+
+    def load_peers(self):
         """
         Load peers from FRR.
         :return: set of peers, which are already installed in FRR
         """
-        command = ["vtysh", "-c", "show bgp vrfs json"]
-        ret_code, out, err = run_command(command)
-        if ret_code == 0:
-            js_vrf = json.loads(out)
-            vrfs = js_vrf['vrfs'].keys()
-        else:
-            log_crit("Can't read bgp vrfs: %s" % err)
-            raise Exception("Can't read bgp vrfs: %s" % err)
-        peers = set()
-        for vrf in vrfs:
-            command = ["vtysh", "-c", 'show bgp vrf %s neighbors json' % str(vrf)]
-            ret_code, out, err = run_command(command)
-            if ret_code == 0:
-                js_bgp = json.loads(out)
-                for nbr in js_bgp.keys():
-                    peers.add((vrf, nbr))
-            else:
-                log_crit("Can't read vrf '%s' neighbors: %s" % (vrf, str(err)))
-                raise Exception("Can't read vrf '%s' neighbors: %s" % (vrf, str(err)))
+        return BGPPeerInventory.load(self.cfg_mgr)
+
 
-        return peers
+class BGPPeerInventory(object):
+    """
+    Peers installed in FRR. One inventory is shared by all peer managers of the process,
+    so the peers are collected once, not once per manager
+    """
+    def __init__(self, cfg_mgr):
+        """
+        Initialize the object
+        :param cfg_mgr: ConfigMgr. The peers are read from its model of the running configuration
+        """
+        self.cfg_mgr = cfg_mgr
+        self.peers = None
+        self.generation = None  # generation of the running configuration the peers were loaded for
+
+    def get_peers(self):
+        """
+        Get peers installed in FRR. They are loaded from FRR on the first call and after refresh()
+        :return: set of (vrf, peer address) pairs. The caller owns the set
+        """
+        if self.peers is None:
+            self.peers = self.load(self.cfg_mgr)
+        return set(self.peers)
+
+    def refresh(self, generation=None):
+        """
+        Reload the peers from FRR on the next get_peers() call. Managers call it with the generation
+        of the running configuration, so the peers are reloaded once per generation, not once per manager
+        :param generation: generation of the running configuration. None to reload unconditionally
+        """
+        if generation is not None and generation == self.generation:
+            return
+        self.generation = generation
+        self.peers = None
+
+    @staticmethod
+    def load(cfg_mgr):
+        """
+        Load peers of all vrfs from the running configuration. It lists every configured peer,
+        including the peers which are shut down or never came up, without asking FRR for their state
+        :param cfg_mgr: ConfigMgr
+        :return: set of (vrf, peer address) pairs
+        """
+        cfg_mgr.update()
+        return cfg_mgr.get_model().get_peers()
@@ -25,6 +25,8 @@ class StaticRouteMgr(Manager):
         self.directory.subscribe([("CONFIG_DB", swsscommon.CFG_DEVICE_METADATA_TABLE_NAME, "localhost/bgp_asn"),], self.on_bgp_asn_change)
         self.static_routes = {}
         self.vrf_pending_redistribution = set()
+        # Routes in APPL_DB are deleted when they are not refreshed in time
+        self.timer = common_objs.get('static_route_timer') if db == "APPL_DB" else None
 
     OP_DELETE = 'DELETE'
     OP_ADD = 'ADD'
@@ -32,6 +34,8 @@ class StaticRouteMgr(Manager):
     ROUTE_ADVERTISE_DISABLE_TAG = '2'
 
     def set_handler(self, key, data):
+        if self.timer is not None:
+            self.timer.schedule(key, data)
         vrf, ip_prefix = self.split_key(key)
         is_ipv6 = TemplateFabric.is_ipv6(ip_prefix)
 
@@ -70,6 +74,8 @@ class StaticRouteMgr(Manager):
 
 
     def del_handler(self, key):
+        if self.timer is not None:
+            self.timer.unschedule(key)
         vrf, ip_prefix = self.split_key(key)
         is_ipv6 = TemplateFabric.is_ipv6(ip_prefix)
 
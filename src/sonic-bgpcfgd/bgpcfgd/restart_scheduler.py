@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+
+from .log import log_debug
+
+
+class PeerGroupRestartScheduler(object):
+    """
+    Rate limit the soft restarts of peer-groups.
+    A peer-group is restarted at once, if it wasn't restarted during the hold-down window.
+    Otherwise all the requests to restart it are merged into one restart at the end of the window.
+    At most max_concurrent peer-groups are restarted at a time, the rest are left pending until the next run
+    """
+    HOLD_DOWN = 10      # seconds
+    MAX_CONCURRENT = 4  # peer-groups
+    STATE_DB_KEY = "BGP_PEER_GROUP_RESTART|global"
+
+    def __init__(self, frr, hold_down=HOLD_DOWN, max_concurrent=MAX_CONCURRENT, state_db=None):
+        """
+        Initialize the object
+        :param frr: FRR proxy
+        :param hold_down: minimal number of seconds between two restarts of a peer-group
+        :param max_concurrent: maximal number of peer-groups restarted at a time
+        :param state_db: SonicV2Connector connected to STATE_DB. The counters are written there, if it's set
+        """
+        self.frr = frr
+        self.hold_down = hold_down
+        self.max_concurrent = max(max_concurrent, 1)
+        self.state_db = state_db
+        self.pending = OrderedDict()  # peer-group -> time of the first request to restart it
+        self.last_restart = {}        # peer-group -> time of its last restart
+        self.counters = {
+            'pending': 0,     # peer-groups waiting for restart
+            'issued': 0,      # restarts sent to FRR
+            'suppressed': 0,  # requests merged into a pending restart
+        }
+        self.published = None
+
+    def schedule(self, peer_groups, now=None):
+        """
+        Request restart of peer-groups
+        :param peer_groups: list of peer-groups
+        :param now: current time. time.monotonic() by default
+        """
+        now = time.monotonic() if now is None else now
+        for peer_group in peer_groups:
+            if peer_group in self.pending:
+                self.counters['suppressed'] += 1
+            else:
+                self.pending[peer_group] = now
+        self.counters['pending'] = len(self.pending)
+
+    def run(self, now=None):
+        """
+        Restart the pending peer-groups, which hold-down window is over
+        :param now: current time. time.monotonic() by default
+        :return: True if all the restarts were successful, False otherwise
+        """
+        now = time.monotonic() if now is None else now
+        self.last_restart = {pg: t for pg, t in self.last_restart.items() if now - t < self.hold_down}
+        due = [pg for pg in self.pending if pg not in self.last_restart][:self.max_concurrent]
+        res = True
+        if due:
+            for peer_group in due:
+                del self.pending[peer_group]
+                self.last_restart[peer_group] = now
+            log_debug("PeerGroupRestartScheduler: restart %s, %d left pending" % (due, len(self.pending)))
+            res = self.frr.restart_peer_groups(due)
+            self.counters['issued'] += len(due)
+            self.counters['pending'] = len(self.pending)
+        self.publish()
+        return res
+
+    def publish(self):
+        """ Write the counters into STATE_DB, if they were changed """
+        if self.state_db is None or self.counters == self.published:
+            return
+        self.state_db.hmset(self.state_db.STATE_DB, self.STATE_DB_KEY, {k: str(v) for k, v in self.counters.items()})
+        self.published = dict(self.counters)
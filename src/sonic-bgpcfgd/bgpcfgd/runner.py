@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from swsscommon import swsscommon
 
 from .log import log_debug, log_crit
@@ -20,13 +20,24 @@ class Runner(object):
     """
     SELECT_TIMEOUT = 1000
 
-    def __init__(self, cfg_manager):
-        """ Constructor """
+    def __init__(self, cfg_manager, directory=None):
+        """
+        Constructor
+        :param cfg_manager: ConfigMgr object, committed after each batch of events
+        :param directory: Directory object. Its notifications are held while a batch of events
+                          is processed and delivered once per handler at the end of the batch
+        """
         self.cfg_manager = cfg_manager
+        self.directory = directory
         self.db_connectors = {}
         self.selector = swsscommon.Select()
         self.callbacks = defaultdict(lambda: defaultdict(list))  # db -> table -> handlers[]
         self.subscribers = set()
+        self.known_keys = defaultdict(set)  # (db, table) -> keys the managers received a 'SET' for
+        self.counters = {
+            'received': 0,  # events read from the db
+            'applied': 0,   # events passed to the managers after coalescing
+        }
 
     def add_manager(self, manager):
         """
@@ -53,18 +64,80 @@ class Runner(object):
         while g_run:
             state, _ = self.selector.select(Runner.SELECT_TIMEOUT)
             if state == self.selector.TIMEOUT:
+                if not self.cfg_manager.restart_pending_peer_groups():
+                    log_crit("Runner::restart of peer-groups was unsuccessful")
                 continue
             elif state == self.selector.ERROR:
                 raise Exception("Received error from select")
 
-            for subscriber in self.subscribers:
-                while True:
-                    key, op, fvs = subscriber.pop()
-                    if not key:
-                        break
-                    log_debug("Received message : '%s'" % str((key, op, fvs)))
-                    for callback in self.callbacks[subscriber.getDbConnector().getDbId()][subscriber.getTableName()]:
-                        callback(key, op, dict(fvs))
+            # Retries of the queued entries of the managers (Manager.on_deps_change) run once per batch,
+            # the handlers which cache state, as the bgp_asn or switch_type, are still run right away
+            if self.directory is not None:
+                self.directory.hold_notifications()
+            try:
+                for subscriber in self.subscribers:
+                    self.process_subscriber(subscriber)
+            finally:
+                if self.directory is not None:
+                    self.directory.release_notifications()
             rc = self.cfg_manager.commit()
             if not rc:
                 log_crit("Runner::commit was unsuccessful")
+
+    def process_subscriber(self, subscriber):
+        """
+        Drain all pending events of the table and pass them to its managers,
+        coalesced to one event per key
+        :param subscriber: SubscriberStateTable object
+        """
+        events = []
+        while True:
+            popped = subscriber.pops()
+            if not popped:
+                break
+            events.extend(popped)
+        if not events:
+            return
+        db, table = subscriber.getDbConnector().getDbId(), subscriber.getTableName()
+        coalesced = self.coalesce(events, self.known_keys[(db, table)])
+        self.counters['received'] += len(events)
+        self.counters['applied'] += len(coalesced)
+        log_debug("Table '%s': received %d events, applying %d" % (table, len(events), len(coalesced)))
+        callbacks = self.callbacks[db][table]
+        for key, op, fvs in coalesced:
+            log_debug("Received message : '%s'" % str((key, op, fvs)))
+            for callback in callbacks:
+                callback(key, op, dict(fvs))
+
+    @staticmethod
+    def coalesce(events, known_keys=None):
+        """
+        Collapse the events of each key to its final state.
+        A 'DEL' followed by a 'SET' is kept as both events: managers don't update all
+        the attributes of an existing entry, the entry has to be recreated.
+        A 'DEL' is only passed for a key the managers received a 'SET' for, or when
+        it is the first event of the key: a key set and deleted within the batch is dropped.
+        Keys are ordered by their first event.
+        :param events: list of (key, op, fvs) in the order they were received
+        :param known_keys: set of the keys the managers received a 'SET' for, updated
+        :return: list of (key, op, fvs) to apply
+        """
+        if known_keys is None:
+            known_keys = set()
+        batches = OrderedDict()  # key -> [(op, fvs)]
+        for key, op, fvs in events:
+            batches.setdefault(key, []).append((op, fvs))
+        coalesced = []
+        for key, ops in batches.items():
+            deleted = key in known_keys or ops[0][0] == swsscommon.DEL_COMMAND
+            op, fvs = ops[-1]
+            if op == swsscommon.DEL_COMMAND:
+                known_keys.discard(key)
+                if deleted:
+                    coalesced.append((key, op, fvs))
+                continue
+            if deleted and any(o == swsscommon.DEL_COMMAND for o, _ in ops):
+                coalesced.append((key, swsscommon.DEL_COMMAND, ()))
+            coalesced.append((key, op, fvs))
+            known_keys.add(key)
+        return coalesced
@@ -1,18 +1,44 @@
 from .log import log_err, log_info, log_debug
 from swsscommon import swsscommon
+import heapq
+import threading
 import time
 
 class StaticRouteTimer(object):
-    """ This class checks the static routes and deletes those entries that have not been refreshed """
+    """ This class checks the static routes and deletes those entries that have not been refreshed.
+        A route is checked when the expiry time has passed since it was written or checked last time """
     def __init__(self):
         self.db = swsscommon.SonicV2Connector()
         self.db.connect(self.db.APPL_DB)
+        self.expire_script_sha = None
         self.timer = None
-        self.start = None
+        self.deadlines = {}  # key of the route in APPL_DB -> time to check the route
+        self.heap = []       # (deadline, key) for the routes. Entries which don't match self.deadlines are stale
+        self.cond = threading.Condition()
 
     DEFAULT_TIMER = 180
-    DEFAULT_SLEEP = 60
     MAX_TIMER     = 1800
+    TABLE_PREFIX  = "STATIC_ROUTE:"
+    SCAN_COUNT    = 1000
+    EXPIRE_BATCH_MAX_COUNT = 100
+    # Check the routes given as KEYS and atomically delete the ones which were not refreshed, and clear the
+    # refresh flag of the others. Routes removed or set to never expire meanwhile are left alone.
+    # Returns the keys of the refreshed routes
+    EXPIRE_SCRIPT = """
+local refreshed = {}
+for _, key in ipairs(KEYS) do
+    local route = redis.call('HMGET', key, 'refresh', 'expiry')
+    if route[2] ~= 'false' and redis.call('EXISTS', key) == 1 then
+        if route[1] == 'true' then
+            redis.call('HSET', key, 'refresh', 'false')
+            table.insert(refreshed, key)
+        else
+            redis.call('DEL', key)
+        end
+    end
+end
+return refreshed
+"""
 
     def set_timer(self):
         """ Check for custom route expiry time in STATIC_ROUTE_EXPIRY_TIME """
@@ -26,33 +52,123 @@ class StaticRouteTimer(object):
                 log_err("Custom static route expiry time of {}s is invalid!".format(timer))
         return
 
+    def update_timer(self):
+        """ Reread the route expiry time. The times to check the routes are moved, when it has changed """
+        timer = self.get_timer()
+        self.set_timer()
+        if self.get_timer() != timer:
+            log_info("Static route expiry set to {}s".format(self.get_timer()))
+            self.rescale(timer, self.get_timer())
+
+    def get_timer(self):
+        """ Return the route expiry time in seconds """
+        return self.timer if self.timer else self.DEFAULT_TIMER
+
+    def push(self, key, deadline, replace=True):
+        """
+        Set the time to check a route
+        :param key: key of the route in APPL_DB
+        :param deadline: time to check the route
+        :param replace: replace the time the route is already checked at
+        """
+        with self.cond:
+            if not replace and key in self.deadlines:
+                return
+            self.deadlines[key] = deadline
+            if len(self.heap) > 2 * len(self.deadlines) + self.SCAN_COUNT:
+                # drop the stale entries of the routes which were updated or removed
+                self.heap = [(d, k) for k, d in self.deadlines.items()]
+                heapq.heapify(self.heap)
+            else:
+                heapq.heappush(self.heap, (deadline, key))
+            if self.heap[0] == (deadline, key):
+                self.cond.notify()
+
+    def rescale(self, old_timer, new_timer):
+        """
+        Move the time to check the routes by the change of the route expiry time
+        :param old_timer: route expiry time the routes were scheduled with
+        :param new_timer: new route expiry time
+        """
+        shift = new_timer - old_timer
+        with self.cond:
+            self.deadlines = {key: deadline + shift for key, deadline in self.deadlines.items()}
+            self.heap = [(d, k) for k, d in self.deadlines.items()]
+            heapq.heapify(self.heap)
+
+    def schedule(self, key, data):
+        """
+        Restart the expiry timer of a route, when the route is written to APPL_DB
+        :param key: key of the route in the STATIC_ROUTE table
+        :param data: data of the route
+        """
+        if data.get("expiry") == "false":
+            self.unschedule(key)
+        else:
+            self.push(self.TABLE_PREFIX + key, time.time() + self.get_timer())
+
+    def unschedule(self, key):
+        """
+        Stop the expiry timer of a route, when the route is removed from APPL_DB
+        :param key: key of the route in the STATIC_ROUTE table
+        """
+        with self.cond:
+            self.deadlines.pop(self.TABLE_PREFIX + key, None)
+
+    def scan(self):
+        """ Start the expiry timers of the static routes found in APPL_DB. SCAN doesn't block redis like KEYS """
+        deadline = time.time() + self.get_timer()
+        cursor = 0
+        while True:
+            cursor, keys = self.db.scan(self.db.APPL_DB, cursor, self.TABLE_PREFIX + "*", self.SCAN_COUNT)
+            for key in keys:
+                self.push(key, deadline, replace=False)
+            if cursor == 0:
+                break
+
+    def expire_routes(self, keys):
+        """
+        Delete the routes which were not refreshed and clear the refresh flag of the others, in one atomic script
+        :param keys: keys of the routes in APPL_DB
+        :return: keys of the refreshed routes
+        """
+        client = self.db.get_redis_client(self.db.APPL_DB)
+        if self.expire_script_sha is None:
+            self.expire_script_sha = swsscommon.loadRedisScript(client, self.EXPIRE_SCRIPT)
+        return swsscommon.runRedisScript(client, self.expire_script_sha, keys, [])
+
     def alarm(self):
-        """ Clear unrefreshed static routes """
-        static_routes = self.db.keys(self.db.APPL_DB, "STATIC_ROUTE:*")
-        if static_routes is not None:
-            for sr in static_routes:
-                expiry = self.db.get(self.db.APPL_DB, sr, "expiry")
-                if expiry == "false":
-                    continue
-                refresh = self.db.get(self.db.APPL_DB, sr, "refresh")
-                if refresh == "true":
-                    self.db.set(self.db.APPL_DB, sr, "refresh", "false")
-                    log_debug("Refresh status of static route {} is set to false".format(sr))
-                else:
-                    self.db.delete(self.db.APPL_DB, sr)
-                    log_debug("Static route {} deleted".format(sr))
-        self.start = time.time()
+        """ Clear unrefreshed static routes, whose expiry time has passed """
+        now = time.time()
+        expired = []
+        with self.cond:
+            while self.heap and self.heap[0][0] <= now:
+                deadline, key = heapq.heappop(self.heap)
+                if self.deadlines.get(key) == deadline:
+                    del self.deadlines[key]
+                    expired.append(key)
+        for i in range(0, len(expired), self.EXPIRE_BATCH_MAX_COUNT):
+            batch = expired[i:i + self.EXPIRE_BATCH_MAX_COUNT]
+            refreshed = set(self.expire_routes(batch))
+            for sr in refreshed:
+                # the route could have been written again meanwhile, keep its new timer
+                self.push(sr, now + self.get_timer(), replace=False)
+                log_debug("Refresh status of static route {} is set to false".format(sr))
+            log_debug("Checked {} expired static routes, {} were refreshed".format(len(batch), len(refreshed)))
         return
 
     def run(self):
-        self.start = time.time()
+        self.set_timer()
+        log_info("Static route expiry set to {}s".format(self.get_timer()))
+        self.scan()
         while True:
-            self.set_timer()
-            if self.timer:
-                log_info("Static route expiry set to {}s".format(self.timer))
-                time.sleep(self.timer)
-                self.alarm()
-            else:
-                time.sleep(self.DEFAULT_SLEEP)
-                if time.time() - self.start >= self.DEFAULT_TIMER:
-                    self.alarm()
\ No newline at end of file
+            with self.cond:
+                # sleep until the next route expires, or an earlier expiry time is set.
+                # Wake up at least once per expiry time to notice a change of the expiry time
+                timeout = self.get_timer()
+                if self.heap:
+                    timeout = min(timeout, self.heap[0][0] - time.time())
+                if timeout > 0:
+                    self.cond.wait(timeout)
+            self.update_timer()
+            self.alarm()
@@ -2,22 +2,37 @@ from collections import OrderedDict
 from functools import partial
 
 import jinja2
+import jinja2.meta
 import netaddr
 
 from .log import log_err
 
+try:
+    # The compiled template cache is shared with sonic-cfggen
+    from template_cache import get_bytecode_cache
+except ImportError:
+    get_bytecode_cache = None
+
 class TemplateFabric(object):
     """ Fabric for rendering jinja2 templates """
-    def __init__(self, template_path = '/usr/share/sonic/templates'):
+    def __init__(self, template_path = '/usr/share/sonic/templates', use_cache=False):
+        """
+        Initialize the object
+        :param template_path: path to the directory with the templates
+        :param use_cache: store compiled templates in the sonic-cfggen template cache,
+                          when it is enabled by SONIC_J2_CACHE_DIR
+        """
         j2_template_paths = [template_path]
         j2_loader = jinja2.FileSystemLoader(j2_template_paths)
-        j2_env = jinja2.Environment(loader=j2_loader, trim_blocks=False)
+        bytecode_cache = get_bytecode_cache() if use_cache and get_bytecode_cache is not None else None
+        j2_env = jinja2.Environment(loader=j2_loader, trim_blocks=False, bytecode_cache=bytecode_cache)
         j2_env.filters['ipv4'] = self.is_ipv4
         j2_env.filters['ipv6'] = self.is_ipv6
         j2_env.filters['pfx_filter'] = self.pfx_filter
         for attr in ['ip', 'network', 'prefixlen', 'netmask']:
             j2_env.filters[attr] = partial(self.prefix_attr, attr)
         self.env = j2_env
+        self.memoized = {}
 
     def from_file(self, filename):
         """
@@ -27,6 +42,39 @@ class TemplateFabric(object):
         """
         return self.env.get_template(filename)
 
+    def from_file_memoized(self, filename):
+        """
+        Read a template from a file. The template is shared by all its users
+        :param filename: filename of the file. Type String
+        :return: MemoizedTemplate object
+        """
+        if filename not in self.memoized:
+            self.memoized[filename] = MemoizedTemplate(self.from_file(filename), self.find_variables(filename))
+        return self.memoized[filename]
+
+    def find_variables(self, filename):
+        """
+        Find the top level variables used by a template and by the templates it includes, imports or extends
+        :param filename: filename of the template. Type String
+        :return: set of variable names. None if a referenced template is only known at render time
+        """
+        variables = set()
+        pending = [filename]
+        seen = set()
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            ast = self.env.parse(self.env.loader.get_source(self.env, name)[0])
+            variables |= jinja2.meta.find_undeclared_variables(ast)
+            for reference in jinja2.meta.find_referenced_templates(ast):
+                if reference is None:
+                    log_err("Template '%s' references a template dynamically. Its output isn't memoized" % name)
+                    return None
+                pending.append(reference)
+        return variables
+
     def from_string(self, tmpl):
         """
         Read a template from a string
@@ -106,3 +154,58 @@ class TemplateFabric(object):
             else:
                 table[key] = val
         return table
+
+
+class MemoizedTemplate(object):
+    """ Jinja2 template, which output is memoized by the values of the variables the template refers to """
+    CACHE_SIZE = 64
+
+    def __init__(self, template, variables, cache_size=CACHE_SIZE):
+        """
+        Initialize the object
+        :param template: Jinja2 template object
+        :param variables: names of the variables the template and the templates it refers to use.
+                          None to render the template every time
+        :param cache_size: number of outputs to keep
+        """
+        self.template = template
+        self.variables = sorted(variables) if variables is not None else None
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # key of the rendering parameters -> output. Least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, **kwargs):
+        """
+        Render the template, if it wasn't rendered with the same values of its variables recently
+        :param kwargs: dictionary with parameters for rendering
+        :return: rendered text
+        """
+        if self.variables is None:
+            return self.template.render(**kwargs)
+        key = tuple((name, self.freeze(kwargs.get(name))) for name in self.variables)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        output = self.template.render(**kwargs)
+        self.cache[key] = output
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return output
+
+    @classmethod
+    def freeze(cls, value):
+        """
+        Convert a rendering parameter into a hashable value
+        :param value: the parameter
+        :return: hashable representation of the value
+        """
+        if isinstance(value, dict):
+            return tuple(sorted(((repr(k), cls.freeze(v)) for k, v in value.items()), key=lambda item: item[0]))
+        if isinstance(value, (list, tuple)):
+            return tuple(cls.freeze(v) for v in value)
+        if isinstance(value, (set, frozenset)):
+            return frozenset(cls.freeze(v) for v in value)
+        return repr(value)
@@ -12,10 +12,22 @@ Description: bgpmon.py -- populating bgp related information in stateDB.
 
     The script check if there are any bgp activities by monitoring the bgp
     frr.log file timestamp.  If activity is detected, then it will request bgp
-    neighbor state via vtysh cli interface. This bgp activity monitoring is
-    done periodically (every 15 second). When triggered, it looks specifically
-    for the neighbor state in the json output of show ip bgp neighbors json
-    and update the state DB for each neighbor accordingly.
+    neighbor state of all vrfs through a persistent connection to the vty of
+    bgpd (vtysh is used if bgpd can't be reached). The activity is checked
+    every poll interval. The interval is reset to its minimum when neighbors
+    changed state, appeared or disappeared, and doubles up to its maximum
+    otherwise: prefix and flap counter churn does not keep the poll fast.
+    The neighbors are also polled, when nothing was polled for the maximum
+    interval. Neighbors whose counters changed without a state change are
+    only written once per maximum interval.
+    When triggered, it reads the neighbor state, uptime, prefix counts and
+    flap counts in the json output of show bgp vrf all summary json and
+    update the state DB for each neighbor accordingly. The state of the
+    neighbors of the default vrf is written into NEIGH_STATE_TABLE, the
+    neighbors of all vrfs with their counters are written into
+    BGP_NEIGH_STATE_TABLE. The delay between
+    a neighbor state change in bgpd and its update in the state DB is
+    written into the BGPMON_STATS table.
     In order to not disturb and hold on to the State DB access too long and
     removal of the stale neighbors (neighbors that was there previously on
     previous get request but no longer there in the current get request), a
@@ -23,6 +35,7 @@ Description: bgpmon.py -- populating bgp related information in stateDB.
     is a need to perform update or the peer is stale to be removed from the
     state DB
 """
+import argparse
 import json
 import os
 import syslog
@@ -30,29 +43,53 @@ from swsscommon import swsscommon
 import time
 from sonic_py_common.general import getstatusoutput_noshell
 
+from bgpcfgd.frr import VtyClient
+
 PIPE_BATCH_MAX_COUNT = 50
+MIN_POLL_INTERVAL = 1   # seconds
+MAX_POLL_INTERVAL = 15  # seconds
+STATS_KEY = "BGPMON_STATS|neighbor_state"
+STATE_TABLE = "NEIGH_STATE_TABLE"          # <ip> -> state, neighbors of the default vrf
+VRF_STATE_TABLE = "BGP_NEIGH_STATE_TABLE"  # <vrf>|<ip> -> vrf, state and counters, neighbors of all vrfs
+
+# Neighbor fields in the output of show bgp summary json -> NEIGH_STATE_TABLE fields
+PEER_FIELDS = [
+    ("peerUptimeEstablishedEpoch", "established_epoch"),
+    ("connectionsDropped", "flaps"),
+]
+# Fields of the address-families of a neighbor, prefixed by the address-family
+PEER_AF_FIELDS = [
+    ("pfxRcd", "prefixes_received"),
+    ("pfxSnt", "prefixes_sent"),
+]
+ADDRESS_FAMILIES = {"ipv4Unicast": "ipv4", "ipv6Unicast": "ipv6"}
 
 class BgpStateGet:
-    def __init__(self):
-        # set peer_l stores the Neighbor peer Ip address
+    def __init__(self, vty_dir=None):
+        # set peer_l stores the Neighbor peer keys: (vrf, Ip address)
         # dic peer_state stores the Neighbor peer state entries
-        # set new_peer_l stores the new snapshot of Neighbor peer ip address
+        # set new_peer_l stores the new snapshot of Neighbor peer keys
         # dic new_peer_state stores the new snapshot of Neighbor peer states
+        # dic new_peer_uptime stores milliseconds since the last state change of the Neighbor peers
         self.peer_l = set()
         self.peer_state = {}
         self.new_peer_l = set()
         self.new_peer_state = {}
+        self.new_peer_uptime = {}
         self.cached_timestamp = 0
+        self.max_latency = 0
+        self.vty = VtyClient("bgpd", vty_dir)
         self.db = swsscommon.SonicV2Connector()
         self.db.connect(self.db.STATE_DB, False)
         self.pipe = swsscommon.RedisPipeline(self.db.get_redis_client(self.db.STATE_DB))
         self.db.delete_all_by_pattern(self.db.STATE_DB, "NEIGH_STATE_TABLE|*" )
+        self.db.delete_all_by_pattern(self.db.STATE_DB, "%s|*" % VRF_STATE_TABLE)
 
     # A quick way to check if there are anything happening within BGP is to
     # check its log file has any activities. This is by checking its modified
     # timestamp against the cached timestamp that we keep and if there is a
     # difference, there is activity detected. In case the log file got wiped
-    # out, it will default back to constant pulling every 15 seconds
+    # out, it will default back to constant pulling every poll interval
     def bgp_activity_detected(self):
         try:
             timestamp = os.stat("/var/log/frr/frr.log").st_mtime
@@ -64,27 +101,46 @@ class BgpStateGet:
         except (IOError, OSError):
             return True
 
-    def update_new_peer_states(self, peer_dict):
-        peer_l = peer_dict["peers"].keys()
-        self.new_peer_l.update(peer_l)
-        for peer in peer_l:
-            self.new_peer_state[peer] = peer_dict["peers"][peer]["state"]
+    # Run a show command on bgpd. The persistent vty connection is used when bgpd can be reached
+    def run_command(self, command):
+        reply = self.vty.execute(command)
+        if reply is not None and reply[0] == 0:
+            return 0, reply[1]
+        return getstatusoutput_noshell(["vtysh", "-c", command])
 
-    # Get a new snapshot of BGP neighbors and store them in the "new" location
+    def update_new_peer_states(self, vrf, af, peer_dict):
+        for peer, info in peer_dict.get("peers", {}).items():
+            key = (vrf, peer)
+            self.new_peer_l.add(key)
+            state = self.new_peer_state.setdefault(key, {"vrf": vrf})
+            state["state"] = info["state"]
+            for name, field in PEER_FIELDS:
+                if name in info:
+                    state[field] = str(info[name])
+            for name, field in PEER_AF_FIELDS:
+                if name in info:
+                    state["%s_%s" % (af, field)] = str(info[name])
+            if "peerUptimeMsec" in info:
+                self.new_peer_uptime[key] = info["peerUptimeMsec"]
+
+    # Get a new snapshot of BGP neighbors of all vrfs and store them in the "new" location
     def get_all_neigh_states(self):
-        cmd = ["vtysh", "-c", 'show bgp summary json']
-        rc, output = getstatusoutput_noshell(cmd)
+        cmd = "show bgp vrf all summary json"
+        rc, output = self.run_command(cmd)
         if rc:
             syslog.syslog(syslog.LOG_ERR, "*ERROR* Failed with rc:{} when execute: {}".format(rc, cmd))
-            return
+            return False
 
         peer_info = json.loads(output)
         # cmd ran successfully, safe to Clean the "new" set/dict for new snapshot
         self.new_peer_l.clear()
         self.new_peer_state.clear()
-        for key, value in peer_info.items():
-            if key == "ipv4Unicast" or key == "ipv6Unicast":
-                self.update_new_peer_states(value)
+        self.new_peer_uptime.clear()
+        for vrf, vrf_info in peer_info.items():
+            for key, value in vrf_info.items():
+                if key in ADDRESS_FAMILIES:
+                    self.update_new_peer_states(vrf, ADDRESS_FAMILIES[key], value)
+        return True
 
     # This method will take the caller's dictionary which contains the peer state operation
     # That need to be updated in StateDB using Redis pipeline.
@@ -96,9 +152,9 @@ class BgpStateGet:
             {
                 'NEIGH_STATE_TABLE|ip_address_a': {'state':state},
                 'NEIGH_STATE_TABLE|ip_address_b': {'state':state},
-                'NEIGH_STATE_TABLE|ip_address_c': {'state':state},
+                'BGP_NEIGH_STATE_TABLE|vrf|ip_address_c': {'vrf':vrf, 'state':state, 'flaps':flaps, ...},
                 'NEIGH_STATE_TABLE|ip_address_x': None,
-                'NEIGH_STATE_TABLE|ip_address_z': None
+                'BGP_NEIGH_STATE_TABLE|vrf|ip_address_z': None
                 ...
             }
         """
@@ -117,33 +173,57 @@ class BgpStateGet:
         self.pipe.flush()
         data.clear()
 
-    def update_neigh_states(self):
+    def update_neigh_states(self, publish_counters=True):
+        """Write changed neighbors into State DB
+        Args:
+            publish_counters: write the neighbors which only counters have changed too
+        Returns:
+            a tuple: number of neighbors which state has changed, which were added or removed,
+            list of keys of the neighbors which state has changed
+        """
         data = {}
+        changed = 0
+        state_changed = []
         for peer in self.new_peer_l:
-            key = "NEIGH_STATE_TABLE|%s" % peer
+            vrf, ip = peer
+            key = "%s|%s" % (STATE_TABLE, ip)
+            vrf_key = "%s|%s|%s" % (VRF_STATE_TABLE, vrf, ip)
+            state = self.new_peer_state[peer]
             if peer in self.peer_l:
                 # only update the entry if state changed
-                if self.peer_state[peer] != self.new_peer_state[peer]:
+                if self.peer_state[peer]["state"] != state["state"]:
                     # state changed. Update state DB for this entry
-                    state = self.new_peer_state[peer]
-                    data[key] = {'state':state}
+                    state_changed.append(peer)
+                    if vrf == "default":
+                        data[key] = {'state':state["state"]}
+                    data[vrf_key] = state
+                    self.peer_state[peer] = state
+                    changed += 1
+                elif self.peer_state[peer] != state and publish_counters:
+                    # only counters changed, they are written on the slower cadence
+                    data[vrf_key] = state
                     self.peer_state[peer] = state
                 # remove this neighbor from old set since it is accounted for
                 self.peer_l.remove(peer)
             else:
                 # New neighbor found case. Add to dictionary and state DB
-                state = self.new_peer_state[peer]
-                data[key] = {'state':state}
+                if vrf == "default":
+                    data[key] = {'state':state["state"]}
+                data[vrf_key] = state
                 self.peer_state[peer] = state
+                changed += 1
             if len(data) > PIPE_BATCH_MAX_COUNT:
                 self.flush_pipe(data)
         # Check for stale state entries to be cleaned up
         for peer in self.peer_l:
             # remove this from the stateDB and the current neighbor state entry
-            del_key = "NEIGH_STATE_TABLE|%s" % peer
-            data[del_key] = None
+            vrf, ip = peer
+            if vrf == "default":
+                data["%s|%s" % (STATE_TABLE, ip)] = None
+            data["%s|%s|%s" % (VRF_STATE_TABLE, vrf, ip)] = None
             if peer in self.peer_state:
                 del self.peer_state[peer]
+            changed += 1
             if len(data) > PIPE_BATCH_MAX_COUNT:
                 self.flush_pipe(data)
         # If anything in the pipeline not yet flushed, flush them now
@@ -151,8 +231,50 @@ class BgpStateGet:
             self.flush_pipe(data)
         # Save the new set
         self.peer_l = self.new_peer_l.copy()
+        return changed, state_changed
+
+    def update_latency(self, state_changed, poll_start):
+        """Write the delay between neighbor state changes in bgpd and their update in State DB
+        Args:
+            state_changed: keys of the neighbors which state has changed
+            poll_start: time.monotonic() when the neighbors were read from bgpd
+        """
+        delays = [self.new_peer_uptime[peer] for peer in state_changed if peer in self.new_peer_uptime]
+        if not delays:
+            return
+        poll_ms = int((time.monotonic() - poll_start) * 1000)
+        latency = max(delays) + poll_ms
+        self.max_latency = max(self.max_latency, latency)
+        self.flush_pipe({STATS_KEY: {
+            "last_latency_ms": str(latency),
+            "max_latency_ms": str(self.max_latency),
+            "last_poll_ms": str(poll_ms),
+            "last_update": str(int(time.time())),
+        }})
+
+    def poll(self, publish_counters=True):
+        """Read the neighbors from bgpd and update State DB
+        Args:
+            publish_counters: write the neighbors which only counters have changed too
+        Returns:
+            number of neighbors which state has changed, which were added or removed
+        """
+        poll_start = time.monotonic()
+        if not self.get_all_neigh_states():
+            return 0
+        changed, state_changed = self.update_neigh_states(publish_counters)
+        self.update_latency(state_changed, poll_start)
+        return changed
 
 def main():
+    parser = argparse.ArgumentParser(description="Populate bgp neighbor state in State DB")
+    parser.add_argument("--min-interval", type=float, default=MIN_POLL_INTERVAL,
+                        help="poll interval in seconds, when neighbors are changing (default: %(default)s)")
+    parser.add_argument("--max-interval", type=float, default=MAX_POLL_INTERVAL,
+                        help="maximum poll interval in seconds (default: %(default)s)")
+    args = parser.parse_args()
+    min_interval = max(args.min_interval, 0.1)
+    max_interval = max(args.max_interval, min_interval)
 
     syslog.syslog(syslog.LOG_INFO, "bgpmon service started")
     bgp_state_get = None
@@ -162,12 +284,23 @@ def main():
         syslog.syslog(syslog.LOG_ERR, "{}: error exit 1, reason {}".format("THIS_MODULE", str(e)))
         exit(1)
 
-    # periodically obtain the new neighbor information and update if necessary
+    # obtain the new neighbor information and update if necessary. Poll often while the
+    # neighbors are changing state and back off while they are stable. The counters are
+    # written at most once per maximum interval
+    interval = min_interval
+    last_poll = 0
+    last_counters = 0
     while True:
-        time.sleep(15)
-        if bgp_state_get.bgp_activity_detected():
-            bgp_state_get.get_all_neigh_states()
-            bgp_state_get.update_neigh_states()
+        time.sleep(interval)
+        changed = 0
+        now = time.monotonic()
+        if bgp_state_get.bgp_activity_detected() or now - last_poll >= max_interval:
+            last_poll = now
+            publish_counters = now - last_counters >= max_interval
+            if publish_counters:
+                last_counters = now
+            changed = bgp_state_get.poll(publish_counters)
+        interval = min_interval if changed else min(interval * 2, max_interval)
 
 if __name__ == '__main__':
     main()
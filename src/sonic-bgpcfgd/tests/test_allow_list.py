@@ -1,6 +1,7 @@
 from unittest.mock import MagicMock, patch
 
 import bgpcfgd.frr
+from bgpcfgd.config import RunningConfig
 from bgpcfgd.directory import Directory
 from bgpcfgd.template import TemplateFabric
 import bgpcfgd
@@ -59,6 +60,7 @@ def set_del_test(op, args, currect_config, expected_config, update_global_defaul
     cfg_mgr.update.return_value = None
     cfg_mgr.push_list = push_list
     cfg_mgr.get_text.return_value = currect_config
+    cfg_mgr.get_model.return_value = RunningConfig.from_text(currect_config)
     common_objs = {
         'directory': Directory(),
         'cfg_mgr':   cfg_mgr,
@@ -669,6 +671,7 @@ def test_set_handler_no_community_data_is_already_presented():
         ' set community 123:123 additive',
         ""
     ]
+    cfg_mgr.get_model.return_value = RunningConfig.from_text(cfg_mgr.get_text.return_value)
     common_objs = {
             'directory': Directory(),
             'cfg_mgr': cfg_mgr,
@@ -737,16 +740,7 @@ def test_set_handler_with_community_update_prefixes_add():
             ""
         ],
         [
-            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4 seq 10 deny 0.0.0.0/0 le 17',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4 seq 20 permit 10.20.30.0/24 le 32',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4 seq 30 permit 30.50.0.0/16 le 32',
             'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4 seq 40 permit 80.90.0.0/16 le 32',
-            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 10 deny ::/0 le 59',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 20 deny ::/0 ge 65',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 30 permit fc00:20::/64 le 128',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 40 permit fc00:30::/64 le 128',
             'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 50 permit fc02::/64 le 128',
         ]
     )
@@ -777,16 +771,7 @@ def test_set_handler_no_community_update_prefixes_add():
             ""
         ],
         [
-            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 10 deny 0.0.0.0/0 le 17',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 20 permit 20.20.30.0/24 le 32',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 30 permit 40.50.0.0/16 le 32',
             'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 40 permit 80.90.0.0/16 le 32',
-            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 10 deny ::/0 le 59',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 20 deny ::/0 ge 65',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 30 permit fc01:20::/64 le 128',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 40 permit fc01:30::/64 le 128',
             'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 50 permit fc02::/64 le 128',
         ]
     )
@@ -820,13 +805,8 @@ def test_set_handler_with_community_update_prefixes_remove():
             ""
         ],
         [
-            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4 seq 10 deny 0.0.0.0/0 le 17',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4 seq 20 permit 10.20.30.0/24 le 32',
-            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 10 deny ::/0 le 59',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 20 deny ::/0 ge 65',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 30 permit fc00:20::/64 le 128',
+            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V4 seq 30 permit 30.50.0.0/16 le 32',
+            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_1010:2020_V6 seq 40 permit fc00:30::/64 le 128',
         ]
     )
 
@@ -856,13 +836,8 @@ def test_set_handler_no_community_update_prefixes_remove():
             ""
         ],
         [
-            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 10 deny 0.0.0.0/0 le 17',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 20 permit 20.20.30.0/24 le 32',
-            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 10 deny ::/0 le 59',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 20 deny ::/0 ge 65',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 30 permit fc01:20::/64 le 128',
+            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V4 seq 30 permit 40.50.0.0/16 le 32',
+            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_COMMUNITY_empty_V6 seq 40 permit fc01:30::/64 le 128',
         ]
     )
 
@@ -898,19 +873,16 @@ def test_set_handler_with_neighbor_type():
             ""
         ],
         [
-            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 10 deny 0.0.0.0/0 le 17',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 20 permit 10.62.64.0/22 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 30 permit 10.1.44.0/23 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 40 permit 10.17.92.0/23 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 50 permit 10.73.92.0/23 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 60 permit 10.26.170.0/24 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 70 permit 10.26.171.0/24 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 80 permit 10.26.255.0/24 ge 30',
-            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V6',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V6 seq 10 deny ::/0 le 59',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V6 seq 20 deny ::/0 ge 65',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V6 seq 30 permit fc01:20::/64 le 128',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 40 permit 10.62.64.0/22 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 50 permit 10.1.44.0/23 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 60 permit 10.17.92.0/23 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 70 permit 10.73.92.0/23 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 80 permit 10.26.170.0/24 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 90 permit 10.26.171.0/24 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 100 permit 10.26.255.0/24 ge 30',
+            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 20 permit 20.20.30.0/24 le 32',
+            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V4 seq 30 permit 40.50.0.0/16 le 32',
+            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_empty_V6 seq 40 permit fc01:30::/64 le 128',
         ]
     )
 
@@ -949,19 +921,16 @@ def test_set_handler_with_neighbor_type_and_community():
             ""
         ],
         [
-            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 10 deny 0.0.0.0/0 le 17',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 20 permit 10.62.64.0/22 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 30 permit 10.1.44.0/23 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 40 permit 10.17.92.0/23 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 50 permit 10.73.92.0/23 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 60 permit 10.26.170.0/24 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 70 permit 10.26.171.0/24 ge 30',
-            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 80 permit 10.26.255.0/24 ge 30',
-            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V6',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V6 seq 10 deny ::/0 le 59',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V6 seq 20 deny ::/0 ge 65',
-            'ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V6 seq 30 permit fc01:20::/64 le 128',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 40 permit 10.62.64.0/22 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 50 permit 10.1.44.0/23 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 60 permit 10.17.92.0/23 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 70 permit 10.73.92.0/23 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 80 permit 10.26.170.0/24 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 90 permit 10.26.171.0/24 ge 30',
+            'ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 100 permit 10.26.255.0/24 ge 30',
+            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 20 permit 20.20.30.0/24 le 32',
+            'no ip prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V4 seq 30 permit 40.50.0.0/16 le 32',
+            'no ipv6 prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_5_NEIGHBOR_OpticalLonghaulTerminal_COMMUNITY_1010:2020_V6 seq 40 permit fc01:30::/64 le 128',
         ]
     )
 
@@ -1102,6 +1071,7 @@ def test___find_peer_group():
         'route-map TO_BGP_PEER_V6 permit 100',
         'route-map TO_BGP_SPEAKER deny 1',
     ]
+    cfg_mgr.get_model.return_value = RunningConfig.from_text(cfg_mgr.get_text.return_value)
     common_objs = {
         'directory': Directory(),
         'cfg_mgr':   cfg_mgr,
@@ -1129,6 +1099,109 @@ def test___to_prefix_list():
     res_v6 = mgr._BGPAllowListMgr__to_prefix_list(mgr.V6, ["fc00::1/128", "fc00::/64"])
     assert res_v6 == ["permit fc00::1/128", "permit fc00::/64 le 128"]
 
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test___diff_prefix_list():
+    from bgpcfgd.managers_allow_list import BGPAllowListMgr
+    diff = BGPAllowListMgr._BGPAllowListMgr__diff_prefix_list
+    entries = {10: 'deny 0.0.0.0/0 le 17', 20: 'permit 10.0.0.0/8 le 32', 30: 'permit 30.0.0.0/8 le 32'}
+    # a rule is inserted between the kept entries
+    assert diff('ip', 'PL', entries, ['deny 0.0.0.0/0 le 17', 'permit 10.0.0.0/8 le 32', 'permit 20.0.0.0/8 le 32', 'permit 30.0.0.0/8 le 32']) == [
+        'ip prefix-list PL seq 25 permit 20.0.0.0/8 le 32',
+    ]
+    # a rule is moved
+    assert diff('ip', 'PL', entries, ['deny 0.0.0.0/0 le 17', 'permit 30.0.0.0/8 le 32', 'permit 10.0.0.0/8 le 32']) == [
+        'no ip prefix-list PL seq 20 permit 10.0.0.0/8 le 32',
+        'ip prefix-list PL seq 40 permit 10.0.0.0/8 le 32',
+    ]
+    # the new entries are added before the stale ones are removed, at sequence numbers no entry uses
+    assert diff('ip', 'PL', entries, ['deny 0.0.0.0/0 le 17', 'permit 40.0.0.0/8 le 32']) == [
+        'ip prefix-list PL seq 40 permit 40.0.0.0/8 le 32',
+        'no ip prefix-list PL seq 20 permit 10.0.0.0/8 le 32',
+        'no ip prefix-list PL seq 30 permit 30.0.0.0/8 le 32',
+    ]
+    # the sequence numbers between the kept entries, which stale entries use, are skipped
+    entries = {10: 'deny 0.0.0.0/0 le 17', 20: 'permit 10.0.0.0/8 le 32', 30: 'permit 30.0.0.0/8 le 32', 40: 'permit 90.0.0.0/8 le 32'}
+    assert diff('ip', 'PL', entries, ['deny 0.0.0.0/0 le 17', 'permit 20.0.0.0/8 le 32', 'permit 50.0.0.0/8 le 32', 'permit 90.0.0.0/8 le 32']) == [
+        'ip prefix-list PL seq 21 permit 20.0.0.0/8 le 32',
+        'ip prefix-list PL seq 31 permit 50.0.0.0/8 le 32',
+        'no ip prefix-list PL seq 20 permit 10.0.0.0/8 le 32',
+        'no ip prefix-list PL seq 30 permit 30.0.0.0/8 le 32',
+    ]
+    # all the stale entries are used: the rules are spread over the free sequence numbers
+    assert diff('ip', 'PL', {1: 'deny 0.0.0.0/0', 2: 'permit 10.0.0.0/8', 3: 'permit 30.0.0.0/8', 5: 'deny 1.0.0.0/8'},
+                ['deny 0.0.0.0/0', 'permit 20.0.0.0/8', 'deny 1.0.0.0/8']) == [
+        'ip prefix-list PL seq 4 permit 20.0.0.0/8',
+        'no ip prefix-list PL seq 2 permit 10.0.0.0/8',
+        'no ip prefix-list PL seq 3 permit 30.0.0.0/8',
+    ]
+    # no free sequence numbers
+    assert diff('ip', 'PL', {1: 'permit 10.0.0.0/8', 2: 'permit 30.0.0.0/8'}, ['permit 10.0.0.0/8', 'permit 20.0.0.0/8', 'permit 30.0.0.0/8']) is None
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test___diff_prefix_list_no_permit_removed_before_added():
+    from bgpcfgd.managers_allow_list import BGPAllowListMgr
+    diff = BGPAllowListMgr._BGPAllowListMgr__diff_prefix_list
+    deny = 'deny 0.0.0.0/0 le 17'
+    old = ['permit 10.%d.0.0/16 le 32' % i for i in range(4)]
+    new = ['permit 20.%d.0.0/16 le 32' % i for i in range(6)]
+    for entries, rules in [
+        ({10: deny, 20: old[0], 30: old[1]}, [deny] + new),                      # replace all the permits
+        ({10: deny, 20: old[0], 30: old[1], 40: old[2]}, [deny, new[0], old[2]]),  # replace the ones before a kept entry
+        ({10: deny, 20: old[0], 30: old[1], 40: old[2], 50: old[3]}, [deny, old[0], new[0], new[1], old[3]]),
+    ]:
+        cmds = diff('ip', 'PL', entries, rules)
+        prefix_list = dict(entries)
+        for cmd in cmds:
+            words = cmd.split()
+            if words[0] == 'no':
+                del prefix_list[int(words[5])]
+            else:
+                assert int(words[4]) not in prefix_list
+                prefix_list[int(words[4])] = ' '.join(words[5:])
+            # the prefix-list always permits something
+            assert any(rule.startswith('permit') for rule in prefix_list.values())
+        assert [rule for _, rule in sorted(prefix_list.items())] == rules
+        # the stale permits are removed after all the new entries are added
+        last_add = max(i for i, cmd in enumerate(cmds) if not cmd.startswith('no'))
+        assert all(i > last_add for i, cmd in enumerate(cmds) if cmd.startswith('no'))
+
+@patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
+def test___aggregate():
+    constants = deepcopy(global_constants)
+    constants["bgp"]["allow_list"]["aggregate_prefixes"] = True
+    mgr = construct_BGPAllowListMgr(constants)
+    assert mgr.aggregate_prefixes
+    res_v4 = mgr._BGPAllowListMgr__aggregate(mgr.V4, [
+        "10.26.170.0/24 ge 30",
+        "10.26.171.0/24 ge 30",
+        "10.26.172.0/24 ge 30",
+        "10.26.173.0/24 ge 28",
+        "10.26.255.0/24 ge 30",
+        "10.0.0.0/8",
+        "10.20.0.0/16",
+        "20.0.0.0/24",
+        "20.0.1.0/24",
+        "20.0.0.0/24 ge 25 le 26",
+        "30.0.0.0/24 le 28",
+        "30.0.0.0/25",
+    ])
+    assert res_v4 == [
+        "10.0.0.0/8",
+        "20.0.0.0/24",
+        "20.0.1.0/24",
+        "30.0.0.0/24 le 28",
+        "30.0.0.0/25",
+    ]
+    res_v4 = mgr._BGPAllowListMgr__aggregate(mgr.V4, [
+        "10.26.170.0/24 ge 30",
+        "10.26.171.0/24 ge 30",
+        "10.26.172.0/24 ge 30",
+        "10.26.173.0/24 ge 28",
+    ])
+    assert res_v4 == ["10.26.170.0/23 ge 30", "10.26.172.0/24 ge 30", "10.26.173.0/24 ge 28"]
+    res_v6 = mgr._BGPAllowListMgr__aggregate(mgr.V6, ["fc00::/64 ge 96", "fc00:0:0:1::/64 ge 96", "fc01::/64"])
+    assert res_v6 == ["fc00::/63 ge 96", "fc01::/64"]
+
 @patch.dict("sys.modules", swsscommon=swsscommon_module_mock)
 def construct_BGPAllowListMgr(constants):
     from bgpcfgd.managers_allow_list import BGPAllowListMgr
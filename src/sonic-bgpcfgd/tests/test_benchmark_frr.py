@@ -0,0 +1,67 @@
+"""
+Commit latency of a 1000 neighbors configuration, through the vty sockets
+and through vtysh.
+
+The comparison runs against the FRR daemons of the host and is skipped when
+they are not running. The configuration goes to a dedicated bgp instance,
+removed after each round.
+
+Run with: pytest tests/test_benchmark_frr.py -m benchmark --benchmark-only
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import bgpcfgd.frr
+from bgpcfgd.utils import run_command
+from .test_frr import FakeVtyDaemon
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+NEIGHBORS = 1000
+BENCH_INSTANCE = "router bgp 65535 vrf BgpcfgdBench"
+
+
+def neighbors_config(count=NEIGHBORS):
+    lines = [BENCH_INSTANCE]
+    for i in range(count):
+        address = "10.%d.%d.1" % (i // 256, i % 256)
+        lines.append(" neighbor %s remote-as %d" % (address, 64512 + i))
+        lines.append(" neighbor %s description bench_%d" % (address, i))
+        lines.append(" address-family ipv4")
+        lines.append("  neighbor %s activate" % address)
+        lines.append(" exit-address-family")
+    return "\n".join(lines)
+
+
+def frr_running():
+    return shutil.which('vtysh') is not None and os.path.exists(os.path.join(bgpcfgd.frr.VtyClient.VTY_DIR, 'bgpd.vty'))
+
+
+@pytest.mark.skipif(not frr_running(), reason="FRR is not running")
+@pytest.mark.parametrize('use_vty', [False, True], ids=['vtysh', 'vty'])
+def test_commit_frr(benchmark, use_vty):
+    bgpcfgd.frr.run_command = run_command
+    frr = bgpcfgd.frr.FRR(["bgpd"], use_vty=use_vty)
+    config = neighbors_config()
+    def teardown():
+        frr.write("no " + BENCH_INSTANCE)
+    try:
+        benchmark.pedantic(frr.write, args=(config,), teardown=teardown, rounds=3)
+    finally:
+        teardown()
+
+
+def test_commit_transport(benchmark):
+    """ Cost of the vty transport alone, against a daemon replying right away """
+    vty_dir = tempfile.mkdtemp()
+    try:
+        FakeVtyDaemon(vty_dir, 'bgpd')
+        frr = bgpcfgd.frr.FRR(["bgpd"], vty_dir=vty_dir)
+        benchmark(frr.write, neighbors_config())
+    finally:
+        shutil.rmtree(vty_dir)
@@ -0,0 +1,55 @@
+"""
+Rendering of the peer-group and policy templates at startup, for 500 neighbors
+sharing the general peer-groups, with and without memoization.
+
+Run with: pytest tests/test_benchmark_templates.py -m benchmark --benchmark-only
+"""
+import os
+
+import pytest
+
+from bgpcfgd.template import TemplateFabric
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+TEMPLATE_PATH = os.path.abspath('../../dockers/docker-fpm-frr/frr')
+NEIGHBORS = 500
+TEMPLATES = ["bgpd/templates/general/peer-group.conf.j2", "bgpd/templates/general/policies.conf.j2"]
+
+
+def neighbors_kwargs(count=NEIGHBORS):
+    loopbacks = {('Loopback0', '10.1.0.32/32'): {}, ('Loopback0', 'fc00:1::32/128'): {}}
+    device_metadata = {'localhost': {'type': 'LeafRouter', 'bgp_asn': '65100', 'hostname': 'switch'}}
+    constants = {'bgp': {'allow_list': {'enabled': True, 'drop_community': '5060:12345'}}}
+    res = []
+    for i in range(count):
+        res.append({
+            'CONFIG_DB__DEVICE_METADATA': device_metadata,
+            'CONFIG_DB__BGP_BBR': {'status': 'enabled'},
+            'CONFIG_DB__LOOPBACK_INTERFACE': dict(loopbacks),
+            'constants': constants,
+            'allow_list_default_action': 'permit',
+            'bgp_asn': '65100',
+            'vrf': 'default',
+            'neighbor_addr': "10.%d.%d.1" % (i // 256, i % 256),
+            'bgp_session': {'asn': str(64512 + i), 'name': 'ARISTA%02dT0' % i, 'local_addr': '10.0.0.0'},
+            'loopback0_ipv4': '10.1.0.32/32',
+        })
+    return res
+
+
+@pytest.mark.parametrize('memoized', [False, True], ids=['render', 'memoized'])
+def test_startup_render(benchmark, memoized):
+    neighbors = neighbors_kwargs()
+    def setup():
+        # the templates are compiled out of the measurement, with empty caches
+        tf = TemplateFabric(TEMPLATE_PATH)
+        templates = [tf.from_file_memoized(name) if memoized else tf.from_file(name) for name in TEMPLATES]
+        return (templates,), {}
+    def startup(templates):
+        for kwargs in neighbors:
+            for template in templates:
+                template.render(**kwargs)
+    benchmark.pedantic(startup, setup=setup, rounds=5)
@@ -1,6 +1,7 @@
 from unittest.mock import MagicMock, patch
 
 import os
+from bgpcfgd.config import RunningConfig
 from bgpcfgd.directory import Directory
 from bgpcfgd.template import TemplateFabric
 from . import swsscommon_test
@@ -21,8 +22,28 @@ def load_constant_files():
     return constant_files
 
 
+RUNNING_CONFIG = """
+router bgp 65100
+ neighbor PEER_V4 peer-group
+ neighbor 10.10.10.1 remote-as 65200
+ neighbor 20.20.20.1 peer-group PEER_V4
+ neighbor fc00:10::1 remote-as 65200
+ address-family ipv4 unicast
+  neighbor 10.10.10.1 activate
+ exit-address-family
+!
+router bgp 65100 vrf Vrf1
+ neighbor 10.20.0.1 remote-as 65300
+ neighbor 10.20.0.1 shutdown
+!
+router bgp 65100 vrf Vrf2
+!
+"""
+
 def constructor(constants_path):
     cfg_mgr = MagicMock()
+    cfg_mgr.has_changes.return_value = False
+    cfg_mgr.get_model.return_value = RunningConfig.from_text(RUNNING_CONFIG.split('\n'))
     constants = load_constants(constants_path)['constants']
     common_objs = {
         'directory': Directory(),
@@ -31,12 +52,6 @@ def constructor(constants_path):
         'constants': constants
     }
 
-    return_value_map = {
-        "['vtysh', '-c', 'show bgp vrfs json']": (0, "{\"vrfs\": {\"default\": {}}}", ""),
-        "['vtysh', '-c', 'show bgp vrf default neighbors json']": (0, "{\"10.10.10.1\": {}, \"20.20.20.1\": {}, \"fc00:10::1\": {}}", "")
-    }
-
-    bgpcfgd.managers_bgp.run_command = lambda cmd: return_value_map[str(cmd)]
     m = bgpcfgd.managers_bgp.BGPPeerMgrBase(common_objs, "CONFIG_DB", swsscommon.CFG_BGP_NEIGHBOR_TABLE_NAME, "general", True)
     assert m.peer_type == "general"
     assert m.check_neig_meta == ('bgp' in constants and 'use_neighbors_meta' in constants['bgp'] and constants['bgp']['use_neighbors_meta'])
@@ -135,3 +150,49 @@ def test_del_handler_nonexist_peer(mocked_log_warn):
         m = constructor(constant)
         m.del_handler("40.40.40.1")
         mocked_log_warn.assert_called_with("Peer '(default|40.40.40.1)' has not been found")
+
+def test_peer_inventory():
+    cfg_mgr = MagicMock()
+    cfg_mgr.get_model.return_value = RunningConfig.from_text(RUNNING_CONFIG.split('\n'))
+    inventory = bgpcfgd.managers_bgp.BGPPeerInventory(cfg_mgr)
+    peers = inventory.get_peers()
+    # peers of all vrfs, the ones which are shut down too. Peer-groups are not peers
+    assert peers == {("default", "10.10.10.1"), ("default", "20.20.20.1"), ("default", "fc00:10::1"), ("Vrf1", "10.20.0.1")}
+    peers.add(("default", "30.30.30.1"))
+    assert ("default", "30.30.30.1") not in inventory.get_peers()
+    assert cfg_mgr.update.call_count == 1
+    inventory.refresh()
+    inventory.get_peers()
+    assert cfg_mgr.update.call_count == 2
+    # the peers are reloaded once per generation of the running configuration
+    inventory.refresh(1)
+    inventory.get_peers()
+    inventory.refresh(1)
+    inventory.get_peers()
+    assert cfg_mgr.update.call_count == 3
+
+def test_peers_reloaded_after_resync():
+    for constant in load_constant_files():
+        m = constructor(constant)
+        m.cfg_mgr.generation = 0
+        m.peers_generation = 0
+        assert ("default", "10.10.10.1") in m.get_peers()
+        # a peer was added to the set, but the push to FRR has failed
+        m.peers.add(("default", "40.40.40.1"))
+        m.cfg_mgr.generation = 1
+        assert ("default", "40.40.40.1") not in m.get_peers()
+        assert ("default", "10.10.10.1") in m.get_peers()
+
+def test_peers_kept_until_commit():
+    for constant in load_constant_files():
+        m = constructor(constant)
+        m.cfg_mgr.generation = 0
+        m.peers_generation = 0
+        # a peer was pushed, then the running configuration was resynced before the commit
+        m.peers.add(("default", "40.40.40.1"))
+        m.cfg_mgr.has_changes.return_value = True
+        m.cfg_mgr.generation = 1
+        assert ("default", "40.40.40.1") in m.get_peers()
+        # the peers are reloaded once the changes are committed
+        m.cfg_mgr.has_changes.return_value = False
+        assert ("default", "40.40.40.1") not in m.get_peers()
@@ -0,0 +1,137 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from . import swsscommon_test
+
+with patch.dict("sys.modules", swsscommon=swsscommon_test, sonic_py_common=MagicMock(), **{"sonic_py_common.general": MagicMock()}):
+    from bgpmon import bgpmon
+    from bgpmon.bgpmon import BgpStateGet
+
+
+def peer(state, uptime_ms, received=0, sent=0, dropped=0):
+    return {
+        "state": state,
+        "peerUptimeMsec": uptime_ms,
+        "peerUptimeEstablishedEpoch": 1000,
+        "pfxRcd": received,
+        "pfxSnt": sent,
+        "connectionsDropped": dropped,
+    }
+
+def summary(default_peers, vrf_peers):
+    return json.dumps({
+        "default": {
+            "ipv4Unicast": {"peers": default_peers},
+        },
+        "Vrf1": {
+            "ipv4Unicast": {"peers": vrf_peers},
+            "ipv6Unicast": {"peers": {"fc00::2": peer("Established", 500, 7, 8)}},
+        },
+    })
+
+def get_monitor(output):
+    monitor = BgpStateGet()
+    monitor.vty = MagicMock()
+    monitor.vty.execute.return_value = (0, output)
+    monitor.flushed = []
+    monitor.flush_pipe = MagicMock(side_effect=lambda data: (monitor.flushed.append(dict(data)), data.clear()))
+    return monitor
+
+def written(monitor):
+    res = {}
+    for data in monitor.flushed:
+        res.update(data)
+    return res
+
+def test_poll_all_vrfs():
+    monitor = get_monitor(summary({"10.0.0.1": peer("Established", 100, 5, 6, 2)}, {}))
+    assert monitor.poll() == 2
+    assert monitor.flushed == [{
+        "NEIGH_STATE_TABLE|10.0.0.1": {"state": "Established"},
+        "BGP_NEIGH_STATE_TABLE|default|10.0.0.1": {
+            "vrf": "default",
+            "state": "Established",
+            "established_epoch": "1000",
+            "flaps": "2",
+            "ipv4_prefixes_received": "5",
+            "ipv4_prefixes_sent": "6",
+        },
+        "BGP_NEIGH_STATE_TABLE|Vrf1|fc00::2": {
+            "vrf": "Vrf1",
+            "state": "Established",
+            "established_epoch": "1000",
+            "flaps": "0",
+            "ipv6_prefixes_received": "7",
+            "ipv6_prefixes_sent": "8",
+        },
+    }]
+    monitor.vty.execute.assert_called_once_with("show bgp vrf all summary json")
+
+def test_default_vrf_neigh_state_table():
+    # NEIGH_STATE_TABLE has the neighbors of the default vrf only, keyed by the ip, with the state only
+    monitor = get_monitor(summary({"10.0.0.1": peer("Established", 100, 5, 6, 2)}, {"10.0.0.1": peer("Active", 100)}))
+    monitor.poll()
+    data = written(monitor)
+    assert {key: value for key, value in data.items() if key.startswith("NEIGH_STATE_TABLE|")} == {
+        "NEIGH_STATE_TABLE|10.0.0.1": {"state": "Established"},
+    }
+    # counters changed: NEIGH_STATE_TABLE is not written
+    monitor.flushed.clear()
+    monitor.vty.execute.return_value = (0, summary({"10.0.0.1": peer("Established", 200, 9, 6, 2)}, {}))
+    monitor.poll()
+    data = written(monitor)
+    assert "NEIGH_STATE_TABLE|10.0.0.1" not in data
+    assert data["BGP_NEIGH_STATE_TABLE|default|10.0.0.1"]["ipv4_prefixes_received"] == "9"
+    assert data["BGP_NEIGH_STATE_TABLE|Vrf1|10.0.0.1"] is None
+    # neighbor removed
+    monitor.flushed.clear()
+    monitor.vty.execute.return_value = (0, summary({}, {}))
+    monitor.poll()
+    data = written(monitor)
+    assert data["NEIGH_STATE_TABLE|10.0.0.1"] is None
+    assert data["BGP_NEIGH_STATE_TABLE|default|10.0.0.1"] is None
+
+def test_poll_changes_and_latency():
+    monitor = get_monitor(summary({"10.0.0.1": peer("Established", 100)}, {"10.0.1.1": peer("Active", 100)}))
+    monitor.poll()
+    monitor.flush_pipe.reset_mock()
+    monitor.flushed.clear()
+    # nothing changed: nothing is written
+    assert monitor.poll() == 0
+    monitor.flush_pipe.assert_not_called()
+    monitor.vty.execute.return_value = (0, summary({"10.0.0.1": peer("Idle", 250)}, {}))
+    assert monitor.poll() == 2
+    data = written(monitor)
+    assert data["NEIGH_STATE_TABLE|10.0.0.1"] == {"state": "Idle"}
+    assert data["BGP_NEIGH_STATE_TABLE|default|10.0.0.1"]["state"] == "Idle"
+    assert data["BGP_NEIGH_STATE_TABLE|Vrf1|10.0.1.1"] is None
+    stats = data["BGPMON_STATS|neighbor_state"]
+    assert int(stats["last_latency_ms"]) >= 250
+    assert stats["max_latency_ms"] == stats["last_latency_ms"]
+
+def test_counters_on_slower_cadence():
+    monitor = get_monitor(summary({"10.0.0.1": peer("Established", 100, 5, 6)}, {}))
+    monitor.poll()
+    monitor.flushed.clear()
+    # counters only changed: the neighbors are not counted as changed, the counters wait
+    monitor.vty.execute.return_value = (0, summary({"10.0.0.1": peer("Established", 200, 9, 6)}, {}))
+    assert monitor.poll(publish_counters=False) == 0
+    assert monitor.flushed == []
+    assert monitor.poll() == 0
+    data = written(monitor)
+    assert data["BGP_NEIGH_STATE_TABLE|default|10.0.0.1"]["ipv4_prefixes_received"] == "9"
+    # a state change is written right away, with the counters
+    monitor.flushed.clear()
+    monitor.vty.execute.return_value = (0, summary({"10.0.0.1": peer("Idle", 50, 0, 0, 1)}, {}))
+    assert monitor.poll(publish_counters=False) == 1
+    data = written(monitor)
+    assert data["NEIGH_STATE_TABLE|10.0.0.1"] == {"state": "Idle"}
+    assert data["BGP_NEIGH_STATE_TABLE|default|10.0.0.1"]["flaps"] == "1"
+
+def test_poll_vtysh_fallback():
+    monitor = get_monitor("")
+    monitor.vty.execute.return_value = None
+    with patch.object(bgpmon, "getstatusoutput_noshell", return_value=(1, "")) as vtysh:
+        assert monitor.poll() == 0
+        vtysh.assert_called_once_with(["vtysh", "-c", "show bgp vrf all summary json"])
+    monitor.flush_pipe.assert_not_called()
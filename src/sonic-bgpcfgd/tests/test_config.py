@@ -1,6 +1,6 @@
 from unittest.mock import MagicMock
 
-from bgpcfgd.config import ConfigMgr
+from bgpcfgd.config import ConfigMgr, RunningConfig
 
 
 def test_constructor():
@@ -205,3 +205,122 @@ def test_from_canonical():
     c = ConfigMgr(frr)
     raw = c.from_canonical(canonical)
     assert raw == expected
+
+RUNNING_CONFIG = """!
+router bgp 65100
+ bgp router-id 10.1.0.32
+ neighbor PEER_V4 peer-group
+ neighbor 10.0.0.1 remote-as 65200
+ neighbor 10.0.0.1 peer-group PEER_V4
+ !
+ address-family ipv4 unicast
+  neighbor PEER_V4 route-map FROM_BGP_PEER_V4 in
+  neighbor 10.0.0.1 activate
+ exit-address-family
+exit
+!
+ip prefix-list PL_1 seq 10 permit 10.0.0.0/8 le 32
+ip prefix-list PL_1 seq 20 deny 0.0.0.0/0
+!
+bgp community-list standard CL_1 permit 1010:2020
+!
+route-map FROM_BGP_PEER_V4 permit 2
+ call ALLOW_LIST_V4
+exit
+!
+route-map FROM_BGP_PEER_V4 permit 100
+exit
+!
+"""
+
+def test_running_config_load():
+    model = RunningConfig.from_text(RUNNING_CONFIG)
+    assert model.get_prefix_list('ip', 'PL_1') == {10: 'permit 10.0.0.0/8 le 32', 20: 'deny 0.0.0.0/0'}
+    assert model.get_prefix_list('ipv6', 'PL_1') is None
+    assert model.get_community_list('CL_1') == ['permit 1010:2020']
+    assert model.get_route_map('FROM_BGP_PEER_V4') == {2: ['call ALLOW_LIST_V4'], 100: []}
+    assert model.get_peer_groups() == ['PEER_V4']
+    assert model.get_neighbor('PEER_V4') == ['neighbor PEER_V4 peer-group', 'neighbor PEER_V4 route-map FROM_BGP_PEER_V4 in']
+    assert model.lines() == [
+        'router bgp 65100',
+        ' bgp router-id 10.1.0.32',
+        ' neighbor PEER_V4 peer-group',
+        ' neighbor 10.0.0.1 remote-as 65200',
+        ' neighbor 10.0.0.1 peer-group PEER_V4',
+        ' address-family ipv4 unicast',
+        '  neighbor PEER_V4 route-map FROM_BGP_PEER_V4 in',
+        '  neighbor 10.0.0.1 activate',
+        'ip prefix-list PL_1 seq 10 permit 10.0.0.0/8 le 32',
+        'ip prefix-list PL_1 seq 20 deny 0.0.0.0/0',
+        'bgp community-list standard CL_1 permit 1010:2020',
+        'route-map FROM_BGP_PEER_V4 permit 2',
+        ' call ALLOW_LIST_V4',
+        'route-map FROM_BGP_PEER_V4 permit 100',
+    ]
+
+def test_running_config_apply():
+    model = RunningConfig.from_text(RUNNING_CONFIG)
+    model.apply("""
+ip prefix-list PL_1 seq 10 permit 20.0.0.0/8 le 32
+no ip prefix-list PL_1 seq 20
+ipv6 prefix-list PL_2 seq 10 permit fc00::/64
+no bgp community-list standard CL_1
+bgp community-list standard CL_1 permit 3030:4040
+route-map ALLOW_LIST_V4 permit 65535
+ set community 123:123 additive
+route-map ALLOW_LIST_V4 permit 65535
+ set community 456:456 additive
+no route-map FROM_BGP_PEER_V4 permit 100
+router bgp 65100
+ address-family ipv4
+  neighbor PEER_V4 allowas-in 1
+  neighbor PEER_V4 route-map FROM_BGP_PEER_V4_NEW in
+ exit-address-family
+ no neighbor 10.0.0.1
+ no bgp ebgp-requires-policy
+""")
+    assert model.get_prefix_list('ip', 'PL_1') == {10: 'permit 20.0.0.0/8 le 32'}
+    assert model.get_prefix_list('ipv6', 'PL_2') == {10: 'permit fc00::/64'}
+    assert model.get_community_list('CL_1') == ['permit 3030:4040']
+    assert model.get_route_map('ALLOW_LIST_V4') == {65535: ['set community 456:456 additive']}
+    assert model.get_route_map('FROM_BGP_PEER_V4') == {2: ['call ALLOW_LIST_V4']}
+    assert model.get_neighbor('PEER_V4') == [
+        'neighbor PEER_V4 peer-group',
+        'neighbor PEER_V4 allowas-in 1',
+        'neighbor PEER_V4 route-map FROM_BGP_PEER_V4_NEW in',
+    ]
+    assert model.get_neighbor('10.0.0.1') == []
+    assert ' no bgp ebgp-requires-policy' in model.lines()
+    model.apply("no ip prefix-list PL_1\nno route-map ALLOW_LIST_V4\n")
+    assert model.get_prefix_list('ip', 'PL_1') is None
+    assert model.get_route_map('ALLOW_LIST_V4') == {}
+
+def test_update_uses_model():
+    frr = MagicMock()
+    frr.get_config = MagicMock(return_value=RUNNING_CONFIG)
+    frr.write = MagicMock(return_value=True)
+    frr.restart_peer_groups = MagicMock(return_value=True)
+    c = ConfigMgr(frr)
+    c.update()
+    c.update()
+    assert frr.get_config.call_count == 1
+    c.push("ip prefix-list PL_1 seq 30 permit 30.0.0.0/8")
+    assert c.commit()
+    c.update()
+    assert frr.get_config.call_count == 1
+    assert 'ip prefix-list PL_1 seq 30 permit 30.0.0.0/8' in c.get_text()
+    assert c.get_model().get_prefix_list('ip', 'PL_1')[30] == 'permit 30.0.0.0/8'
+    frr.write = MagicMock(return_value=False)
+    c.push("ip prefix-list PL_1 seq 40 permit 40.0.0.0/8")
+    assert not c.commit()
+    assert c.get_model() is None
+    c.update()
+    assert frr.get_config.call_count == 2
+
+def test_update_resync_interval():
+    frr = MagicMock()
+    frr.get_config = MagicMock(return_value=RUNNING_CONFIG)
+    c = ConfigMgr(frr, resync_interval=0)
+    c.update()
+    c.update()
+    assert frr.get_config.call_count == 2
@@ -55,3 +55,67 @@ def test_directory(mocked_log_err):
     # Test remove_slot() with nonexist table
     directory.remove_slot("db_name", "table_nonexist")
     mocked_log_err.assert_called_with("Directory: Can't remove slot 'db_name__table_nonexist'. The slot doesn't exist")
+
+def test_directory_notify():
+    directory = Directory()
+    asn_handler = MagicMock()
+    slot_handler = MagicMock()
+    directory.subscribe([("CONFIG_DB", "DEVICE_METADATA", "localhost/bgp_asn")], asn_handler)
+    directory.subscribe([("LOCAL", "interfaces", "")], slot_handler)
+
+    # Only the handlers of a path which has appeared or changed are run
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"hostname": "switch"})
+    assert asn_handler.call_count == 0
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"hostname": "switch", "bgp_asn": "65100"})
+    assert asn_handler.call_count == 1
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"hostname": "switch2", "bgp_asn": "65100"})
+    assert asn_handler.call_count == 1
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"hostname": "switch2", "bgp_asn": "65200"})
+    assert asn_handler.call_count == 2
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "other", {"bgp_asn": "65300"})
+    assert asn_handler.call_count == 2
+
+    # Handlers of the whole slot are run on every change of the slot
+    directory.put("LOCAL", "interfaces", "Ethernet0|10.0.0.0/31", {})
+    directory.put("LOCAL", "interfaces", "Ethernet4|10.0.0.2/31", {})
+    directory.put("LOCAL", "interfaces", "Ethernet4|10.0.0.2/31", {})
+    assert slot_handler.call_count == 2
+
+def test_directory_hold_notifications():
+    directory = Directory()
+    calls = []
+    def handler():
+        calls.append(directory.get("LOCAL", "interfaces", "Ethernet0"))
+    directory.subscribe([("LOCAL", "interfaces", "")], handler, coalesce=True)
+    state_handler = MagicMock()
+    directory.subscribe([("LOCAL", "interfaces", "")], state_handler)
+
+    directory.hold_notifications()
+    directory.put("LOCAL", "interfaces", "Ethernet0", {"a": "1"})
+    directory.put("LOCAL", "interfaces", "Ethernet0", {"a": "2"})
+    assert calls == []
+    # Handlers which are not coalesced are run right away
+    assert state_handler.call_count == 2
+    directory.release_notifications()
+    # The handler was queued once and sees the final state
+    assert calls == [{"a": "2"}]
+
+    directory.put("LOCAL", "interfaces", "Ethernet0", {"a": "3"})
+    assert calls == [{"a": "2"}, {"a": "3"}]
+
+def test_directory_notify_sibling_key():
+    directory = Directory()
+    loopback_handler = MagicMock()
+    directory.subscribe([("CONFIG_DB", "LOOPBACK_INTERFACE", "Loopback0")], loopback_handler)
+
+    # The dependency key comes first, a queued peer is retried when its address arrives
+    directory.put("CONFIG_DB", "LOOPBACK_INTERFACE", "Loopback0", {})
+    assert loopback_handler.call_count == 1
+    directory.put("CONFIG_DB", "LOOPBACK_INTERFACE", "Loopback0|10.1.0.32/32", {})
+    assert loopback_handler.call_count == 2
+    directory.put("CONFIG_DB", "LOOPBACK_INTERFACE", "Loopback0|fc00:1::32/128", {})
+    assert loopback_handler.call_count == 3
+
+    # Keys of other interfaces do not notify
+    directory.put("CONFIG_DB", "LOOPBACK_INTERFACE", "Loopback1|10.1.0.33/32", {})
+    assert loopback_handler.call_count == 3
@@ -1,4 +1,5 @@
 from unittest.mock import patch
+import os
 import bgpcfgd.frr
 import pytest
 
@@ -66,3 +67,143 @@ def test_restart_peer_groups_fail(mocked_log_crit):
     res = f.restart_peer_groups(["pg_1", "pg_2"])
     assert not res, "Expect False return value"
     mocked_log_crit.assert_called_with("Can't restart bgp peer-group 'pg_2'. rc='1', out='some output', err='some error'")
+
+class FakeVtyDaemon(object):
+    """ vty socket of a FRR daemon, which fails the commands containing 'bad' """
+    def __init__(self, vty_dir, name, replies=None):
+        import socket
+        import threading
+        self.commands = []
+        self.replies = replies or {}  # command -> output, other commands output "output of <command>"
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(os.path.join(vty_dir, '%s.vty' % name))
+        self.sock.listen(1)
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def serve(self):
+        conn, _ = self.sock.accept()
+        buf = b''
+        while True:
+            data = conn.recv(4096)
+            if not data:
+                return
+            buf += data
+            while b'\0' in buf:
+                command, buf = buf.split(b'\0', 1)
+                command = command.decode()
+                self.commands.append(command)
+                rc = 2 if 'bad' in command else 0
+                output = self.replies.get(command, 'output of ' + command)
+                conn.sendall(output.encode() + b'\0\0\0' + bytes([rc]))
+
+@pytest.fixture
+def vty_dir():
+    import shutil
+    import tempfile
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path)
+
+def test_vty_write(vty_dir):
+    bgpcfgd.frr.run_command = lambda cmd: pytest.fail("vtysh shouldn't be used")
+    bgpd, zebra = FakeVtyDaemon(vty_dir, 'bgpd'), FakeVtyDaemon(vty_dir, 'zebra')
+    f = bgpcfgd.frr.FRR(["bgpd", "zebra"], vty_dir=vty_dir)
+    config = "\n".join([
+        "router bgp 65100",
+        "  neighbor 10.0.0.1 remote-as 65200",
+        "!",
+        "route-map RM permit 10",
+        "  set src 10.1.0.32",
+        "ip protocol bgp route-map RM",
+    ])
+    assert f.write(config)
+    assert bgpd.commands == ["enable", "configure terminal", "router bgp 65100", "neighbor 10.0.0.1 remote-as 65200",
+                             "route-map RM permit 10", "set src 10.1.0.32", "end"]
+    assert zebra.commands == ["enable", "configure terminal", "route-map RM permit 10", "set src 10.1.0.32",
+                              "ip protocol bgp route-map RM", "end"]
+    assert not f.write("router bgp 65100\n  bad command")
+
+    assert f.restart_peer_groups(["PEER_V4"])
+    assert bgpd.commands[-1] == "clear bgp peer-group PEER_V4 soft in"
+
+def test_vty_write_fallback(vty_dir):
+    written = []
+    def run_command(cmd):
+        with open(cmd[2]) as fp:
+            written.append(fp.read())
+        return 0, "", ""
+    bgpcfgd.frr.run_command = run_command
+    FakeVtyDaemon(vty_dir, 'bgpd')
+    f = bgpcfgd.frr.FRR(["bgpd", "zebra"], vty_dir=vty_dir)
+    # zebra isn't reachable
+    assert f.write("ip protocol bgp route-map RM")
+    # unknown top level command
+    assert f.write("router bgp 65100\nline vty")
+    assert written == ["ip protocol bgp route-map RM\n", "router bgp 65100\nline vty\n"]
+
+BGPD_RUNNING_CONFIG = """frr version 8.2
+hostname sonic
+!
+router bgp 65100
+ neighbor 10.0.0.1 remote-as 65200
+exit
+!
+route-map RM permit 10
+ set src 10.1.0.32
+exit
+!
+end
+"""
+
+ZEBRA_RUNNING_CONFIG = """frr version 8.2
+hostname sonic
+!
+ip protocol bgp route-map RM
+ip nht resolve-via-default
+!
+route-map RM permit 10
+ set src 10.1.0.32
+exit
+!
+end
+"""
+
+STATICD_RUNNING_CONFIG = """frr version 8.2
+hostname sonic
+!
+vrf Vrf_red
+ ip route 10.2.0.0/24 10.0.0.1
+exit-vrf
+!
+end
+"""
+
+def test_vty_get_config(vty_dir):
+    bgpcfgd.frr.run_command = lambda cmd: pytest.fail("vtysh shouldn't be used")
+    FakeVtyDaemon(vty_dir, 'bgpd', {"show running-config": BGPD_RUNNING_CONFIG})
+    FakeVtyDaemon(vty_dir, 'zebra', {"show running-config": ZEBRA_RUNNING_CONFIG})
+    FakeVtyDaemon(vty_dir, 'staticd', {"show running-config": STATICD_RUNNING_CONFIG})
+    f = bgpcfgd.frr.FRR(["bgpd", "zebra", "staticd"], vty_dir=vty_dir)
+    # the configurations of all the daemons are merged, the commands configured in several daemons appear once
+    assert f.get_config().split("\n") == [
+        "frr version 8.2",
+        "hostname sonic",
+        "router bgp 65100",
+        " neighbor 10.0.0.1 remote-as 65200",
+        "route-map RM permit 10",
+        " set src 10.1.0.32",
+        "ip protocol bgp route-map RM",
+        "ip nht resolve-via-default",
+        "vrf Vrf_red",
+        " ip route 10.2.0.0/24 10.0.0.1",
+        "",
+    ]
+
+def test_vty_get_config_fallback(vty_dir):
+    bgpcfgd.frr.run_command = lambda cmd: (0, "config of vtysh", "")
+    FakeVtyDaemon(vty_dir, 'bgpd', {"show running-config": BGPD_RUNNING_CONFIG})
+    f = bgpcfgd.frr.FRR(["bgpd", "zebra"], vty_dir=vty_dir)
+    # zebra isn't reachable, the merged configuration is read through vtysh
+    assert f.get_config() == "config of vtysh"
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+
+from bgpcfgd.template import TemplateFabric, MemoizedTemplate
+
+
+TEMPLATE_PATH = os.path.abspath('../../dockers/docker-fpm-frr/frr')
+
+
+def test_memoized_render():
+    tf = TemplateFabric(TEMPLATE_PATH)
+    tmpl = tf.from_file_memoized("bgpd/templates/general/peer-group.conf.j2")
+    assert tf.from_file_memoized("bgpd/templates/general/peer-group.conf.j2") is tmpl
+    assert tmpl.variables == ['CONFIG_DB__BGP_BBR', 'CONFIG_DB__DEVICE_METADATA']
+    kwargs = {
+        'CONFIG_DB__DEVICE_METADATA': {'localhost': {'type': 'ToRRouter'}},
+        'CONFIG_DB__BGP_BBR': {'status': 'enabled'},
+        'neighbor_addr': '10.0.0.1',
+    }
+    expected = tf.from_file("bgpd/templates/general/peer-group.conf.j2").render(**kwargs)
+    assert tmpl.render(**kwargs) == expected
+    # variables the template doesn't refer to don't matter
+    kwargs['neighbor_addr'] = '10.0.0.2'
+    assert tmpl.render(**kwargs) == expected
+    assert (tmpl.hits, tmpl.misses) == (1, 1)
+    kwargs['CONFIG_DB__DEVICE_METADATA'] = {'localhost': {'type': 'LeafRouter'}}
+    kwargs['CONFIG_DB__BGP_BBR'] = {'status': 'disabled'}
+    assert tmpl.render(**kwargs) != expected
+    assert (tmpl.hits, tmpl.misses) == (1, 2)
+
+def test_cache_size():
+    tf = TemplateFabric()
+    tmpl = MemoizedTemplate(tf.from_string("{{ a }}"), ["a"], cache_size=2)
+    for value in [1, 2, 1, 3, 2]:
+        assert tmpl.render(a=value) == str(value)
+    assert (tmpl.hits, tmpl.misses) == (1, 4)
+    assert list(tmpl.cache) == [(('a', '3'),), (('a', '2'),)]
+
+def test_freeze():
+    a = MemoizedTemplate.freeze({('Loopback0', '10.0.0.1/32'): {}, 'x': [1, {'y': None}]})
+    b = MemoizedTemplate.freeze({'x': [1, {'y': None}], ('Loopback0', '10.0.0.1/32'): {}})
+    assert a == b
+    hash(a)
+    assert MemoizedTemplate.freeze({'x': '1'}) != MemoizedTemplate.freeze({'x': 1})
+
+def test_included_template_variables():
+    path = tempfile.mkdtemp()
+    try:
+        templates = {
+            'main.j2': "{{ a }}{% include 'inc.j2' %}",
+            'inc.j2': "{% import 'macros.j2' as m %}{{ m.f(b) }}{{ c }}",
+            'macros.j2': "{% macro f(x) %}[{{ x }}]{% endmacro %}",
+            'dynamic.j2': "{% include name %}",
+        }
+        for name, text in templates.items():
+            with open(os.path.join(path, name), 'w') as f:
+                f.write(text)
+        tf = TemplateFabric(path)
+        tmpl = tf.from_file_memoized('main.j2')
+        # the variables of the included and imported templates are part of the key
+        assert tmpl.variables == ['a', 'b', 'c']
+        assert tmpl.render(a=1, b=2, c=3) == '1[2]3'
+        assert tmpl.render(a=1, b=2, c=4) == '1[2]4'
+        # the referenced template is only known at render time
+        tmpl = tf.from_file_memoized('dynamic.j2')
+        assert tmpl.variables is None
+        assert tmpl.render(name='inc.j2', b=2, c=3) == '[2]3'
+        assert tmpl.render(name='macros.j2') == ''
+        assert (tmpl.hits, tmpl.misses) == (0, 0)
+    finally:
+        shutil.rmtree(path)
@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock
+
+from bgpcfgd.config import ConfigMgr
+from bgpcfgd.restart_scheduler import PeerGroupRestartScheduler
+
+
+def test_hold_down():
+    frr = MagicMock()
+    frr.restart_peer_groups = MagicMock(return_value=True)
+    s = PeerGroupRestartScheduler(frr, hold_down=10)
+    s.schedule(["pg_1", "pg_2"], now=0)
+    assert s.run(now=0)
+    frr.restart_peer_groups.assert_called_once_with(["pg_1", "pg_2"])
+    # restarted during the hold-down window: postponed and merged into one restart
+    frr.restart_peer_groups.reset_mock()
+    s.schedule(["pg_1"], now=1)
+    s.run(now=1)
+    s.schedule(["pg_1"], now=2)
+    s.run(now=2)
+    frr.restart_peer_groups.assert_not_called()
+    assert s.counters == {'pending': 1, 'issued': 2, 'suppressed': 1}
+    s.run(now=10)
+    frr.restart_peer_groups.assert_called_once_with(["pg_1"])
+    assert s.counters == {'pending': 0, 'issued': 3, 'suppressed': 1}
+
+def test_max_concurrent():
+    frr = MagicMock()
+    frr.restart_peer_groups = MagicMock(return_value=False)
+    s = PeerGroupRestartScheduler(frr, hold_down=10, max_concurrent=2)
+    s.schedule(["pg_1", "pg_2", "pg_3"], now=0)
+    assert not s.run(now=0)
+    frr.restart_peer_groups.assert_called_once_with(["pg_1", "pg_2"])
+    s.run(now=1)
+    frr.restart_peer_groups.assert_called_with(["pg_3"])
+    assert s.counters == {'pending': 0, 'issued': 3, 'suppressed': 0}
+
+def test_publish():
+    state_db = MagicMock()
+    s = PeerGroupRestartScheduler(MagicMock(), state_db=state_db)
+    s.schedule(["pg_1"], now=0)
+    s.run(now=0)
+    s.run(now=1)
+    state_db.hmset.assert_called_once_with(state_db.STATE_DB, "BGP_PEER_GROUP_RESTART|global",
+                                           {'pending': '0', 'issued': '1', 'suppressed': '0'})
+
+def test_config_mgr_commit():
+    frr = MagicMock()
+    frr.write = MagicMock(return_value=True)
+    frr.restart_peer_groups = MagicMock(return_value=True)
+    c = ConfigMgr(frr, restart_scheduler=PeerGroupRestartScheduler(frr, hold_down=60))
+    for _ in range(3):
+        c.push("change")
+        c.restart_peer_groups(["pg_1"])
+        assert c.commit()
+    frr.restart_peer_groups.assert_called_once_with(["pg_1"])
+    assert c.restart_scheduler.counters['pending'] == 1
+    assert c.restart_pending_peer_groups()
+    assert ConfigMgr(frr).restart_pending_peer_groups()
@@ -0,0 +1,81 @@
+from unittest.mock import MagicMock, patch
+
+from . import swsscommon_test
+
+with patch.dict("sys.modules", swsscommon=swsscommon_test):
+    from bgpcfgd.runner import Runner
+
+SET = swsscommon_test.swsscommon.SET_COMMAND
+DEL = swsscommon_test.swsscommon.DEL_COMMAND
+
+
+def test_coalesce():
+    events = [
+        ("peer1", SET, (("asn", "65100"),)),
+        ("peer2", SET, (("asn", "65200"),)),
+        ("peer1", SET, (("asn", "65101"),)),
+        ("peer3", DEL, ()),
+        ("peer2", DEL, ()),
+        ("peer2", SET, (("asn", "65201"),)),
+        ("peer2", SET, (("asn", "65202"),)),
+    ]
+    known_keys = {"peer2", "peer3"}
+    assert Runner.coalesce(events, known_keys) == [
+        ("peer1", SET, (("asn", "65101"),)),
+        ("peer2", DEL, ()),
+        ("peer2", SET, (("asn", "65202"),)),
+        ("peer3", DEL, ()),
+    ]
+    assert known_keys == {"peer1", "peer2"}
+
+def test_coalesce_keeps_order_of_first_event():
+    events = [
+        ("peer1", SET, (("asn", "65100"),)),
+        ("peer2", SET, (("asn", "65200"),)),
+        ("peer3", SET, (("asn", "65300"),)),
+        ("peer1", SET, (("asn", "65101"),)),
+        ("peer2", SET, (("asn", "65201"),)),
+    ]
+    assert [key for key, _, _ in Runner.coalesce(events)] == ["peer1", "peer2", "peer3"]
+
+def test_coalesce_drops_set_del_of_unknown_key():
+    events = [
+        ("peer1", SET, (("asn", "65100"),)),
+        ("peer2", SET, (("asn", "65200"),)),
+        ("peer1", DEL, ()),
+        ("peer3", SET, (("asn", "65300"),)),
+        ("peer3", DEL, ()),
+        ("peer3", SET, (("asn", "65301"),)),
+    ]
+    known_keys = set()
+    assert Runner.coalesce(events, known_keys) == [
+        ("peer2", SET, (("asn", "65200"),)),
+        ("peer3", SET, (("asn", "65301"),)),
+    ]
+    assert known_keys == {"peer2", "peer3"}
+    # The managers received a 'SET' for peer2 in the previous batch
+    assert Runner.coalesce([("peer2", SET, (("asn", "65201"),)), ("peer2", DEL, ())], known_keys) == [
+        ("peer2", DEL, ()),
+    ]
+    assert known_keys == {"peer3"}
+
+def test_process_subscriber():
+    runner = Runner(MagicMock())
+    callback = MagicMock()
+    subscriber = MagicMock()
+    subscriber.getTableName.return_value = "BGP_NEIGHBOR"
+    subscriber.getDbConnector.return_value.getDbId.return_value = 4
+    subscriber.pops.side_effect = [
+        [("10.0.0.1", SET, (("asn", "65100"),)), ("10.0.0.1", SET, (("asn", "65101"),))],
+        [("10.0.0.3", SET, (("asn", "65300"),))],
+        [],
+    ]
+    runner.callbacks[4]["BGP_NEIGHBOR"].append(callback)
+
+    runner.process_subscriber(subscriber)
+
+    assert callback.call_args_list == [
+        (("10.0.0.1", SET, {"asn": "65101"}),),
+        (("10.0.0.3", SET, {"asn": "65300"}),),
+    ]
+    assert runner.counters == {'received': 3, 'applied': 2}
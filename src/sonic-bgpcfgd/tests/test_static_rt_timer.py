@@ -0,0 +1,115 @@
+from unittest.mock import MagicMock, patch
+
+from . import swsscommon_test
+
+with patch.dict("sys.modules", swsscommon=swsscommon_test):
+    from bgpcfgd.static_rt_timer import StaticRouteTimer
+
+
+def expire_routes(routes, keys):
+    """ What the expiry script does to the routes """
+    refreshed = []
+    for key in keys:
+        route = routes.get(key)
+        if route is None or route.get("expiry") == "false":
+            continue
+        if route.get("refresh") == "true":
+            route["refresh"] = "false"
+            refreshed.append(key)
+        else:
+            del routes[key]
+    return refreshed
+
+def get_timer(routes):
+    timer = StaticRouteTimer()
+    timer.db = MagicMock()
+    timer.db.get.return_value = None
+    timer.expire_routes = MagicMock(side_effect=lambda keys: expire_routes(routes, keys))
+    return timer
+
+def expire(timer, key):
+    with timer.cond:
+        timer.deadlines[key] = 0
+        timer.heap.append((0, key))
+        timer.heap.sort()
+
+def test_schedule():
+    timer = get_timer({})
+    timer.schedule("10.1.0.0/24", {"nexthop": "10.0.0.1", "refresh": "true"})
+    timer.schedule("vrf1:10.2.0.0/24", {"nexthop": "10.0.0.1", "expiry": "false"})
+    assert list(timer.deadlines) == ["STATIC_ROUTE:10.1.0.0/24"]
+    timer.unschedule("10.1.0.0/24")
+    assert timer.deadlines == {}
+    # nothing is due: nothing is checked
+    timer.alarm()
+    timer.expire_routes.assert_not_called()
+
+def test_alarm():
+    routes = {
+        "STATIC_ROUTE:10.1.0.0/24": {"nexthop": "10.0.0.1", "refresh": "true"},
+        "STATIC_ROUTE:10.2.0.0/24": {"nexthop": "10.0.0.1", "refresh": "false"},
+        "STATIC_ROUTE:10.3.0.0/24": {"nexthop": "10.0.0.1", "expiry": "false"},
+        "STATIC_ROUTE:10.4.0.0/24": {"nexthop": "10.0.0.1", "refresh": "false"},
+    }
+    timer = get_timer(routes)
+    for key in routes:
+        expire(timer, key)
+    timer.schedule("10.4.0.0/24", routes["STATIC_ROUTE:10.4.0.0/24"])
+    timer.alarm()
+    # the due routes are checked in one batch
+    timer.expire_routes.assert_called_once()
+    assert routes == {
+        "STATIC_ROUTE:10.1.0.0/24": {"nexthop": "10.0.0.1", "refresh": "false"},
+        "STATIC_ROUTE:10.3.0.0/24": {"nexthop": "10.0.0.1", "expiry": "false"},
+        "STATIC_ROUTE:10.4.0.0/24": {"nexthop": "10.0.0.1", "refresh": "false"},
+    }
+    # the refreshed route is checked again, the route written meanwhile keeps its timer
+    assert sorted(timer.deadlines) == ["STATIC_ROUTE:10.1.0.0/24", "STATIC_ROUTE:10.4.0.0/24"]
+
+def test_scan():
+    timer = get_timer({})
+    timer.db.scan.side_effect = [(5, ["STATIC_ROUTE:10.1.0.0/24"]), (0, ["STATIC_ROUTE:10.2.0.0/24"])]
+    timer.push("STATIC_ROUTE:10.2.0.0/24", 1)
+    timer.scan()
+    assert timer.deadlines["STATIC_ROUTE:10.2.0.0/24"] == 1
+    assert timer.deadlines["STATIC_ROUTE:10.1.0.0/24"] > 1
+    assert timer.heap[0] == (1, "STATIC_ROUTE:10.2.0.0/24")
+
+def test_expiry_time_change():
+    timer = get_timer({})
+    timer.push("STATIC_ROUTE:10.1.0.0/24", 1000 + timer.DEFAULT_TIMER)
+    timer.push("STATIC_ROUTE:10.2.0.0/24", 1100 + timer.DEFAULT_TIMER)
+    timer.unschedule("10.2.0.0/24")
+    timer.db.get.return_value = "60"
+    timer.update_timer()
+    assert timer.get_timer() == 60
+    assert timer.deadlines == {"STATIC_ROUTE:10.1.0.0/24": 1060}
+    # stale entries are dropped
+    assert timer.heap == [(1060, "STATIC_ROUTE:10.1.0.0/24")]
+    # unchanged: nothing is moved
+    timer.update_timer()
+    assert timer.deadlines == {"STATIC_ROUTE:10.1.0.0/24": 1060}
+    timer.db.get.return_value = "240"
+    timer.update_timer()
+    assert timer.deadlines == {"STATIC_ROUTE:10.1.0.0/24": 1240}
+
+def test_alarm_batches():
+    routes = {"STATIC_ROUTE:10.%d.0.0/24" % i: {"nexthop": "10.0.0.1", "refresh": "false"} for i in range(250)}
+    timer = get_timer(routes)
+    for key in list(routes):
+        expire(timer, key)
+    timer.alarm()
+    assert [len(call[0][0]) for call in timer.expire_routes.call_args_list] == [100, 100, 50]
+    assert routes == {}
+
+def test_expire_routes():
+    timer = StaticRouteTimer()
+    timer.db = MagicMock()
+    with patch.object(swsscommon_test.swsscommon, "loadRedisScript", return_value="sha") as load, \
+         patch.object(swsscommon_test.swsscommon, "runRedisScript", return_value=["STATIC_ROUTE:10.1.0.0/24"]) as run:
+        assert timer.expire_routes(["STATIC_ROUTE:10.1.0.0/24", "STATIC_ROUTE:10.2.0.0/24"]) == ["STATIC_ROUTE:10.1.0.0/24"]
+        timer.expire_routes(["STATIC_ROUTE:10.3.0.0/24"])
+    # the script is loaded once
+    load.assert_called_once()
+    client = timer.db.get_redis_client.return_value
+    run.assert_called_with(client, "sha", ["STATIC_ROUTE:10.3.0.0/24"], [])
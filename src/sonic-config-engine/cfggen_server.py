@@ -0,0 +1,284 @@
+"""cfggen_server.py
+
+Persistent render server for sonic-cfggen.
+
+sonic-cfggen is invoked dozens of times while the system boots. Each
+invocation starts a new interpreter, imports jinja2/netaddr/yaml/swsscommon
+and re-reads its data sources. When the render server is running, sonic-cfggen
+forwards its command line over a unix socket to a long-lived process which
+keeps the parsed data sources and compiled templates warm between requests.
+
+The client side of this module only depends on the standard library so that
+forwarding a request stays cheap.
+"""
+
+from __future__ import print_function
+
+import copy
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import threading
+
+DEFAULT_SOCKET_PATH = '/var/run/sonic-cfggen/cfggen.sock'
+
+# Environment variables understood by the client
+SOCKET_PATH_ENV = 'SONIC_CFGGEN_SOCKET'
+DISABLE_ENV = 'SONIC_CFGGEN_NO_SERVER'
+
+# Paths of the file descriptors of the client (stdin, process substitution),
+# the server would open its own
+_CLIENT_FD_PATHS = ('/dev/stdin', '/dev/fd/', '/proc/self/fd/')
+
+_HEADER = struct.Struct('!I')
+_CONNECT_TIMEOUT = 1.0
+# A render takes a few seconds at most, past that the server is considered
+# stuck and the client renders locally
+_REQUEST_TIMEOUT = 60.0
+
+
+def _send_msg(sock, obj):
+    payload = json.dumps(obj).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise EOFError('connection closed by peer')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_msg(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size).decode('utf-8'))
+
+
+def get_socket_path():
+    return os.environ.get(SOCKET_PATH_ENV, DEFAULT_SOCKET_PATH)
+
+
+def _reads_client_fds(argv):
+    """ Whether the request may read the standard input or another open file of the client """
+    if any(path in arg for arg in argv for path in _CLIENT_FD_PATHS):
+        return True
+    try:
+        mode = os.fstat(sys.stdin.fileno()).st_mode
+    except (AttributeError, ValueError, OSError):
+        return False
+    # Piped or redirected from a file
+    return stat.S_ISFIFO(mode) or stat.S_ISREG(mode)
+
+
+def forward_to_server(argv):
+    """
+    Forward a sonic-cfggen command line to the render server.
+
+    Returns the exit code of the remote invocation, or None when the request
+    has to be handled locally (server disabled, not running or unreachable,
+    Python 2, or the request reads the standard input or a /dev/fd/* file,
+    which are not forwarded).
+    """
+    # The server only runs on Python 3
+    if sys.version_info.major < 3:
+        return None
+    if os.environ.get(DISABLE_ENV) or '--server' in argv or _reads_client_fds(argv):
+        return None
+    path = get_socket_path()
+    if not os.path.exists(path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(_CONNECT_TIMEOUT)
+        sock.connect(path)
+        sock.settimeout(_REQUEST_TIMEOUT)
+        _send_msg(sock, {
+            'argv': list(argv),
+            'cwd': os.getcwd(),
+            'env': dict(os.environ),
+        })
+        reply = _recv_msg(sock)
+    except (socket.error, EOFError, ValueError):
+        # Stale socket, server went away or timed out, render locally
+        return None
+    finally:
+        sock.close()
+
+    sys.stdout.write(reply['stdout'])
+    sys.stderr.write(reply['stderr'])
+    return reply['rc']
+
+
+class RenderCache(object):
+    """
+    Data sources kept warm by the render server between requests.
+
+    Minigraph parse results are keyed on the parse arguments and the stat of
+    every input file, including the port config and hwsku.json files found
+    from the platform and hwsku when they are not given. CONFIG_DB dumps are
+    dropped as soon as a keyspace notification is seen for the database they
+    were read from.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.minigraph = {}
+        self.config_db = {}
+        self.listeners = {}
+
+    @staticmethod
+    def _file_stamp(path):
+        if path is None or not os.path.isfile(path):
+            return None
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime, st.st_size)
+
+    def _port_config_stamps(self, filename, kwargs):
+        import minigraph
+        import minigraph_cache
+
+        hwsku = minigraph.get_minigraph_header(filename)['hwsku']
+        paths = minigraph_cache.port_config_files(hwsku, kwargs.get('platform'), kwargs.get('port_config_file'),
+                                                  kwargs.get('asic_name'), kwargs.get('hwsku_config_file'))
+        return tuple(self._file_stamp(path) for path in paths)
+
+    def get_minigraph(self, loader, filename, **kwargs):
+        """
+        Return the parsed minigraph, calling loader on a miss.
+
+        Without a port config file the ports may be read from CONFIG_DB, which
+        is not part of the key, so such minigraphs are not kept.
+        """
+        if kwargs.get('port_config_file') is None:
+            return loader(filename, **kwargs)
+        key = (self._file_stamp(filename),
+               self._port_config_stamps(filename, kwargs),
+               tuple(sorted(kwargs.items())))
+        with self.lock:
+            data = self.minigraph.get(key)
+        if data is None:
+            data = loader(filename, **kwargs)
+            with self.lock:
+                self.minigraph[key] = data
+        return copy.deepcopy(data)
+
+    def _drain_notifications(self, key):
+        pubsub = self.listeners[key]
+        changed = False
+        while True:
+            msg = pubsub.get_message()
+            if not msg:
+                break
+            if msg.get('type') == 'pmessage':
+                changed = True
+        if changed:
+            self.config_db.pop(key, None)
+
+    def get_config_db(self, configdb, key):
+        """
+        Return the content of the CONFIG_DB configdb is connected to.
+
+        Keyspace notifications are published by redis before the write is
+        acknowledged, so draining them before every lookup guarantees that a
+        client never observes data older than its own writes.
+        """
+        with self.lock:
+            if key not in self.listeners:
+                pubsub = configdb.get_redis_client(configdb.db_name).pubsub()
+                pubsub.psubscribe("__keyspace@{}__:*".format(configdb.get_dbid(configdb.db_name)))
+                self.listeners[key] = pubsub
+            self._drain_notifications(key)
+            data = self.config_db.get(key)
+        if data is None:
+            data = configdb.get_config()
+            with self.lock:
+                self.config_db[key] = data
+        return copy.deepcopy(data)
+
+
+class RenderServer(object):
+    """
+    Serve sonic-cfggen requests on a unix socket.
+
+    Requests are handled one at a time in the calling thread: rendering
+    switches the working directory, environment and standard streams of the
+    process to the ones of the client. Python 3 only, the output of a request
+    is captured in an io.StringIO.
+    """
+    def __init__(self, handler, path=None):
+        self.handler = handler
+        self.path = path or get_socket_path()
+        self.sock = None
+
+    def _bind(self):
+        sock_dir = os.path.dirname(self.path)
+        if sock_dir and not os.path.isdir(sock_dir):
+            os.makedirs(sock_dir)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Requests can write arbitrary files, only root may talk to us. Create
+        # the socket private, a chmod after bind() leaves a window in which
+        # anyone can connect
+        old_umask = os.umask(0o077)
+        try:
+            self.sock.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        self.sock.listen(64)
+
+    def _run_request(self, request):
+        from io import StringIO
+
+        saved_cwd = os.getcwd()
+        saved_env = dict(os.environ)
+        saved_streams = (sys.stdout, sys.stderr)
+        out, err = StringIO(), StringIO()
+        rc = 0
+        try:
+            os.chdir(request['cwd'])
+            os.environ.clear()
+            os.environ.update(request['env'])
+            sys.stdout, sys.stderr = out, err
+            self.handler(request['argv'])
+        except SystemExit as e:
+            if e.code is None:
+                rc = 0
+            elif isinstance(e.code, int):
+                rc = e.code
+            else:
+                print(e.code, file=err)
+                rc = 1
+        except Exception:
+            import traceback
+            traceback.print_exc(file=err)
+            rc = 1
+        finally:
+            sys.stdout, sys.stderr = saved_streams
+            os.environ.clear()
+            os.environ.update(saved_env)
+            os.chdir(saved_cwd)
+        return {'rc': rc, 'stdout': out.getvalue(), 'stderr': err.getvalue()}
+
+    def serve_forever(self):
+        self._bind()
+        try:
+            while True:
+                conn, _ = self.sock.accept()
+                try:
+                    _send_msg(conn, self._run_request(_recv_msg(conn)))
+                except (socket.error, EOFError, ValueError) as e:
+                    print('cfggen server: dropped request: {}'.format(e), file=sys.stderr)
+                finally:
+                    conn.close()
+        finally:
+            self.sock.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
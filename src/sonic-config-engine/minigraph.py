@@ -1,5 +1,6 @@
 from __future__ import print_function
 
+import copy
 import ipaddress
 import math
 import os
@@ -32,6 +33,24 @@ ns1 = "http://schemas.datacontract.org/2004/07/Microsoft.Search.Autopilot.Evolut
 ns2 = "Microsoft.Search.Autopilot.NetMux"
 ns3 = "http://www.w3.org/2001/XMLSchema-instance"
 
+class QNames(object):
+    """
+    Tags of a namespace in Clark notation, built once per name:
+    QNames(ns).Hostname == str(QName(ns, "Hostname"))
+    """
+    def __init__(self, namespace):
+        self._namespace = namespace
+
+    def __getattr__(self, name):
+        tag = str(QName(self._namespace, name))
+        setattr(self, name, tag)
+        return tag
+
+ns_tag = QNames(ns)
+ns1_tag = QNames(ns1)
+ns2_tag = QNames(ns2)
+ns3_tag = QNames(ns3)
+
 # Device types
 spine_chassis_frontend_role = 'SpineChassisFrontendRouter'
 chassis_backend_role = 'ChassisBackendRouter'
@@ -97,29 +116,29 @@ def parse_device(device):
     d_subtype = None
 
     for node in device:
-        if node.tag == str(QName(ns, "Address")):
-            lo_prefix = node.find(str(QName(ns2, "IPPrefix"))).text
-        elif node.tag == str(QName(ns, "AddressV6")):
-            lo_prefix_v6 = node.find(str(QName(ns2, "IPPrefix"))).text
-        elif node.tag == str(QName(ns, "ManagementAddress")):
-            mgmt_prefix = node.find(str(QName(ns2, "IPPrefix"))).text
-        elif node.tag == str(QName(ns, "ManagementAddressV6")):
-            mgmt_prefix_v6 = node.find(str(QName(ns2, "IPPrefix"))).text
-        elif node.tag == str(QName(ns, "Hostname")):
+        if node.tag == ns_tag.Address:
+            lo_prefix = node.find(ns2_tag.IPPrefix).text
+        elif node.tag == ns_tag.AddressV6:
+            lo_prefix_v6 = node.find(ns2_tag.IPPrefix).text
+        elif node.tag == ns_tag.ManagementAddress:
+            mgmt_prefix = node.find(ns2_tag.IPPrefix).text
+        elif node.tag == ns_tag.ManagementAddressV6:
+            mgmt_prefix_v6 = node.find(ns2_tag.IPPrefix).text
+        elif node.tag == ns_tag.Hostname:
             name = node.text
-        elif node.tag == str(QName(ns, "HwSku")):
+        elif node.tag == ns_tag.HwSku:
             hwsku = node.text
-        elif node.tag == str(QName(ns, "DeploymentId")):
+        elif node.tag == ns_tag.DeploymentId:
             deployment_id = node.text
-        elif node.tag == str(QName(ns, "ElementType")):
+        elif node.tag == ns_tag.ElementType:
             d_type = node.text
-        elif node.tag == str(QName(ns, "ClusterName")):
+        elif node.tag == ns_tag.ClusterName:
             cluster = node.text
-        elif node.tag == str(QName(ns, "SubType")):
+        elif node.tag == ns_tag.SubType:
             d_subtype = node.text
 
-    if d_type is None and str(QName(ns3, "type")) in device.attrib:
-        d_type = device.attrib[str(QName(ns3, "type"))]
+    if d_type is None and ns3_tag.type in device.attrib:
+        d_type = device.attrib[ns3_tag.type]
 
     return (lo_prefix, lo_prefix_v6, mgmt_prefix, mgmt_prefix_v6, name, hwsku, d_type, deployment_id, cluster, d_subtype)
 
@@ -204,16 +223,16 @@ def parse_png(png, hname, dpg_ecmp_content = None):
     NEIGH = {}
 
     for child in png:
-        if child.tag == str(QName(ns, "DeviceInterfaceLinks")):
-            for link in child.findall(str(QName(ns, "DeviceLinkBase"))):
-                linktype = link.find(str(QName(ns, "ElementType"))).text
+        if child.tag == ns_tag.DeviceInterfaceLinks:
+            for link in child.findall(ns_tag.DeviceLinkBase):
+                linktype = link.find(ns_tag.ElementType).text
                 if linktype == "DeviceSerialLink":
-                    enddevice = link.find(str(QName(ns, "EndDevice"))).text
-                    endport = link.find(str(QName(ns, "EndPort"))).text
-                    startdevice = link.find(str(QName(ns, "StartDevice"))).text
-                    startport = link.find(str(QName(ns, "StartPort"))).text
-                    baudrate = link.find(str(QName(ns, "Bandwidth"))).text
-                    flowcontrol = 1 if link.find(str(QName(ns, "FlowControl"))) is not None and link.find(str(QName(ns, "FlowControl"))).text == 'true' else 0
+                    enddevice = link.find(ns_tag.EndDevice).text
+                    endport = link.find(ns_tag.EndPort).text
+                    startdevice = link.find(ns_tag.StartDevice).text
+                    startport = link.find(ns_tag.StartPort).text
+                    baudrate = link.find(ns_tag.Bandwidth).text
+                    flowcontrol = 1 if link.find(ns_tag.FlowControl) is not None and link.find(ns_tag.FlowControl).text == 'true' else 0
                     if enddevice.lower() == hname.lower() and endport.isdigit():
                         console_ports[endport] = {
                             'remote_device': startdevice,
@@ -229,18 +248,18 @@ def parse_png(png, hname, dpg_ecmp_content = None):
                     continue
 
                 if linktype == "DeviceInterfaceLink":
-                    endport = link.find(str(QName(ns, "EndPort"))).text
-                    startdevice = link.find(str(QName(ns, "StartDevice"))).text
+                    endport = link.find(ns_tag.EndPort).text
+                    startdevice = link.find(ns_tag.StartDevice).text
                     port_device_map[endport] = startdevice
 
                 if linktype != "DeviceInterfaceLink" and linktype != "UnderlayInterfaceLink" and linktype != "DeviceMgmtLink":
                     continue
 
-                enddevice = link.find(str(QName(ns, "EndDevice"))).text
-                endport = link.find(str(QName(ns, "EndPort"))).text
-                startdevice = link.find(str(QName(ns, "StartDevice"))).text
-                startport = link.find(str(QName(ns, "StartPort"))).text
-                bandwidth_node = link.find(str(QName(ns, "Bandwidth")))
+                enddevice = link.find(ns_tag.EndDevice).text
+                endport = link.find(ns_tag.EndPort).text
+                startdevice = link.find(ns_tag.StartDevice).text
+                startport = link.find(ns_tag.StartPort).text
+                bandwidth_node = link.find(ns_tag.Bandwidth)
                 bandwidth = bandwidth_node.text if bandwidth_node is not None else None
                 if enddevice.lower() == hname.lower():
                     if endport in port_alias_map:
@@ -257,8 +276,8 @@ def parse_png(png, hname, dpg_ecmp_content = None):
                     if bandwidth:
                         port_speeds[startport] = bandwidth
 
-        if child.tag == str(QName(ns, "Devices")):
-            for device in child.findall(str(QName(ns, "Device"))):
+        if child.tag == ns_tag.Devices:
+            for device in child.findall(ns_tag.Device):
                 (lo_prefix, lo_prefix_v6, mgmt_prefix, mgmt_prefix_v6, name, hwsku, d_type, deployment_id, cluster, d_subtype) = parse_device(device)
                 device_data = {}
                 if hwsku != None:
@@ -281,29 +300,29 @@ def parse_png(png, hname, dpg_ecmp_content = None):
                     device_data['subtype'] = d_subtype
                 devices[name] = device_data
 
-        if child.tag == str(QName(ns, "DeviceInterfaceLinks")):
-            for if_link in child.findall(str(QName(ns, 'DeviceLinkBase'))):
-                if str(QName(ns3, "type")) in if_link.attrib:
-                    link_type = if_link.attrib[str(QName(ns3, "type"))]
+        if child.tag == ns_tag.DeviceInterfaceLinks:
+            for if_link in child.findall(ns_tag.DeviceLinkBase):
+                if ns3_tag.type in if_link.attrib:
+                    link_type = if_link.attrib[ns3_tag.type]
                     if link_type == 'DeviceSerialLink':
                         for node in if_link:
-                            if node.tag == str(QName(ns, "EndPort")):
+                            if node.tag == ns_tag.EndPort:
                                 console_port = node.text.split()[-1]
-                            elif node.tag == str(QName(ns, "EndDevice")):
+                            elif node.tag == ns_tag.EndDevice:
                                 console_dev = node.text
                     elif link_type == 'DeviceMgmtLink':
                         for node in if_link:
-                            if node.tag == str(QName(ns, "EndPort")):
+                            if node.tag == ns_tag.EndPort:
                                 mgmt_port = node.text.split()[-1]
-                            elif node.tag == str(QName(ns, "EndDevice")):
+                            elif node.tag == ns_tag.EndDevice:
                                 mgmt_dev = node.text
 
 
-        if child.tag == str(QName(ns, "DeviceInterfaceLinks")):
-            for link in child.findall(str(QName(ns, 'DeviceLinkBase'))):
-                if link.find(str(QName(ns, "ElementType"))).text == "LogicalLink":
-                    intf_name = link.find(str(QName(ns, "EndPort"))).text
-                    start_device = link.find(str(QName(ns, "StartDevice"))).text
+        if child.tag == ns_tag.DeviceInterfaceLinks:
+            for link in child.findall(ns_tag.DeviceLinkBase):
+                if link.find(ns_tag.ElementType).text == "LogicalLink":
+                    intf_name = link.find(ns_tag.EndPort).text
+                    start_device = link.find(ns_tag.StartDevice).text
                     if intf_name in port_alias_map:
                         intf_name = port_alias_map[intf_name]
 
@@ -324,11 +343,11 @@ def parse_png(png, hname, dpg_ecmp_content = None):
 def parse_asic_external_link(link, asic_name, hostname):
     neighbors = {}
     port_speeds = {}
-    enddevice = link.find(str(QName(ns, "EndDevice"))).text
-    endport = link.find(str(QName(ns, "EndPort"))).text
-    startdevice = link.find(str(QName(ns, "StartDevice"))).text
-    startport = link.find(str(QName(ns, "StartPort"))).text
-    bandwidth_node = link.find(str(QName(ns, "Bandwidth")))
+    enddevice = link.find(ns_tag.EndDevice).text
+    endport = link.find(ns_tag.EndPort).text
+    startdevice = link.find(ns_tag.StartDevice).text
+    startport = link.find(ns_tag.StartPort).text
+    bandwidth_node = link.find(ns_tag.Bandwidth)
     bandwidth = bandwidth_node.text if bandwidth_node is not None else None
     # if chassis internal is false, the interface name will be
     # interface alias which should be converted to asic port name
@@ -352,11 +371,11 @@ def parse_asic_external_link(link, asic_name, hostname):
 def parse_asic_internal_link(link, asic_name, hostname):
     neighbors = {}
     port_speeds = {}
-    enddevice = link.find(str(QName(ns, "EndDevice"))).text
-    endport = link.find(str(QName(ns, "EndPort"))).text
-    startdevice = link.find(str(QName(ns, "StartDevice"))).text
-    startport = link.find(str(QName(ns, "StartPort"))).text
-    bandwidth_node = link.find(str(QName(ns, "Bandwidth")))
+    enddevice = link.find(ns_tag.EndDevice).text
+    endport = link.find(ns_tag.EndPort).text
+    startdevice = link.find(ns_tag.StartDevice).text
+    startport = link.find(ns_tag.StartPort).text
+    bandwidth_node = link.find(ns_tag.Bandwidth)
     bandwidth = bandwidth_node.text if bandwidth_node is not None else None
     if ((enddevice.lower() == asic_name.lower()) and
             (startdevice.lower() != hostname.lower())):
@@ -380,13 +399,13 @@ def parse_asic_png(png, asic_name, hostname):
     devices = {}
     port_speeds = {}
     for child in png:
-        if child.tag == str(QName(ns, "DeviceInterfaceLinks")):
-            for link in child.findall(str(QName(ns, "DeviceLinkBase"))):
+        if child.tag == ns_tag.DeviceInterfaceLinks:
+            for link in child.findall(ns_tag.DeviceLinkBase):
                 # Chassis internal node is used in multi-asic device or chassis minigraph
                 # where the minigraph will contain the internal asic connectivity and
                 # external neighbor information. The ChassisInternal node will be used to
                 # determine if the link is internal to the device or chassis.
-                chassis_internal_node = link.find(str(QName(ns, "ChassisInternal")))
+                chassis_internal_node = link.find(ns_tag.ChassisInternal)
                 chassis_internal = chassis_internal_node.text if chassis_internal_node is not None else "false"
 
                 # If the link is an external link include the external neighbor
@@ -400,8 +419,8 @@ def parse_asic_png(png, asic_name, hostname):
                     neighbors.update(int_neighbors)
                     port_speeds.update(int_port_speeds)
 
-        if child.tag == str(QName(ns, "Devices")):
-            for device in child.findall(str(QName(ns, "Device"))):
+        if child.tag == ns_tag.Devices:
+            for device in child.findall(ns_tag.Device):
                 (lo_prefix, lo_prefix_v6, mgmt_prefix, mgmt_prefix_v6, name, hwsku, d_type, deployment_id, cluster, _) = parse_device(device)
                 device_data = {}
                 if hwsku != None:
@@ -426,11 +445,11 @@ def parse_asic_png(png, asic_name, hostname):
 
 
 def parse_loopback_intf(child):
-    lointfs = child.find(str(QName(ns, "LoopbackIPInterfaces")))
+    lointfs = child.find(ns_tag.LoopbackIPInterfaces)
     lo_intfs = {}
-    for lointf in lointfs.findall(str(QName(ns1, "LoopbackIPInterface"))):
-        intfname = lointf.find(str(QName(ns, "AttachTo"))).text
-        ipprefix = lointf.find(str(QName(ns1, "PrefixStr"))).text
+    for lointf in lointfs.findall(ns1_tag.LoopbackIPInterface):
+        intfname = lointf.find(ns_tag.AttachTo).text
+        ipprefix = lointf.find(ns1_tag.PrefixStr).text
         lo_intfs[(intfname, ipprefix)] = {}
     return lo_intfs
 
@@ -448,91 +467,91 @@ def parse_dpg(dpg, hname):
             There is just one aclintf node in the minigraph
             Get the aclintfs node first.
         """
-        if aclintfs is None and child.find(str(QName(ns, "AclInterfaces"))) is not None:
-            aclintfs = child.find(str(QName(ns, "AclInterfaces")))
+        if aclintfs is None and child.find(ns_tag.AclInterfaces) is not None:
+            aclintfs = child.find(ns_tag.AclInterfaces)
         """
             In Multi-NPU platforms the mgmt intfs are defined only for the host not for individual asic
             There is just one mgmtintf node in the minigraph
             Get the mgmtintfs node first. We need mgmt intf to get mgmt ip in per asic dockers.
         """
-        if mgmtintfs is None and child.find(str(QName(ns, "ManagementIPInterfaces"))) is not None:
-            mgmtintfs = child.find(str(QName(ns, "ManagementIPInterfaces")))
-        hostname = child.find(str(QName(ns, "Hostname")))
+        if mgmtintfs is None and child.find(ns_tag.ManagementIPInterfaces) is not None:
+            mgmtintfs = child.find(ns_tag.ManagementIPInterfaces)
+        hostname = child.find(ns_tag.Hostname)
         if hostname.text.lower() != hname.lower():
             continue
 
         vni = vni_default
-        vni_element = child.find(str(QName(ns, "VNI")))
+        vni_element = child.find(ns_tag.VNI)
         if vni_element != None:
             if vni_element.text.isdigit():
                 vni = int(vni_element.text)
             else:
                 print("VNI must be an integer (use default VNI %d instead)" % vni_default, file=sys.stderr) 
 
-        ipintfs = child.find(str(QName(ns, "IPInterfaces")))
+        ipintfs = child.find(ns_tag.IPInterfaces)
         intfs = {}
         ip_intfs_map = {}
-        for ipintf in ipintfs.findall(str(QName(ns, "IPInterface"))):
-            intfalias = ipintf.find(str(QName(ns, "AttachTo"))).text
+        for ipintf in ipintfs.findall(ns_tag.IPInterface):
+            intfalias = ipintf.find(ns_tag.AttachTo).text
             intfname = port_alias_map.get(intfalias, intfalias)
-            ipprefix = ipintf.find(str(QName(ns, "Prefix"))).text
+            ipprefix = ipintf.find(ns_tag.Prefix).text
             intfs[(intfname, ipprefix)] = {}
             ip_intfs_map[ipprefix] = intfalias
         lo_intfs = parse_loopback_intf(child)
 
-        subintfs = child.find(str(QName(ns, "SubInterfaces")))
+        subintfs = child.find(ns_tag.SubInterfaces)
         if subintfs is not None:
-            for subintf in subintfs.findall(str(QName(ns, "SubInterface"))):
-                intfalias = subintf.find(str(QName(ns, "AttachTo"))).text
+            for subintf in subintfs.findall(ns_tag.SubInterface):
+                intfalias = subintf.find(ns_tag.AttachTo).text
                 intfname = port_alias_map.get(intfalias, intfalias)
-                ipprefix = subintf.find(str(QName(ns, "Prefix"))).text
-                subintfvlan = subintf.find(str(QName(ns, "Vlan"))).text
+                ipprefix = subintf.find(ns_tag.Prefix).text
+                subintfvlan = subintf.find(ns_tag.Vlan).text
                 subintfname = intfname + VLAN_SUB_INTERFACE_SEPARATOR + subintfvlan
                 intfs[(subintfname, ipprefix)] = {}
 
-        mvrfConfigs = child.find(str(QName(ns, "MgmtVrfConfigs")))
+        mvrfConfigs = child.find(ns_tag.MgmtVrfConfigs)
         mvrf = {}
         if mvrfConfigs != None:
-            mv = mvrfConfigs.find(str(QName(ns1, "MgmtVrfGlobal")))
+            mv = mvrfConfigs.find(ns1_tag.MgmtVrfGlobal)
             if mv != None:
-                mvrf_en_flag = mv.find(str(QName(ns, "mgmtVrfEnabled"))).text
+                mvrf_en_flag = mv.find(ns_tag.mgmtVrfEnabled).text
                 mvrf["vrf_global"] = {"mgmtVrfEnabled": mvrf_en_flag}
 
         mgmt_intf = {}
-        for mgmtintf in mgmtintfs.findall(str(QName(ns1, "ManagementIPInterface"))):
-            intfname = mgmtintf.find(str(QName(ns, "AttachTo"))).text
-            ipprefix = mgmtintf.find(str(QName(ns1, "PrefixStr"))).text
+        for mgmtintf in mgmtintfs.findall(ns1_tag.ManagementIPInterface):
+            intfname = mgmtintf.find(ns_tag.AttachTo).text
+            ipprefix = mgmtintf.find(ns1_tag.PrefixStr).text
             mgmtipn = ipaddress.ip_network(UNICODE_TYPE(ipprefix), False)
             gwaddr = ipaddress.ip_address(next(mgmtipn.hosts()))
             mgmt_intf[(intfname, ipprefix)] = {'gwaddr': gwaddr}
 
-        voqinbandintfs = child.find(str(QName(ns, "VoqInbandInterfaces")))
+        voqinbandintfs = child.find(ns_tag.VoqInbandInterfaces)
         voq_inband_intfs = {}
         if voqinbandintfs:
-            for voqintf in voqinbandintfs.findall(str(QName(ns1, "VoqInbandInterface"))):
-                intfname = voqintf.find(str(QName(ns, "Name"))).text
-                intftype = voqintf.find(str(QName(ns, "Type"))).text
-                ipprefix = voqintf.find(str(QName(ns1, "PrefixStr"))).text
+            for voqintf in voqinbandintfs.findall(ns1_tag.VoqInbandInterface):
+                intfname = voqintf.find(ns_tag.Name).text
+                intftype = voqintf.find(ns_tag.Type).text
+                ipprefix = voqintf.find(ns1_tag.PrefixStr).text
                 if intfname not in voq_inband_intfs:
                    voq_inband_intfs[intfname] = {'inband_type': intftype}
                 voq_inband_intfs["%s|%s" % (intfname, ipprefix)] = {}
 
-        pcintfs = child.find(str(QName(ns, "PortChannelInterfaces")))
+        pcintfs = child.find(ns_tag.PortChannelInterfaces)
         pc_intfs = []
         pcs = {}
         pc_members = {}
         intfs_inpc = [] # List to hold all the LAG member interfaces 
-        for pcintf in pcintfs.findall(str(QName(ns, "PortChannel"))):
-            pcintfname = pcintf.find(str(QName(ns, "Name"))).text
-            pcintfmbr = pcintf.find(str(QName(ns, "AttachTo"))).text
+        for pcintf in pcintfs.findall(ns_tag.PortChannel):
+            pcintfname = pcintf.find(ns_tag.Name).text
+            pcintfmbr = pcintf.find(ns_tag.AttachTo).text
             pcmbr_list = pcintfmbr.split(';')
             pc_intfs.append(pcintfname)
             for i, member in enumerate(pcmbr_list):
                 pcmbr_list[i] = port_alias_map.get(member, member)
                 intfs_inpc.append(pcmbr_list[i])
                 pc_members[(pcintfname, pcmbr_list[i])] = {}
-            if pcintf.find(str(QName(ns, "Fallback"))) != None:
-                pcs[pcintfname] = {'members': pcmbr_list, 'fallback': pcintf.find(str(QName(ns, "Fallback"))).text, 'min_links': str(int(math.ceil(len() * 0.75))), 'lacp_key': 'auto'}
+            if pcintf.find(ns_tag.Fallback) != None:
+                pcs[pcintfname] = {'members': pcmbr_list, 'fallback': pcintf.find(ns_tag.Fallback).text, 'min_links': str(int(math.ceil(len() * 0.75))), 'lacp_key': 'auto'}
             else:
                 pcs[pcintfname] = {'members': pcmbr_list, 'min_links': str(int(math.ceil(len(pcmbr_list) * 0.75))), 'lacp_key': 'auto' }
         port_nhipv4_map = {}
@@ -541,22 +560,22 @@ def parse_dpg(dpg, hname):
         nhportlist = []
         dpg_ecmp_content = {}
         static_routes = {}
-        ipnhs = child.find(str(QName(ns, "IPNextHops")))
+        ipnhs = child.find(ns_tag.IPNextHops)
         if ipnhs is not None:
-            for ipnh in ipnhs.findall(str(QName(ns, "IPNextHop"))):
-                if ipnh.find(str(QName(ns, "Type"))).text == 'FineGrainedECMPGroupMember':
-                    ipnhfmbr = ipnh.find(str(QName(ns, "AttachTo"))).text
-                    ipnhaddr = ipnh.find(str(QName(ns, "Address"))).text
+            for ipnh in ipnhs.findall(ns_tag.IPNextHop):
+                if ipnh.find(ns_tag.Type).text == 'FineGrainedECMPGroupMember':
+                    ipnhfmbr = ipnh.find(ns_tag.AttachTo).text
+                    ipnhaddr = ipnh.find(ns_tag.Address).text
                     nhportlist.append(ipnhfmbr)
                     if "." in ipnhaddr:
                         port_nhipv4_map[ipnhfmbr] = ipnhaddr
                     elif ":" in ipnhaddr:
                         port_nhipv6_map[ipnhfmbr] = ipnhaddr
-                elif ipnh.find(str(QName(ns, "Type"))).text == 'StaticRoute':
-                    prefix = ipnh.find(str(QName(ns, "AssociatedTo"))).text
-                    ifname = ipnh.find(str(QName(ns, "AttachTo"))).text
-                    nexthop = ipnh.find(str(QName(ns, "Address"))).text
-                    advertise = ipnh.find(str(QName(ns, "Advertise"))).text
+                elif ipnh.find(ns_tag.Type).text == 'StaticRoute':
+                    prefix = ipnh.find(ns_tag.AssociatedTo).text
+                    ifname = ipnh.find(ns_tag.AttachTo).text
+                    nexthop = ipnh.find(ns_tag.Address).text
+                    advertise = ipnh.find(ns_tag.Advertise).text
                     static_routes[prefix] = {'nexthop': nexthop, 'ifname': ifname, 'advertise': advertise}
 
             if port_nhipv4_map and port_nhipv6_map:
@@ -573,30 +592,30 @@ def parse_dpg(dpg, hname):
                 dpg_ecmp_content['ipv4'] = ipv4_content
                 dpg_ecmp_content['ipv6'] = ipv6_content
 
-        vlanintfs = child.find(str(QName(ns, "VlanInterfaces")))
+        vlanintfs = child.find(ns_tag.VlanInterfaces)
         vlans = {}
         vlan_members = {}
         vlan_member_list = {}
         dhcp_relay_table = {}
         # Dict: vlan member (port/PortChannel) -> set of VlanID, in which the member if an untagged vlan member
         untagged_vlan_mbr = defaultdict(set)
-        for vintf in vlanintfs.findall(str(QName(ns, "VlanInterface"))):
-            vlanid = vintf.find(str(QName(ns, "VlanID"))).text
-            vlantype = vintf.find(str(QName(ns, "Type")))
+        for vintf in vlanintfs.findall(ns_tag.VlanInterface):
+            vlanid = vintf.find(ns_tag.VlanID).text
+            vlantype = vintf.find(ns_tag.Type)
             if vlantype is None:
                 vlantype_name = ""
             else:
                 vlantype_name = vlantype.text
-            vintfmbr = vintf.find(str(QName(ns, "AttachTo"))).text
+            vintfmbr = vintf.find(ns_tag.AttachTo).text
             vmbr_list = vintfmbr.split(';')
             if vlantype_name != "Tagged":
                 for member in vmbr_list:
                     untagged_vlan_mbr[member].add(vlanid)
-        for vintf in vlanintfs.findall(str(QName(ns, "VlanInterface"))):
-            vintfname = vintf.find(str(QName(ns, "Name"))).text
-            vlanid = vintf.find(str(QName(ns, "VlanID"))).text
-            vintfmbr = vintf.find(str(QName(ns, "AttachTo"))).text
-            vlantype = vintf.find(str(QName(ns, "Type")))
+        for vintf in vlanintfs.findall(ns_tag.VlanInterface):
+            vintfname = vintf.find(ns_tag.Name).text
+            vlanid = vintf.find(ns_tag.VlanID).text
+            vintfmbr = vintf.find(ns_tag.AttachTo).text
+            vlantype = vintf.find(ns_tag.Type)
             if vlantype is None:
                 vlantype_name = ""
             else:
@@ -617,13 +636,13 @@ def parse_dpg(dpg, hname):
 
             # If this VLAN requires a DHCP relay agent, it will contain a <DhcpRelays> element
             # containing a list of DHCP server IPs
-            vintf_node = vintf.find(str(QName(ns, "DhcpRelays")))
+            vintf_node = vintf.find(ns_tag.DhcpRelays)
             if vintf_node is not None and vintf_node.text is not None:
                 vintfdhcpservers = vintf_node.text
                 vdhcpserver_list = vintfdhcpservers.split(';')
                 vlan_attributes['dhcp_servers'] = vdhcpserver_list
 
-            vintf_node = vintf.find(str(QName(ns, "Dhcpv6Relays")))
+            vintf_node = vintf.find(ns_tag.Dhcpv6Relays)
             if vintf_node is not None and vintf_node.text is not None:
                 vintfdhcpservers = vintf_node.text
                 vdhcpserver_list = vintfdhcpservers.split(';')
@@ -632,7 +651,7 @@ def parse_dpg(dpg, hname):
             sonic_vlan_member_name = "Vlan%s" % (vlanid)
             dhcp_relay_table[sonic_vlan_member_name] = dhcp_attributes
 
-            vlanmac = vintf.find(str(QName(ns, "MacAddress")))
+            vlanmac = vintf.find(ns_tag.MacAddress)
             if vlanmac is not None and vlanmac.text is not None:
                 vlan_attributes['mac'] = vlanmac.text
 
@@ -643,16 +662,16 @@ def parse_dpg(dpg, hname):
             vlan_member_list[sonic_vlan_name] = vmbr_list
 
         acls = {}
-        for aclintf in aclintfs.findall(str(QName(ns, "AclInterface"))):
-            if aclintf.find(str(QName(ns, "InAcl"))) is not None:
-                aclname = aclintf.find(str(QName(ns, "InAcl"))).text.upper().replace(" ", "_").replace("-", "_")
+        for aclintf in aclintfs.findall(ns_tag.AclInterface):
+            if aclintf.find(ns_tag.InAcl) is not None:
+                aclname = aclintf.find(ns_tag.InAcl).text.upper().replace(" ", "_").replace("-", "_")
                 stage = "ingress"
-            elif aclintf.find(str(QName(ns, "OutAcl"))) is not None:
-                aclname = aclintf.find(str(QName(ns, "OutAcl"))).text.upper().replace(" ", "_").replace("-", "_")
+            elif aclintf.find(ns_tag.OutAcl) is not None:
+                aclname = aclintf.find(ns_tag.OutAcl).text.upper().replace(" ", "_").replace("-", "_")
                 stage = "egress"
             else:
                 sys.exit("Error: 'AclInterface' must contain either an 'InAcl' or 'OutAcl' subelement.")
-            aclattach = aclintf.find(str(QName(ns, "AttachTo"))).text.split(';')
+            aclattach = aclintf.find(ns_tag.AttachTo).text.split(';')
             acl_intfs = []
             is_mirror = False
             is_mirror_v6 = False
@@ -723,7 +742,7 @@ def parse_dpg(dpg, hname):
             else:
                 # This ACL has no interfaces to attach to -- consider this a control plane ACL
                 try:
-                    aclservice = aclintf.find(str(QName(ns, "Type"))).text
+                    aclservice = aclintf.find(ns_tag.Type).text
 
                     # If we already have an ACL with this name and this ACL is bound to a different service,
                     # append the service to our list of services
@@ -743,7 +762,7 @@ def parse_dpg(dpg, hname):
                     print("Warning: Ignoring Control Plane ACL %s without type" % aclname, file=sys.stderr)
 
 
-        mg_tunnels = child.find(str(QName(ns, "TunnelInterfaces")))
+        mg_tunnels = child.find(ns_tag.TunnelInterfaces)
         if mg_tunnels is not None:
             table_key_to_mg_key_map = {"encap_ecn_mode": "EcnEncapsulationMode", 
                                        "ecn_mode": "EcnDecapsulationMode", 
@@ -756,7 +775,7 @@ def parse_dpg(dpg, hname):
                                        "encap_tc_to_queue_map": "EncapTcToQueueMap",
                                        "encap_tc_to_dscp_map": "EncapTcToDscpMap"}
 
-            for mg_tunnel in mg_tunnels.findall(str(QName(ns, "TunnelInterface"))):
+            for mg_tunnel in mg_tunnels.findall(ns_tag.TunnelInterface):
                 tunnel_type = mg_tunnel.attrib["Type"]
                 tunnel_name = mg_tunnel.attrib["Name"]
                 tunnelintfs[tunnel_type][tunnel_name] = {
@@ -782,7 +801,7 @@ def parse_dpg(dpg, hname):
 
 def parse_host_loopback(dpg, hname):
     for child in dpg:
-        hostname = child.find(str(QName(ns, "Hostname")))
+        hostname = child.find(ns_tag.Hostname)
         if hostname.text.lower() != hname.lower():
             continue
         lo_intfs = parse_loopback_intf(child)
@@ -797,25 +816,25 @@ def parse_cpg(cpg, hname, local_devices=[]):
     bgp_peers_with_range = {}
     for child in cpg:
         tag = child.tag
-        if tag == str(QName(ns, "PeeringSessions")):
-            for session in child.findall(str(QName(ns, "BGPSession"))):
-                start_router = session.find(str(QName(ns, "StartRouter"))).text
-                start_peer = session.find(str(QName(ns, "StartPeer"))).text
-                end_router = session.find(str(QName(ns, "EndRouter"))).text
-                end_peer = session.find(str(QName(ns, "EndPeer"))).text
-                rrclient = 1 if session.find(str(QName(ns, "RRClient"))) is not None else 0
-                if session.find(str(QName(ns, "HoldTime"))) is not None:
-                    holdtime = session.find(str(QName(ns, "HoldTime"))).text
+        if tag == ns_tag.PeeringSessions:
+            for session in child.findall(ns_tag.BGPSession):
+                start_router = session.find(ns_tag.StartRouter).text
+                start_peer = session.find(ns_tag.StartPeer).text
+                end_router = session.find(ns_tag.EndRouter).text
+                end_peer = session.find(ns_tag.EndPeer).text
+                rrclient = 1 if session.find(ns_tag.RRClient) is not None else 0
+                if session.find(ns_tag.HoldTime) is not None:
+                    holdtime = session.find(ns_tag.HoldTime).text
                 else:
                     holdtime = 180
-                if session.find(str(QName(ns, "KeepAliveTime"))) is not None:
-                    keepalive = session.find(str(QName(ns, "KeepAliveTime"))).text
+                if session.find(ns_tag.KeepAliveTime) is not None:
+                    keepalive = session.find(ns_tag.KeepAliveTime).text
                 else:
                     keepalive = 60
-                nhopself = 1 if session.find(str(QName(ns, "NextHopSelf"))) is not None else 0
+                nhopself = 1 if session.find(ns_tag.NextHopSelf) is not None else 0
 
                 # choose the right table and admin_status for the peer
-                chassis_internal_ibgp = session.find(str(QName(ns, "ChassisInternal")))
+                chassis_internal_ibgp = session.find(ns_tag.ChassisInternal)
                 if chassis_internal_ibgp is not None and chassis_internal_ibgp.text == "voq":
                     table = bgp_voq_chassis_sessions
                     admin_status = 'up'
@@ -851,27 +870,27 @@ def parse_cpg(cpg, hname, local_devices=[]):
                     }
                     if admin_status:
                         table[end_peer.lower()]['admin_status'] = admin_status
-        elif child.tag == str(QName(ns, "Routers")):
-            for router in child.findall(str(QName(ns1, "BGPRouterDeclaration"))):
-                asn = router.find(str(QName(ns1, "ASN"))).text
-                hostname = router.find(str(QName(ns1, "Hostname"))).text
+        elif child.tag == ns_tag.Routers:
+            for router in child.findall(ns1_tag.BGPRouterDeclaration):
+                asn = router.find(ns1_tag.ASN).text
+                hostname = router.find(ns1_tag.Hostname).text
                 if hostname.lower() == hname.lower():
                     myasn = asn
-                    peers = router.find(str(QName(ns1, "Peers")))
-                    for bgpPeer in peers.findall(str(QName(ns, "BGPPeer"))):
-                        addr = bgpPeer.find(str(QName(ns, "Address"))).text
-                        if bgpPeer.find(str(QName(ns1, "PeersRange"))) is not None: # FIXME: is better to check for type BGPPeerPassive
-                            name = bgpPeer.find(str(QName(ns1, "Name"))).text
-                            ip_range = bgpPeer.find(str(QName(ns1, "PeersRange"))).text
+                    peers = router.find(ns1_tag.Peers)
+                    for bgpPeer in peers.findall(ns_tag.BGPPeer):
+                        addr = bgpPeer.find(ns_tag.Address).text
+                        if bgpPeer.find(ns1_tag.PeersRange) is not None: # FIXME: is better to check for type BGPPeerPassive
+                            name = bgpPeer.find(ns1_tag.Name).text
+                            ip_range = bgpPeer.find(ns1_tag.PeersRange).text
                             ip_range_group = ip_range.split(';') if ip_range and ip_range != "" else []
                             bgp_peers_with_range[name] = {
                                 'name': name,
                                 'ip_range': ip_range_group
                             }
-                            if bgpPeer.find(str(QName(ns, "Address"))) is not None:
-                                bgp_peers_with_range[name]['src_address'] = bgpPeer.find(str(QName(ns, "Address"))).text
-                            if bgpPeer.find(str(QName(ns1, "PeerAsn"))) is not None:
-                                bgp_peers_with_range[name]['peer_asn'] = bgpPeer.find(str(QName(ns1, "PeerAsn"))).text
+                            if bgpPeer.find(ns_tag.Address) is not None:
+                                bgp_peers_with_range[name]['src_address'] = bgpPeer.find(ns_tag.Address).text
+                            if bgpPeer.find(ns1_tag.PeerAsn) is not None:
+                                bgp_peers_with_range[name]['peer_asn'] = bgpPeer.find(ns1_tag.PeerAsn).text
                 else:
                     for peer in bgp_sessions:
                         bgp_session = bgp_sessions[peer]
@@ -918,13 +937,13 @@ def parse_meta(meta, hname):
     downstream_redundancy_types = None
     qos_profile = None
 
-    device_metas = meta.find(str(QName(ns, "Devices")))
-    for device in device_metas.findall(str(QName(ns1, "DeviceMetadata"))):
-        if device.find(str(QName(ns1, "Name"))).text.lower() == hname.lower():
-            properties = device.find(str(QName(ns1, "Properties")))
-            for device_property in properties.findall(str(QName(ns1, "DeviceProperty"))):
-                name = device_property.find(str(QName(ns1, "Name"))).text
-                value = device_property.find(str(QName(ns1, "Value"))).text
+    device_metas = meta.find(ns_tag.Devices)
+    for device in device_metas.findall(ns1_tag.DeviceMetadata):
+        if device.find(ns1_tag.Name).text.lower() == hname.lower():
+            properties = device.find(ns1_tag.Properties)
+            for device_property in properties.findall(ns1_tag.DeviceProperty):
+                name = device_property.find(ns1_tag.Name).text
+                value = device_property.find(ns1_tag.Value).text
                 value_group = value.strip().split(';') if value and value != "" else []
                 if name == "DhcpResources":
                     dhcp_servers = value_group
@@ -970,14 +989,14 @@ def parse_meta(meta, hname):
 
 
 def parse_linkmeta(meta, hname):
-    link = meta.find(str(QName(ns, "Link")))
+    link = meta.find(ns_tag.Link)
     linkmetas = {}
-    for linkmeta in link.findall(str(QName(ns1, "LinkMetadata"))):
+    for linkmeta in link.findall(ns1_tag.LinkMetadata):
         port = None
         fec_disabled = None
 
         # Sample: ARISTA05T1:Ethernet1/33;switch-t0:fortyGigE0/4
-        key = linkmeta.find(str(QName(ns1, "Key"))).text
+        key = linkmeta.find(ns1_tag.Key).text
         endpoints = key.split(';')
         for endpoint in endpoints:
             t = endpoint.split(':')
@@ -995,10 +1014,10 @@ def parse_linkmeta(meta, hname):
         macsec_enabled = False
         tx_power = None
         laser_freq = None
-        properties = linkmeta.find(str(QName(ns1, "Properties")))
-        for device_property in properties.findall(str(QName(ns1, "DeviceProperty"))):
-            name = device_property.find(str(QName(ns1, "Name"))).text
-            value = device_property.find(str(QName(ns1, "Value"))).text
+        properties = linkmeta.find(ns1_tag.Properties)
+        for device_property in properties.findall(ns1_tag.DeviceProperty):
+            name = device_property.find(ns1_tag.Name).text
+            value = device_property.find(ns1_tag.Value).text
             if name == "FECDisabled":
                 fec_disabled = value
             elif name in [ "GeminiPeeringLink", "LibraPeeringLink" ]:
@@ -1054,13 +1073,13 @@ def parse_asic_meta(meta, hname):
     max_cores = None
     deployment_id = None
     macsec_profile = {}
-    device_metas = meta.find(str(QName(ns, "Devices")))
-    for device in device_metas.findall(str(QName(ns1, "DeviceMetadata"))):
-        if device.find(str(QName(ns1, "Name"))).text.lower() == hname.lower():
-            properties = device.find(str(QName(ns1, "Properties")))
-            for device_property in properties.findall(str(QName(ns1, "DeviceProperty"))):
-                name = device_property.find(str(QName(ns1, "Name"))).text
-                value = device_property.find(str(QName(ns1, "Value"))).text
+    device_metas = meta.find(ns_tag.Devices)
+    for device in device_metas.findall(ns1_tag.DeviceMetadata):
+        if device.find(ns1_tag.Name).text.lower() == hname.lower():
+            properties = device.find(ns1_tag.Properties)
+            for device_property in properties.findall(ns1_tag.DeviceProperty):
+                name = device_property.find(ns1_tag.Name).text
+                value = device_property.find(ns1_tag.Value).text
                 if name == "SubRole":
                     sub_role = value
                 elif name == "SwitchId":
@@ -1080,31 +1099,31 @@ def parse_deviceinfo(meta, hwsku):
     port_speeds = {}
     port_descriptions = {}
     sys_ports = {}
-    for device_info in meta.findall(str(QName(ns, "DeviceInfo"))):
-        dev_sku = device_info.find(str(QName(ns, "HwSku"))).text
+    for device_info in meta.findall(ns_tag.DeviceInfo):
+        dev_sku = device_info.find(ns_tag.HwSku).text
         if dev_sku == hwsku:
-            interfaces = device_info.find(str(QName(ns, "EthernetInterfaces"))).findall(str(QName(ns1, "EthernetInterface")))
-            interfaces = interfaces + device_info.find(str(QName(ns, "ManagementInterfaces"))).findall(str(QName(ns1, "ManagementInterface")))
+            interfaces = device_info.find(ns_tag.EthernetInterfaces).findall(ns1_tag.EthernetInterface)
+            interfaces = interfaces + device_info.find(ns_tag.ManagementInterfaces).findall(ns1_tag.ManagementInterface)
             for interface in interfaces:
-                alias = interface.find(str(QName(ns, "InterfaceName"))).text
-                speed = interface.find(str(QName(ns, "Speed"))).text
-                desc  = interface.find(str(QName(ns, "Description")))
+                alias = interface.find(ns_tag.InterfaceName).text
+                speed = interface.find(ns_tag.Speed).text
+                desc  = interface.find(ns_tag.Description)
                 if desc != None:
                     port_descriptions[port_alias_map.get(alias, alias)] = desc.text
                 port_speeds[port_alias_map.get(alias, alias)] = speed
 
-            sysports = device_info.find(str(QName(ns, "SystemPorts")))
+            sysports = device_info.find(ns_tag.SystemPorts)
             if sysports is not None:
-                for sysport in sysports.findall(str(QName(ns, "SystemPort"))):
-                    portname = sysport.find(str(QName(ns, "Name"))).text
-                    hostname = sysport.find(str(QName(ns, "Hostname")))
-                    asic_name = sysport.find(str(QName(ns, "AsicName")))
-                    system_port_id = sysport.find(str(QName(ns, "SystemPortId"))).text
-                    switch_id = sysport.find(str(QName(ns, "SwitchId"))).text
-                    core_id = sysport.find(str(QName(ns, "CoreId"))).text
-                    core_port_id = sysport.find(str(QName(ns, "CorePortId"))).text
-                    speed = sysport.find(str(QName(ns, "Speed"))).text
-                    num_voq = sysport.find(str(QName(ns, "NumVoq"))).text
+                for sysport in sysports.findall(ns_tag.SystemPort):
+                    portname = sysport.find(ns_tag.Name).text
+                    hostname = sysport.find(ns_tag.Hostname)
+                    asic_name = sysport.find(ns_tag.AsicName)
+                    system_port_id = sysport.find(ns_tag.SystemPortId).text
+                    switch_id = sysport.find(ns_tag.SwitchId).text
+                    core_id = sysport.find(ns_tag.CoreId).text
+                    core_port_id = sysport.find(ns_tag.CorePortId).text
+                    speed = sysport.find(ns_tag.Speed).text
+                    num_voq = sysport.find(ns_tag.NumVoq).text
                     key = portname
                     if asic_name is not None:
                        key = "%s|%s" % (asic_name.text, key)
@@ -1307,6 +1326,71 @@ def select_mmu_profiles(profile, platform, hwsku):
                 base_file = os.path.join(path, file_item)
                 exec_cmd("sudo cp {} {}".format(file_in_dir, base_file))
 
+def _parse_dpg_section(dpg, context):
+    if context['dpg_soc_intfs'] is None:
+        context['dpg_soc_intfs'] = parse_dpg_soc_intfs(dpg)
+    values = parse_dpg(dpg, context['hostname'])
+    # parse_png() needs the fine grained ECMP content of the DPG
+    context['dpg_ecmp_content'] = values[13]
+    return values + (None,)
+
+def _parse_asic_dpg_section(dpg, context):
+    if context['dpg_soc_intfs'] is None:
+        context['dpg_soc_intfs'] = parse_dpg_soc_intfs(dpg)
+    values = parse_dpg(dpg, context['asic_name'])
+    return values + (parse_host_loopback(dpg, context['hostname']),)
+
+def _parse_cpg_section(cpg, context):
+    return parse_cpg(cpg, context['hostname'])
+
+def _parse_asic_cpg_section(cpg, context):
+    return parse_cpg(cpg, context['asic_name'], context['local_devices'])
+
+def _parse_png_section(png, context):
+    return parse_png(png, context['hostname'], context['dpg_ecmp_content'])
+
+def _parse_asic_png_section(png, context):
+    return parse_asic_png(png, context['asic_name'], context['hostname'])
+
+def _parse_ung_section(ung, context):
+    return parse_png(ung, context['hostname'], None)[:2]
+
+def _parse_meta_section(meta, context):
+    return parse_meta(meta, context['hostname'])
+
+def _parse_asic_meta_section(meta, context):
+    return parse_asic_meta(meta, context['asic_name'])
+
+def _parse_linkmeta_section(meta, context):
+    return parse_linkmeta(meta, context['hostname'])
+
+def _parse_deviceinfo_section(meta, context):
+    return parse_deviceinfo(meta, context['hwsku'])
+
+# parse_xml() section handlers, by tag of the top level minigraph elements
+SECTION_PARSERS = {
+    ns_tag.DpgDec: _parse_dpg_section,
+    ns_tag.CpgDec: _parse_cpg_section,
+    ns_tag.PngDec: _parse_png_section,
+    ns_tag.UngDec: _parse_ung_section,
+    ns_tag.MetadataDeclaration: _parse_meta_section,
+    ns_tag.LinkMetadataDeclaration: _parse_linkmeta_section,
+    ns_tag.DeviceInfos: _parse_deviceinfo_section,
+}
+
+# Same, when generating the configuration of an asic of a multi-asic device
+ASIC_SECTION_PARSERS = {
+    ns_tag.DpgDec: _parse_asic_dpg_section,
+    ns_tag.CpgDec: _parse_asic_cpg_section,
+    ns_tag.PngDec: _parse_asic_png_section,
+    ns_tag.MetadataDeclaration: _parse_asic_meta_section,
+    ns_tag.LinkMetadataDeclaration: _parse_linkmeta_section,
+    ns_tag.DeviceInfos: _parse_deviceinfo_section,
+}
+
+MINIGRAPH_HEADER_TAGS = [ns_tag.Hostname, ns_tag.HwSku, ns_tag.DockerRoutingConfigMode]
+MINIGRAPH_SECTION_TAGS = list(SECTION_PARSERS)
+
 ###############################################################################
 #
 # Main functions
@@ -1322,8 +1406,16 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
     asic_name -- asic name; to parse multi-asic device minigraph to 
     generate asic specific configuration.
      """
+    (results, qos_profile, hwsku) = parse_xml_data(filename, platform, port_config_file, asic_name, hwsku_config_file)
+    select_mmu_profiles(qos_profile, platform, hwsku)
+    return results
 
-    root = ET.parse(filename).getroot()
+def parse_xml_data(filename, platform=None, port_config_file=None, asic_name=None, hwsku_config_file=None):
+    """ Parse minigraph xml file, without selecting the MMU profiles.
+
+    Same arguments as parse_xml(). Returns the parsed data, the QoS profile
+    and the hwsku select_mmu_profiles() is called with.
+    """
 
     u_neighbors = None
     u_devices = None
@@ -1384,56 +1476,60 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
     redundancy_type = None
     qos_profile = None
 
-    hwsku_qn = QName(ns, "HwSku")
-    hostname_qn = QName(ns, "Hostname")
-    docker_routing_config_mode_qn = QName(ns, "DockerRoutingConfigMode")
-    for child in root:
-        if child.tag == str(hwsku_qn):
-            hwsku = child.text
-        if child.tag == str(hostname_qn):
-            hostname = child.text
-        if child.tag == str(docker_routing_config_mode_qn):
-            docker_routing_config_mode = child.text
+    # Hostname and HwSku are needed by the section parsers, but usually come
+    # last in the file. They are read by a first pass over the file which
+    # keeps nothing else, the sections are dispatched by a second one: the
+    # minigraph is read twice, but at most one section is held in memory.
+    # The first pass is skipped when the header of this file was already read
+    header = get_minigraph_header(filename)
+    hostname = header['hostname']
+    hwsku = header['hwsku']
+    docker_routing_config_mode = header['docker_routing_config_mode']
 
     (ports, alias_map, alias_asic_map) = get_port_config(hwsku=hwsku, platform=platform, port_config_file=port_config_file, asic_name=asic_name, hwsku_config_file=hwsku_config_file)
     port_alias_map.update(alias_map)
     port_alias_asic_map.update(alias_asic_map)
 
     # Get the local device node from DeviceMetadata
-    local_devices = parse_asic_meta_get_devices(root)
+    local_devices = parse_asic_meta_get_devices(header['metadata'])
 
-    for child in root:
-        if asic_name is None:
-            if child.tag == str(QName(ns, "DpgDec")):
-                (intfs, lo_intfs, mvrf, mgmt_intf, voq_inband_intfs, vlans, vlan_members, dhcp_relay_table, pcs, pc_members, acls, vni, tunnel_intfs, dpg_ecmp_content, static_routes, tunnel_intfs_qos_remap_config) = parse_dpg(child, hostname)
-            elif child.tag == str(QName(ns, "CpgDec")):
-                (bgp_sessions, bgp_internal_sessions, bgp_voq_chassis_sessions, bgp_asn, bgp_peers_with_range, bgp_monitors) = parse_cpg(child, hostname)
-            elif child.tag == str(QName(ns, "PngDec")):
-                (neighbors, devices, console_dev, console_port, mgmt_dev, mgmt_port, port_speed_png, console_ports, mux_cable_ports, png_ecmp_content) = parse_png(child, hostname, dpg_ecmp_content)
-            elif child.tag == str(QName(ns, "UngDec")):
-                (u_neighbors, u_devices, _, _, _, _, _, _) = parse_png(child, hostname, None)
-            elif child.tag == str(QName(ns, "MetadataDeclaration")):
-                (syslog_servers, dhcp_servers, dhcpv6_servers, ntp_servers, tacacs_servers, mgmt_routes, erspan_dst, deployment_id, region, cloudtype, resource_type, downstream_subrole, switch_id, switch_type, max_cores, kube_data, macsec_profile, downstream_redundancy_types, redundancy_type, qos_profile) = parse_meta(child, hostname)
-            elif child.tag == str(QName(ns, "LinkMetadataDeclaration")):
-                linkmetas = parse_linkmeta(child, hostname)
-            elif child.tag == str(QName(ns, "DeviceInfos")):
-                (port_speeds_default, port_descriptions, sys_ports) = parse_deviceinfo(child, hwsku)
-        else:
-            if child.tag == str(QName(ns, "DpgDec")):
-                (intfs, lo_intfs, mvrf, mgmt_intf, voq_inband_intfs, vlans, vlan_members, dhcp_relay_table, pcs, pc_members, acls, vni, tunnel_intfs, dpg_ecmp_content, static_routes, tunnel_intfs_qos_remap_config) = parse_dpg(child, asic_name)
-                host_lo_intfs = parse_host_loopback(child, hostname)
-            elif child.tag == str(QName(ns, "CpgDec")):
-                (bgp_sessions, bgp_internal_sessions, bgp_voq_chassis_sessions, bgp_asn, bgp_peers_with_range, bgp_monitors) = parse_cpg(child, asic_name, local_devices)
-            elif child.tag == str(QName(ns, "PngDec")):
-                (neighbors, devices, port_speed_png) = parse_asic_png(child, asic_name, hostname)
-            elif child.tag == str(QName(ns, "MetadataDeclaration")):
-                (sub_role, switch_id, switch_type, max_cores, deployment_id, macsec_profile) = parse_asic_meta(child, asic_name)
-            elif child.tag == str(QName(ns, "LinkMetadataDeclaration")):
-                linkmetas = parse_linkmeta(child, hostname)
-            elif child.tag == str(QName(ns, "DeviceInfos")):
-                (port_speeds_default, port_descriptions, sys_ports) = parse_deviceinfo(child, hwsku)
+    # Each section is dispatched as soon as it has been read and freed right
+    # after, so at most one section of the minigraph is held in memory
+    section_parsers = SECTION_PARSERS if asic_name is None else ASIC_SECTION_PARSERS
+    context = {
+        'hostname': hostname,
+        'hwsku': hwsku,
+        'asic_name': asic_name,
+        'local_devices': local_devices,
+        'dpg_ecmp_content': {},
+        'dpg_soc_intfs': None,
+    }
+    sections = {}
+    for child in iter_minigraph_sections(filename, list(section_parsers)):
+        sections[child.tag] = section_parsers[child.tag](child, context)
+    active_active_soc_intfs = context['dpg_soc_intfs']
+
+    if ns_tag.DpgDec in sections:
+        (intfs, lo_intfs, mvrf, mgmt_intf, voq_inband_intfs, vlans, vlan_members, dhcp_relay_table, pcs, pc_members, acls, vni, tunnel_intfs, dpg_ecmp_content, static_routes, tunnel_intfs_qos_remap_config, host_lo_intfs) = sections[ns_tag.DpgDec]
+    if ns_tag.CpgDec in sections:
+        (bgp_sessions, bgp_internal_sessions, bgp_voq_chassis_sessions, bgp_asn, bgp_peers_with_range, bgp_monitors) = sections[ns_tag.CpgDec]
+    if ns_tag.LinkMetadataDeclaration in sections:
+        linkmetas = sections[ns_tag.LinkMetadataDeclaration]
+    if ns_tag.DeviceInfos in sections:
+        (port_speeds_default, port_descriptions, sys_ports) = sections[ns_tag.DeviceInfos]
+    if asic_name is None:
+        if ns_tag.PngDec in sections:
+            (neighbors, devices, console_dev, console_port, mgmt_dev, mgmt_port, port_speed_png, console_ports, mux_cable_ports, png_ecmp_content) = sections[ns_tag.PngDec]
+        if ns_tag.UngDec in sections:
+            (u_neighbors, u_devices) = sections[ns_tag.UngDec]
+        if ns_tag.MetadataDeclaration in sections:
+            (syslog_servers, dhcp_servers, dhcpv6_servers, ntp_servers, tacacs_servers, mgmt_routes, erspan_dst, deployment_id, region, cloudtype, resource_type, downstream_subrole, switch_id, switch_type, max_cores, kube_data, macsec_profile, downstream_redundancy_types, redundancy_type, qos_profile) = sections[ns_tag.MetadataDeclaration]
+    else:
+        if ns_tag.PngDec in sections:
+            (neighbors, devices, port_speed_png) = sections[ns_tag.PngDec]
+        if ns_tag.MetadataDeclaration in sections:
+            (sub_role, switch_id, switch_type, max_cores, deployment_id, macsec_profile) = sections[ns_tag.MetadataDeclaration]
 
-    select_mmu_profiles(qos_profile, platform, hwsku)
     # set the host device type in asic metadata also
     device_type = [devices[key]['type'] for key in devices if key.lower() == hostname.lower()][0]
     if asic_name is None:
@@ -1802,7 +1898,7 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
     # Add src_ip and qos remapping config into TUNNEL table if tunnel_qos_remap is enabled
     results['TUNNEL'] = get_tunnel_entries(tunnel_intfs, tunnel_intfs_qos_remap_config, lo_intfs, system_defaults.get('tunnel_qos_remap', {}), mux_tunnel_name, peer_switch_ip)
 
-    active_active_ports = get_ports_in_active_active(root, devices, neighbors)
+    active_active_ports = get_ports_in_active_active(active_active_soc_intfs or {}, devices, neighbors)
     results['MUX_CABLE'] = get_mux_cable_entries(ports, mux_cable_ports, active_active_ports, neighbors, devices, redundancy_type)
 
     # If connected to a smart cable, get the connection position
@@ -1896,7 +1992,7 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
     if current_device['type'] in dhcp_server_enabled_device_types:
         results['DEVICE_METADATA']['localhost']['dhcp_server'] = 'enabled'
 
-    return results
+    return (results, qos_profile, hwsku)
 
 def get_tunnel_entries(tunnel_intfs, tunnel_intfs_qos_remap_config, lo_intfs, tunnel_qos_remap, mux_tunnel_name, peer_switch_ip):
     lo_addr = ''
@@ -1936,32 +2032,36 @@ def get_tunnel_entries(tunnel_intfs, tunnel_intfs_qos_remap_config, lo_intfs, tu
     return tunnels
 
 
-def get_ports_in_active_active(root, devices, neighbors):
+def parse_dpg_soc_intfs(dpg):
+    """Parse out the SoC loopback addresses of the hosts of a DPG section."""
+    dpg_soc_intfs = {}
+    for child in dpg:
+        hostname = child.find(ns_tag.Hostname)
+        if hostname is None or child.find(ns_tag.LoopbackIPInterfaces) is None:
+            continue
+        hostname = hostname.text.lower()
+        lo_intfs = parse_loopback_intf(child)
+        soc_intfs = {}
+        for intfname, ipprefix in lo_intfs.keys():
+            intfname_lower = intfname.lower()
+            if hostname + "soc" == intfname_lower:
+                ipprefix = str(ipaddress.ip_network(UNICODE_TYPE(ipprefix.split("/")[0])))
+                if "." in ipprefix:
+                    soc_intfs["soc_ipv4"] = ipprefix
+                elif ":" in ipprefix:
+                    soc_intfs["soc_ipv6"] = ipprefix
+        if soc_intfs:
+            dpg_soc_intfs[hostname] = soc_intfs
+    return dpg_soc_intfs
+
+def get_ports_in_active_active(dpg_soc_intfs, devices, neighbors):
     """Parse out ports in active-active cable type."""
     servers = {hostname.lower(): device_data for hostname, device_data in devices.items() if device_data["type"] == "Server"}
     ports_in_active_active = {}
-    dpg_section = root.find(str(QName(ns, "DpgDec")))
     neighbor_to_port_mapping = {neighbor["name"].lower(): port for port, neighbor in neighbors.items()}
-    if dpg_section is not None:
-        for child in dpg_section:
-            hostname = child.find(str(QName(ns, "Hostname")))
-            if hostname is None:
-                continue
-            hostname = hostname.text.lower()
-            if hostname not in servers:
-                continue
-            lo_intfs = parse_loopback_intf(child)
-            soc_intfs = {}
-            for intfname, ipprefix in lo_intfs.keys():
-                intfname_lower = intfname.lower()
-                if hostname + "soc" == intfname_lower:
-                    ipprefix = str(ipaddress.ip_network(UNICODE_TYPE(ipprefix.split("/")[0])))
-                    if "." in ipprefix:
-                        soc_intfs["soc_ipv4"] = ipprefix
-                    elif ":" in ipprefix:
-                        soc_intfs["soc_ipv6"] = ipprefix
-            if hostname in neighbor_to_port_mapping and soc_intfs:
-                ports_in_active_active[neighbor_to_port_mapping[hostname]] = soc_intfs
+    for hostname, soc_intfs in dpg_soc_intfs.items():
+        if hostname in servers and hostname in neighbor_to_port_mapping:
+            ports_in_active_active[neighbor_to_port_mapping[hostname]] = soc_intfs
     return ports_in_active_active
 
 
@@ -2034,32 +2134,80 @@ def parse_device_desc_xml(filename):
 
     return results
 
+def iter_minigraph_sections(filename, tags):
+    """
+    Stream the top level elements of a minigraph whose tag is in tags.
+
+    Every element is complete when it is yielded. It is cleared, together
+    with all the elements preceding it, as soon as the caller asks for the
+    next one, so the caller must copy whatever it wants to keep.
+    """
+    for _, elem in ET.iterparse(filename, events=('end',), tag=tags):
+        parent = elem.getparent()
+        if parent is None or parent.getparent() is not None:
+            # Root element, or a nested element sharing a top level tag
+            continue
+        yield elem
+        elem.clear()
+        while elem.getprevious() is not None:
+            del parent[0]
+
+def get_minigraph_header(filename):
+    """
+    Return the hostname, hwsku, docker routing config mode and the
+    MetadataDeclaration sections of a minigraph.
+
+    This is a full pass over the file, separate from the one dispatching the
+    sections in parse_xml_data. The result is kept for the lifetime of the
+    process, so parse_xml and the asic level queries (parse_asic_sub_role,
+    parse_asic_switch_type, ...) share that pass.
+    """
+    st = os.stat(filename)
+    key = (os.path.abspath(filename), st.st_mtime, st.st_size)
+    header = minigraph_headers.get(key)
+    if header is not None:
+        return header
+
+    header = {
+        'hostname': None,
+        'hwsku': None,
+        'docker_routing_config_mode': "separated",
+        'metadata': [],
+    }
+    for child in iter_minigraph_sections(filename, MINIGRAPH_HEADER_TAGS + MINIGRAPH_SECTION_TAGS):
+        if child.tag == ns_tag.HwSku:
+            header['hwsku'] = child.text
+        elif child.tag == ns_tag.Hostname:
+            header['hostname'] = child.text
+        elif child.tag == ns_tag.DockerRoutingConfigMode:
+            header['docker_routing_config_mode'] = child.text
+        elif child.tag == ns_tag.MetadataDeclaration:
+            header['metadata'].append(copy.deepcopy(child))
+    minigraph_headers[key] = header
+    return header
+
 def parse_asic_sub_role(filename, asic_name):
     if not os.path.isfile(filename):
         return None
-    root = ET.parse(filename).getroot()
-    for child in root:
-        if child.tag == str(QName(ns, "MetadataDeclaration")):
-            sub_role, _, _, _, _, _= parse_asic_meta(child, asic_name)
-            return sub_role
+    for child in get_minigraph_header(filename)['metadata']:
+        sub_role, _, _, _, _, _= parse_asic_meta(child, asic_name)
+        return sub_role
 
 def parse_asic_switch_type(filename, asic_name):
     if os.path.isfile(filename):
-        root = ET.parse(filename).getroot()
-        for child in root:
-            if child.tag == str(QName(ns, "MetadataDeclaration")):
-                _, _, switch_type, _, _, _ = parse_asic_meta(child, asic_name)
-                return switch_type
+        for child in get_minigraph_header(filename)['metadata']:
+            _, _, switch_type, _, _, _ = parse_asic_meta(child, asic_name)
+            return switch_type
     return None
 
 def parse_asic_meta_get_devices(root):
     local_devices = []
 
     for child in root:
-        if child.tag == str(QName(ns, "MetadataDeclaration")):
-            device_metas = child.find(str(QName(ns, "Devices")))
-            for device in device_metas.findall(str(QName(ns1, "DeviceMetadata"))):
-                name = device.find(str(QName(ns1, "Name"))).text.lower()
+        if child.tag == ns_tag.MetadataDeclaration:
+            device_metas = child.find(ns_tag.Devices)
+            for device in device_metas.findall(ns1_tag.DeviceMetadata):
+                name = device.find(ns1_tag.Name).text.lower()
                 local_devices.append(name)
 
     return local_devices
@@ -2067,6 +2215,9 @@ def parse_asic_meta_get_devices(root):
 port_alias_map = {}
 port_alias_asic_map = {}
 
+# Minigraph headers by (path, mtime, size), see get_minigraph_header()
+minigraph_headers = {}
+
 
 def print_parse_xml(filename):
     results = parse_xml(filename)
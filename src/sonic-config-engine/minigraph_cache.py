@@ -0,0 +1,202 @@
+"""minigraph_cache.py
+
+On-disk cache of parsed minigraphs.
+
+During boot the same /etc/sonic/minigraph.xml is parsed by several
+sonic-cfggen invocations with different asic names and port configs. The
+output of parse_xml() is pickled under a cache directory, keyed on the
+sha256 of the minigraph, of the minigraph parser itself and of the parse
+arguments. Each entry also records the digests of the port config /
+hwsku.json files it was built from, the ones found from the platform and
+hwsku when no port config is given included, so editing them invalidates the
+entry.
+The MMU profile files minigraph.parse_xml() copies are copied on a hit too.
+
+The cache is disabled unless $SONIC_MINIGRAPH_CACHE_DIR names its directory.
+
+Pickle preserves what JSON can not: tuple keys and the ipaddress/netaddr
+objects found in the parsed data.
+"""
+
+import errno
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+import minigraph
+import portconfig
+from sonic_py_common import device_info
+from sonic_py_common.multi_asic import get_asic_id_from_name
+
+# Directory of the cache, the cache is disabled when it is not set
+CACHE_DIR_ENV = 'SONIC_MINIGRAPH_CACHE_DIR'
+
+CACHE_FILE_SUFFIX = '.pickle'
+
+
+def _file_digest(path):
+    if path is None or not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_file(module):
+    path = module.__file__
+    return path[:-1] if path.endswith('.pyc') else path
+
+
+def _code_digest():
+    """ Digest of the parser code, entries do not survive an upgrade """
+    digest = hashlib.sha256(sys.version.encode('utf-8'))
+    for module in (minigraph, portconfig):
+        digest.update((_file_digest(_source_file(module)) or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_cache_dir(directory=None):
+    """
+    Return the cache directory, $SONIC_MINIGRAPH_CACHE_DIR by default, or None
+    when the cache is disabled or the directory is not writable.
+    """
+    if directory is None:
+        directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            return None
+    if not os.access(directory, os.W_OK | os.X_OK):
+        return None
+    return directory
+
+
+def port_config_files(hwsku, platform, port_config_file, asic_name, hwsku_config_file):
+    """
+    Return the files get_port_config() reads the ports from, the files found
+    from the platform and hwsku included
+    """
+    if not port_config_file:
+        asic_id = str(get_asic_id_from_name(asic_name)) if asic_name is not None else None
+        port_config_file = device_info.get_path_to_port_config_file(hwsku, asic_id)
+        if not port_config_file:
+            return []
+    files = [port_config_file]
+    if port_config_file.endswith('.json'):
+        files.append(hwsku_config_file or portconfig.get_hwsku_file_name(hwsku, platform))
+    return [path for path in files if path is not None]
+
+
+def _port_config_dependencies(hwsku, platform, port_config_file, asic_name, hwsku_config_file):
+    """
+    Return the digests of the files get_port_config() reads the ports from
+    """
+    files = port_config_files(hwsku, platform, port_config_file, asic_name, hwsku_config_file)
+    return {path: _file_digest(path) for path in files}
+
+
+def _ports_from_db(port_config_file, asic_name):
+    """
+    get_port_config() prefers the PORT table of CONFIG_DB when no port config
+    is given. This costs a CONFIG_DB query on every parse without -p, cached
+    or not.
+    """
+    if port_config_file is not None:
+        return False
+    config_db = portconfig.db_connect_configdb(asic_name)
+    return config_db is not None and bool(config_db.get_table('PORT'))
+
+
+def _load(path):
+    try:
+        # Only trust entries written by ourselves
+        if os.stat(path).st_uid != os.geteuid():
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _store(path, entry):
+    directory = os.path.dirname(path)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, path)
+    except (IOError, OSError, pickle.PicklingError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hwsku_config_file=None, cache_dir=None):
+    """
+    Same as minigraph.parse_xml(), served from the cache when possible. The
+    MMU profiles are selected on a hit as well.
+    """
+    (data, qos_profile, hwsku) = parse_xml_data(filename, platform, port_config_file, asic_name, hwsku_config_file, cache_dir)
+    minigraph.select_mmu_profiles(qos_profile, platform, hwsku)
+    return data
+
+
+def parse_xml_data(filename, platform=None, port_config_file=None, asic_name=None, hwsku_config_file=None, cache_dir=None):
+    """
+    Same as minigraph.parse_xml_data(), served from the cache when possible.
+
+    Without a port config file get_port_config() reads the ports from
+    CONFIG_DB when it has a PORT table, the cache is bypassed then. Otherwise
+    the entry is keyed on the port config files found from the platform and
+    hwsku, as for the boot time invocations which do not pass -p.
+    """
+    cache_dir = get_cache_dir(cache_dir)
+    if cache_dir is None or _ports_from_db(port_config_file, asic_name):
+        return minigraph.parse_xml_data(filename, platform, port_config_file, asic_name, hwsku_config_file)
+
+    key = hashlib.sha256()
+    key.update(_code_digest().encode('utf-8'))
+    key.update((_file_digest(filename) or '').encode('utf-8'))
+    key.update(repr((platform, port_config_file, asic_name, hwsku_config_file)).encode('utf-8'))
+    path = os.path.join(cache_dir, key.hexdigest() + CACHE_FILE_SUFFIX)
+
+    entry = _load(path)
+    if entry is not None:
+        deps = _port_config_dependencies(entry['hwsku'], platform, port_config_file, asic_name, hwsku_config_file)
+        if deps == entry['deps']:
+            return (entry['data'], entry['qos_profile'], entry['mmu_hwsku'])
+
+    (data, qos_profile, mmu_hwsku) = minigraph.parse_xml_data(filename, platform, port_config_file, asic_name, hwsku_config_file)
+    hwsku = data['DEVICE_METADATA']['localhost']['hwsku']
+    _store(path, {
+        'hwsku': hwsku,
+        'deps': _port_config_dependencies(hwsku, platform, port_config_file, asic_name, hwsku_config_file),
+        'data': data,
+        'qos_profile': qos_profile,
+        'mmu_hwsku': mmu_hwsku,
+    })
+    return (data, qos_profile, mmu_hwsku)
+
+
+def clear_cache(cache_dir=None):
+    """ Remove all the cached minigraphs, return the number of entries removed """
+    cache_dir = get_cache_dir(cache_dir)
+    if cache_dir is None:
+        return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith(CACHE_FILE_SUFFIX):
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
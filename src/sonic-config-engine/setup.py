@@ -39,10 +39,13 @@ else:
 
 # Common modules for python2 and python3
 py_modules = [
+    'cfggen_server',
     'config_samples',
     'minigraph',
+    'minigraph_cache',
     'openconfig_acl',
     'portconfig',
+    'template_cache',
 ]
 if sys.version_info.major == 3:
     # Python 3-only modules
@@ -0,0 +1,79 @@
+"""template_cache.py
+
+Filesystem cache of compiled jinja2 templates shared by sonic-cfggen and
+bgpcfgd.
+
+Compiling the large templates (buffers_config.j2, qos_config.j2, the
+bgpd.main.conf.j2 tree, ...) dominates the cost of rendering them. The
+compiled bytecode is stored under a cache directory, keyed on the template
+path, its mtime and the jinja2 version, so that subsequent runs only have to
+unmarshal it.
+
+The cache is disabled unless $SONIC_J2_CACHE_DIR names its directory.
+"""
+
+import errno
+import hashlib
+import os
+import sys
+import tempfile
+
+import jinja2
+
+# Directory of the cache, the cache is disabled when it is not set
+CACHE_DIR_ENV = 'SONIC_J2_CACHE_DIR'
+
+
+class TemplateBytecodeCache(jinja2.FileSystemBytecodeCache):
+    """
+    jinja2 bytecode cache keyed on template path, mtime and jinja2 version.
+
+    jinja2 already discards bytecode whose source checksum does not match.
+    Having the mtime in the key additionally keeps entries of different
+    versions of a template (e.g. two images sharing the cache) apart.
+    """
+    def get_cache_key(self, name, filename=None):
+        key = [name, filename or '', jinja2.__version__, '%d.%d' % sys.version_info[:2]]
+        if filename is not None:
+            try:
+                key.append(repr(os.stat(filename).st_mtime))
+            except OSError:
+                pass
+        return hashlib.sha1('|'.join(key).encode('utf-8')).hexdigest()
+
+    def dump_bytecode(self, bucket):
+        # Several processes render the same templates concurrently at boot,
+        # never let a reader see a partially written file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                bucket.write_bytecode(f)
+            os.rename(tmp_path, self._get_cache_filename(bucket))
+        except (IOError, OSError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def get_bytecode_cache(directory=None):
+    """
+    Return the bytecode cache stored in directory.
+
+    directory defaults to $SONIC_J2_CACHE_DIR. Returns None when the cache is
+    disabled or the directory is not writable, in which case templates are
+    simply compiled on every run.
+    """
+    if directory is None:
+        directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            return None
+    if not os.access(directory, os.W_OK | os.X_OK):
+        return None
+    return TemplateBytecodeCache(directory)
+
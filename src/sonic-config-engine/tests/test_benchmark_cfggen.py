@@ -0,0 +1,130 @@
+"""
+Merge and key conversion of a large configuration by sonic-cfggen, compared
+with the implementation they replaced.
+
+Run with: pytest tests/test_benchmark_cfggen.py -m benchmark --benchmark-only
+"""
+import copy
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+import importlib.machinery
+import importlib.util
+
+from swsscommon.swsscommon import ConfigDBConnector
+
+TEST_DIR = os.path.dirname(os.path.realpath(__file__))
+ENTRIES = 50000
+
+
+@pytest.fixture(scope='module')
+def cfggen():
+    """ sonic-cfggen loaded as a module, on use so that collecting does not import its dependencies """
+    loader = importlib.machinery.SourceFileLoader('sonic_cfggen', os.path.join(TEST_DIR, '..', 'sonic-cfggen'))
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+    return module
+
+
+def legacy_deep_update(dst, src):
+    pending_nodes = [(dst, src)]
+    while len(pending_nodes) > 0:
+        d, s = pending_nodes.pop(0)
+        for key, value in s.items():
+            if isinstance(value, dict):
+                node = d.setdefault(key, type(value)())
+                pending_nodes.append((node, value))
+            else:
+                d[key] = value
+    return dst
+
+
+def legacy_to_serialized(data):
+    if type(data) is dict:
+        current_keys = list(data.keys())
+        for key in current_keys:
+            new_key = ConfigDBConnector.serialize_key(key)
+            if new_key != key:
+                data[new_key] = data.pop(key)
+            data[new_key] = legacy_to_serialized(data[new_key])
+    return data
+
+
+def legacy_to_deserialized(data):
+    for table in data:
+        if type(data[table]) is dict:
+            current_keys = list(data[table].keys())
+            for key in current_keys:
+                new_key = ConfigDBConnector.deserialize_key(key)
+                if new_key != key:
+                    data[table][new_key] = data[table].pop(key)
+    return data
+
+
+def generate_config(entries=ENTRIES):
+    """ A config_db with entries keys, mostly ACL rules and interface addresses """
+    config = {
+        'DEVICE_METADATA': {'localhost': {'hostname': 'switch', 'hwsku': 'sku'}},
+        'ACL_RULE': {},
+        'INTERFACE': {},
+    }
+    for i in range(entries // 2):
+        config['ACL_RULE'][('DATAACL', 'RULE_{}'.format(i))] = {
+            'PRIORITY': str(i), 'PACKET_ACTION': 'FORWARD', 'SRC_IP': '10.{}.{}.0/24'.format(i // 256 % 256, i % 256)}
+        config['INTERFACE'][('Ethernet{}'.format(i), '10.0.0.{}/31'.format(i % 256))] = {}
+    return config
+
+
+def serialized_config():
+    return legacy_to_serialized(generate_config())
+
+
+LEGACY = {
+    'deep_update': legacy_deep_update,
+    'to_serialized': legacy_to_serialized,
+    'to_deserialized': legacy_to_deserialized,
+}
+
+
+def get_implementation(request, name, implementation):
+    """ The legacy function, or the one of sonic-cfggen which is only loaded then """
+    if implementation == 'legacy':
+        return LEGACY[name]
+    cfggen = request.getfixturevalue('cfggen')
+    return {
+        'deep_update': cfggen.deep_update,
+        'to_serialized': cfggen.FormatConverter.to_serialized,
+        'to_deserialized': cfggen.FormatConverter.to_deserialized,
+    }[name]
+
+
+def test_same_output(cfggen):
+    dst, src = generate_config(100), generate_config(200)
+    assert cfggen.deep_update(copy.deepcopy(dst), src) == legacy_deep_update(copy.deepcopy(dst), src)
+    serialized = cfggen.FormatConverter.to_serialized(generate_config(100))
+    assert list(serialized['ACL_RULE']) == list(legacy_to_serialized(generate_config(100))['ACL_RULE'])
+    assert cfggen.FormatConverter.to_deserialized(serialized) == generate_config(100)
+
+
+@pytest.mark.parametrize('implementation', ['current', 'legacy'])
+def test_deep_update(benchmark, request, implementation):
+    src = generate_config()
+    function = get_implementation(request, 'deep_update', implementation)
+    benchmark.pedantic(function, setup=lambda: (({'ACL_RULE': {}}, src), {}), rounds=5)
+
+
+@pytest.mark.parametrize('implementation', ['current', 'legacy'])
+def test_to_serialized(benchmark, request, implementation):
+    function = get_implementation(request, 'to_serialized', implementation)
+    benchmark.pedantic(function, setup=lambda: ((generate_config(),), {}), rounds=5)
+
+
+@pytest.mark.parametrize('implementation', ['current', 'legacy'])
+def test_to_deserialized(benchmark, request, implementation):
+    function = get_implementation(request, 'to_deserialized', implementation)
+    benchmark.pedantic(function, setup=lambda: ((serialized_config(),), {}), rounds=5)
@@ -0,0 +1,42 @@
+"""
+Parse time of the sample minigraphs.
+
+Run with: pytest tests/test_benchmark_minigraph.py -m benchmark --benchmark-only
+"""
+import os
+
+import pytest
+
+import minigraph
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+TEST_DIR = os.path.dirname(os.path.realpath(__file__))
+DEVICE_DIR = os.path.join(TEST_DIR, '..', '..', '..', 'device')
+ARISTA_7260_DIR = os.path.join(DEVICE_DIR, 'arista', 'x86_64-arista_7260cx3_64')
+
+# id: (minigraph, port config, asic name)
+SAMPLES = {
+    't0': ('t0-sample-graph.xml', 't0-sample-port-config.ini', None),
+    't1': ('sample-arista-7260-t1-minigraph.xml',
+           os.path.join(ARISTA_7260_DIR, 'Arista-7260CX3-C64', 'port_config.ini'), None),
+    'multi-asic': (os.path.join('multi_npu_data', 'sample-minigraph.xml'),
+                   os.path.join('multi_npu_data', 'sample_port_config-0.ini'), 'asic0'),
+    'dualtor': ('sample-arista-7260-dualtor-minigraph.xml',
+                os.path.join(ARISTA_7260_DIR, 'Arista-7260CX3-D108C8', 'port_config.ini'), None),
+}
+
+
+@pytest.mark.parametrize('sample', sorted(SAMPLES))
+def test_parse_xml(benchmark, sample):
+    graph, port_config, asic_name = SAMPLES[sample]
+    graph = os.path.join(TEST_DIR, graph)
+    port_config = os.path.join(TEST_DIR, port_config)
+
+    def setup():
+        # Measure a full parse, not the memoized header scan
+        minigraph.minigraph_headers.clear()
+        return (graph,), {'port_config_file': port_config, 'asic_name': asic_name}
+    benchmark.pedantic(minigraph.parse_xml, setup=setup, rounds=20)
@@ -0,0 +1,58 @@
+"""
+Cold vs. warm compilation of the heavy sonic-cfggen templates.
+
+Run with: pytest tests/test_benchmark_template_cache.py -m benchmark --benchmark-only
+"""
+import os
+import shutil
+import tempfile
+
+import jinja2
+import pytest
+
+from template_cache import get_bytecode_cache
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+TEST_DIR = os.path.dirname(os.path.realpath(__file__))
+TEMPLATE_PATHS = [
+    os.path.join(TEST_DIR, '..', '..', '..', 'files', 'build_templates'),
+    os.path.join(TEST_DIR, '..', '..', '..', 'dockers', 'docker-fpm-frr', 'frr'),
+]
+TEMPLATES = ['qos_config.j2', 'buffers_config.j2', 'bgpd/bgpd.main.conf.j2']
+# Templates are only compiled here, the filters just have to exist
+FILTERS = ['sort_by_port_index', 'ipv4', 'ipv6', 'unique_name', 'pfx_filter', 'ip_network',
+           'ip', 'network', 'prefixlen', 'netmask', 'broadcast']
+
+
+@pytest.fixture
+def cache_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path)
+
+
+def load_templates(cache):
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATE_PATHS), trim_blocks=True, bytecode_cache=cache)
+    for name in FILTERS:
+        env.filters[name] = lambda value: value
+    for name in TEMPLATES:
+        env.get_template(name)
+
+
+@pytest.mark.parametrize('use_cache', [False, True], ids=['no-cache', 'cache'])
+def test_cold(benchmark, cache_dir, use_cache):
+    def setup():
+        cache = get_bytecode_cache(cache_dir) if use_cache else None
+        if cache is not None:
+            cache.clear()
+        return (cache,), {}
+    benchmark.pedantic(load_templates, setup=setup, rounds=20)
+
+
+def test_warm(benchmark, cache_dir):
+    cache = get_bytecode_cache(cache_dir)
+    load_templates(cache)
+    benchmark(load_templates, cache)
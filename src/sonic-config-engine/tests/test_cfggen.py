@@ -1,6 +1,7 @@
 import json
 import subprocess
 import os
+import time
 import tests.common_utils as utils
 
 from unittest import TestCase
@@ -195,6 +196,43 @@ class TestCfgGen(TestCase):
         with open(self.output2_file) as tf:
             self.assertEqual(tf.read().strip(), 'value')
 
+    def test_render_manifest(self):
+        manifest_file = os.path.join(self.test_dir, 'manifest.json')
+        with open(manifest_file, 'w') as f:
+            json.dump([
+                {'template': 'test.j2', 'output': self.output_file},
+                {'template': os.path.join(self.test_dir, 'test2.j2'), 'output': self.output2_file},
+            ], f)
+        argument = ['-y', os.path.join(self.test_dir, 'test.yml')]
+        argument += ['-a', '{"key1":"value"}']
+        argument += ['--render-manifest', manifest_file]
+        try:
+            output = self.run_script(argument)
+        finally:
+            os.remove(manifest_file)
+        self.assertEqual(output, '')
+        with open(self.output_file) as tf:
+            self.assertEqual(tf.read().strip(), 'value1\nvalue2')
+        with open(self.output2_file) as tf:
+            self.assertEqual(tf.read().strip(), 'value')
+
+    def test_from_db_tables(self):
+        # Only the tables referenced by the variable are read
+        output = self.run_script(['-d', '--auto-tables', '-v', 'PORT|length'])
+        self.assertEqual(output.strip(), '32')
+        output = self.run_script(['-d', '--auto-tables', '-v', 'PORT is defined'])
+        self.assertEqual(output.strip(), 'True')
+        output = self.run_script(['-d', '--tables', 'DEVICE_METADATA', '-v', 'PORT is defined'])
+        self.assertEqual(output.strip(), 'False')
+
+    def test_from_db_reads_all_tables_by_default(self):
+        # Without --auto-tables the whole database is read with get_config(),
+        # there is no selection to report stats about
+        output = self.run_script(['-d', '--db-stats', '-v', 'PORT|length'], check_stderr=True)
+        self.assertEqual(output.strip(), '32')
+        output = self.run_script(['-d', '--auto-tables', '--db-stats', '-v', 'PORT|length'], check_stderr=True)
+        self.assertIn('CONFIG_DB: read 1 of', output)
+
     def test_template_json_batch_mode(self):
         data = {"key1_1":"value1_1", "key1_2":"value1_2", "key2_1":"value2_1", "key2_2":"value2_2"}
         argument = ["-a", '{0}'.format(repr(data).replace('\'', '"'))]
@@ -1014,3 +1052,30 @@ class TestCfgGen(TestCase):
         output_dict = utils.to_dict(output.strip())
         self.assertEqual(output_dict['tx_power'], '7.5')
         self.assertEqual(output_dict['laser_freq'], 131000)
+
+    def test_render_server(self):
+        socket_path = os.path.join(self.test_dir, 'cfggen.sock')
+        argument = ['-m', self.sample_graph_simple, '-p', self.port_config, '-t', os.path.join(self.test_dir, 'ntp.conf.j2')]
+
+        os.environ['SONIC_CFGGEN_NO_SERVER'] = '1'
+        expected = self.run_script(argument)
+        os.environ.pop('SONIC_CFGGEN_NO_SERVER')
+
+        server = subprocess.Popen(self.script_file + ['--server', socket_path])
+        try:
+            for _ in range(100):
+                if os.path.exists(socket_path):
+                    break
+                time.sleep(0.1)
+            self.assertTrue(os.path.exists(socket_path))
+
+            os.environ['SONIC_CFGGEN_SOCKET'] = socket_path
+            # The second request is served from the warm cache
+            self.assertEqual(self.run_script(argument), expected)
+            self.assertEqual(self.run_script(argument), expected)
+        finally:
+            os.environ.pop('SONIC_CFGGEN_SOCKET', None)
+            server.terminate()
+            server.wait()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
@@ -0,0 +1,95 @@
+import os
+import shutil
+import socket
+import sys
+import tempfile
+
+import cfggen_server
+
+from unittest import TestCase
+
+if sys.version_info.major == 3:
+    from unittest import mock
+else:
+    import mock
+
+
+class TestCfgGenServer(TestCase):
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        self.sample_graph = os.path.join(self.test_dir, 'simple-sample-graph-case.xml')
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_client_inputs_are_not_forwarded(self):
+        socket_path = os.path.join(self.tmp_dir, 'cfggen.sock')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(socket_path)
+        try:
+            with mock.patch.dict(os.environ, {cfggen_server.SOCKET_PATH_ENV: socket_path}), \
+                    mock.patch('cfggen_server.socket.socket') as client:
+                # Input read from /dev/stdin
+                self.assertIsNone(cfggen_server.forward_to_server(['-j', '/dev/stdin', '--print-data']))
+                self.assertIsNone(cfggen_server.forward_to_server(['--json=/dev/stdin', '--print-data']))
+                # Process substitution, -j <(cmd)
+                self.assertIsNone(cfggen_server.forward_to_server(['-j', '/dev/fd/63', '--print-data']))
+                self.assertIsNone(cfggen_server.forward_to_server(['-j', '/proc/self/fd/63', '--print-data']))
+                # Piped input
+                with tempfile.TemporaryFile() as stdin, mock.patch('sys.stdin', stdin):
+                    self.assertIsNone(cfggen_server.forward_to_server(['--print-data']))
+                client.assert_not_called()
+        finally:
+            sock.close()
+
+    def test_socket_is_created_private(self):
+        server = cfggen_server.RenderServer(None, os.path.join(self.tmp_dir, 'cfggen.sock'))
+        with mock.patch('cfggen_server.os.chmod') as chmod:
+            server._bind()
+        try:
+            # No access for group and others
+            self.assertEqual(os.stat(server.path).st_mode & 0o077, 0)
+            chmod.assert_not_called()
+        finally:
+            server.sock.close()
+
+    def test_stuck_server_renders_locally(self):
+        socket_path = os.path.join(self.tmp_dir, 'cfggen.sock')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(socket_path)
+        sock.listen(1)
+        try:
+            # The server accepts the connection and never replies
+            with mock.patch.dict(os.environ, {cfggen_server.SOCKET_PATH_ENV: socket_path}), \
+                    mock.patch('cfggen_server._REQUEST_TIMEOUT', 0.1), \
+                    mock.patch('cfggen_server._reads_client_fds', return_value=False):
+                self.assertIsNone(cfggen_server.forward_to_server(['--print-data']))
+        finally:
+            sock.close()
+
+    def test_default_hwsku_file_is_part_of_the_key(self):
+        port_config = os.path.join(self.tmp_dir, 'platform.json')
+        hwsku_config = os.path.join(self.tmp_dir, 'hwsku.json')
+        shutil.copy(os.path.join(self.test_dir, 'sample_platform.json'), port_config)
+        shutil.copy(os.path.join(self.test_dir, 'sample_hwsku.json'), hwsku_config)
+        loader = mock.Mock(return_value={'DEVICE_METADATA': {}})
+        cache = cfggen_server.RenderCache()
+
+        with mock.patch('portconfig.get_hwsku_file_name', return_value=hwsku_config):
+            cache.get_minigraph(loader, self.sample_graph, port_config_file=port_config)
+            cache.get_minigraph(loader, self.sample_graph, port_config_file=port_config)
+            self.assertEqual(loader.call_count, 1)
+
+            # hwsku.json is found from the platform and hwsku, not given
+            stat = os.stat(hwsku_config)
+            os.utime(hwsku_config, (stat.st_atime, stat.st_mtime + 10))
+            cache.get_minigraph(loader, self.sample_graph, port_config_file=port_config)
+            self.assertEqual(loader.call_count, 2)
+
+    def test_ports_from_config_db_are_not_kept(self):
+        loader = mock.Mock(return_value={'DEVICE_METADATA': {}})
+        cache = cfggen_server.RenderCache()
+        cache.get_minigraph(loader, self.sample_graph)
+        cache.get_minigraph(loader, self.sample_graph)
+        self.assertEqual(loader.call_count, 2)
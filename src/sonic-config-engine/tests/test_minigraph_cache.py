@@ -0,0 +1,105 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import minigraph
+import minigraph_cache
+
+from unittest import TestCase
+
+if sys.version_info.major == 3:
+    from unittest import mock
+else:
+    import mock
+
+
+class TestMinigraphCache(TestCase):
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        self.sample_graph = os.path.join(self.test_dir, 'simple-sample-graph-case.xml')
+        self.cache_dir = tempfile.mkdtemp()
+        self.port_config = os.path.join(self.cache_dir, 'port_config.ini')
+        shutil.copy(os.path.join(self.test_dir, 't0-sample-port-config.ini'), self.port_config)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def parse(self):
+        return minigraph_cache.parse_xml(self.sample_graph, port_config_file=self.port_config, cache_dir=self.cache_dir)
+
+    def test_cached_result_round_trips(self):
+        expected = minigraph.parse_xml(self.sample_graph, port_config_file=self.port_config)
+        self.assertEqual(self.parse(), expected)
+        with mock.patch('minigraph.parse_xml_data') as parse_xml:
+            result = self.parse()
+            parse_xml.assert_not_called()
+        # Tuple keys and ipaddress objects survive the round trip
+        self.assertEqual(result, expected)
+        self.assertEqual(result['MGMT_INTERFACE'], expected['MGMT_INTERFACE'])
+
+    def test_port_config_change_invalidates(self):
+        self.parse()
+        with open(self.port_config, 'a') as f:
+            f.write('# modified\n')
+        with mock.patch('minigraph.parse_xml_data', wraps=minigraph.parse_xml_data) as parse_xml:
+            self.parse()
+            parse_xml.assert_called_once()
+
+    def test_arguments_are_part_of_the_key(self):
+        self.parse()
+        with mock.patch('minigraph.parse_xml_data', wraps=minigraph.parse_xml_data) as parse_xml:
+            minigraph_cache.parse_xml(self.sample_graph, platform='x86_64-dummy', port_config_file=self.port_config, cache_dir=self.cache_dir)
+            parse_xml.assert_called_once()
+
+    def test_mmu_profiles_selected_on_hit(self):
+        self.parse()
+        with mock.patch('minigraph.select_mmu_profiles') as select_mmu_profiles, \
+                mock.patch('minigraph.parse_xml_data') as parse_xml_data:
+            self.parse()
+            parse_xml_data.assert_not_called()
+            select_mmu_profiles.assert_called_once()
+
+    def test_no_config_db_access_with_port_config(self):
+        self.parse()
+        with mock.patch('portconfig.db_connect_configdb') as db_connect_configdb:
+            self.parse()
+            db_connect_configdb.assert_not_called()
+
+    def test_ports_from_config_db_bypass_cache(self):
+        config_db = mock.Mock()
+        config_db.get_table.return_value = {'Ethernet0': {'lanes': '29,30,31,32'}}
+        with mock.patch('portconfig.db_connect_configdb', return_value=config_db):
+            minigraph_cache.parse_xml(self.sample_graph, cache_dir=self.cache_dir)
+        self.assertEqual(minigraph_cache.clear_cache(self.cache_dir), 0)
+
+    def test_default_port_config_is_part_of_the_key(self):
+        config_db = mock.Mock()
+        config_db.get_table.return_value = {}
+        # No -p, as in the boot time invocations: the port config is found from the hwsku
+        with mock.patch('portconfig.db_connect_configdb', return_value=config_db), \
+                mock.patch('sonic_py_common.device_info.get_path_to_port_config_file', return_value=self.port_config):
+            minigraph_cache.parse_xml(self.sample_graph, cache_dir=self.cache_dir)
+            with mock.patch('minigraph.parse_xml_data', wraps=minigraph.parse_xml_data) as parse_xml:
+                minigraph_cache.parse_xml(self.sample_graph, cache_dir=self.cache_dir)
+                parse_xml.assert_not_called()
+                with open(self.port_config, 'a') as f:
+                    f.write('# modified\n')
+                minigraph_cache.parse_xml(self.sample_graph, cache_dir=self.cache_dir)
+                parse_xml.assert_called_once()
+
+    def test_clear_cache(self):
+        self.parse()
+        self.assertEqual(minigraph_cache.clear_cache(self.cache_dir), 1)
+        self.assertEqual(minigraph_cache.clear_cache(self.cache_dir), 0)
+
+    def test_cache_disabled(self):
+        with mock.patch.dict(os.environ, {'SONIC_MINIGRAPH_CACHE_DIR': ''}):
+            self.assertIsNone(minigraph_cache.get_cache_dir())
+        with mock.patch.dict(os.environ):
+            os.environ.pop('SONIC_MINIGRAPH_CACHE_DIR', None)
+            self.assertIsNone(minigraph_cache.get_cache_dir())
+
+    def test_cache_dir_from_environment(self):
+        with mock.patch.dict(os.environ, {'SONIC_MINIGRAPH_CACHE_DIR': self.cache_dir}):
+            self.assertEqual(minigraph_cache.get_cache_dir(), self.cache_dir)
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import time
+
+import jinja2
+
+from template_cache import get_bytecode_cache, TemplateBytecodeCache
+from unittest import TestCase
+
+
+class TestTemplateCache(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.template_dir = tempfile.mkdtemp()
+        self.template_file = os.path.join(self.template_dir, 'test.j2')
+        with open(self.template_file, 'w') as f:
+            f.write('{% for i in items %}{{ i }}{% endfor %}')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.template_dir)
+
+    def render(self, cache):
+        env = jinja2.Environment(loader=jinja2.FileSystemLoader([self.template_dir]), bytecode_cache=cache)
+        return env.get_template('test.j2').render(items=[1, 2, 3])
+
+    def test_cache_is_populated_and_reused(self):
+        cache = get_bytecode_cache(self.cache_dir)
+        self.assertIsInstance(cache, TemplateBytecodeCache)
+        self.assertEqual(self.render(cache), '123')
+        entries = os.listdir(self.cache_dir)
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(self.render(cache), '123')
+        self.assertEqual(os.listdir(self.cache_dir), entries)
+
+    def test_modified_template_gets_new_entry(self):
+        cache = get_bytecode_cache(self.cache_dir)
+        self.render(cache)
+        key = cache.get_cache_key('test.j2', self.template_file)
+        with open(self.template_file, 'w') as f:
+            f.write('{{ items | length }}')
+        mtime = time.time() + 10
+        os.utime(self.template_file, (mtime, mtime))
+        self.assertNotEqual(cache.get_cache_key('test.j2', self.template_file), key)
+        self.assertEqual(self.render(cache), '3')
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_cache_disabled(self):
+        os.environ['SONIC_J2_CACHE_DIR'] = ''
+        try:
+            self.assertIsNone(get_bytecode_cache())
+        finally:
+            os.environ.pop('SONIC_J2_CACHE_DIR')
+        self.assertIsNone(get_bytecode_cache())
+
+    def test_cache_dir_from_environment(self):
+        os.environ['SONIC_J2_CACHE_DIR'] = os.path.join(self.cache_dir, 'j2')
+        try:
+            cache = get_bytecode_cache()
+        finally:
+            os.environ.pop('SONIC_J2_CACHE_DIR')
+        self.assertEqual(cache.directory, os.path.join(self.cache_dir, 'j2'))
+        self.assertEqual(self.render(cache), '123')
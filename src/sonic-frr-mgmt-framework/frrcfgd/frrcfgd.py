@@ -14,6 +14,7 @@ import re
 import logging
 import netaddr
 import io
+import itertools
 import struct
 
 class CachedDataWithOp:
@@ -218,7 +219,7 @@ class BgpdClientMgr(threading.Thread):
             syslog.syslog(syslog.LOG_ERR, 'failed to create socket to FRR daemon')
             raise RuntimeError('connect to FRR daemon failed')
         self.proxy_running = True
-        self.lock = threading.Lock()
+        self.lock = threading.RLock()
         self.proxy_sock = self.__create_proxy_socket()
         self.cmd_to_daemon = []
         for pat, daemons in self.VTYSH_CMD_DAEMON:
@@ -227,15 +228,30 @@ class BgpdClientMgr(threading.Thread):
             except Exception:
                 syslog.syslog(syslog.LOG_ERR, 'invalid regex format: %s' % pat)
                 continue
+        # The patterns match at most the first CMD_DAEMON_WORDS words of a command. Commands with the same
+        # leading words go to the same daemons, commands starting with a word no specific pattern starts
+        # with go to the daemons of the catch-all pattern
+        self.cmd_first_words = set(pat.split()[0] for pat, _ in self.VTYSH_CMD_DAEMON if re.match(r'\w+\s', pat))
+        self.cmd_daemon_cache = {}
+        self.transaction = None
+    CMD_DAEMON_WORDS = 3
+    def __match_cmd_daemons(self, cmd):
+        words = cmd.split()
+        cache_key = tuple(words[:self.CMD_DAEMON_WORDS]) if len(words) > 0 and words[0] in self.cmd_first_words else None
+        if cache_key in self.cmd_daemon_cache:
+            return self.cmd_daemon_cache[cache_key]
+        match_daemons = None
+        for re_comp, daemons in self.cmd_to_daemon:
+            if re_comp.match(cmd) is not None:
+                match_daemons = daemons
+                break
+        self.cmd_daemon_cache[cache_key] = match_daemons
+        return match_daemons
     def __get_cmd_daemons(self, cmd_list):
         cmn_daemons = None
         for cmd in cmd_list:
-            found = False
-            for re_comp, daemons in self.cmd_to_daemon:
-                if re_comp.match(cmd.strip()) is not None:
-                    found = True
-                    break
-            if not found:
+            daemons = self.__match_cmd_daemons(cmd.strip())
+            if daemons is None:
                 syslog.syslog(syslog.LOG_ERR, 'no matched daemons found for command %s' % cmd)
                 return None
             if cmn_daemons is None:
@@ -272,27 +288,136 @@ class BgpdClientMgr(threading.Thread):
                 ret_val = True
             resp += reply
         return (ret_val, resp)
+    def __send_command_list(self, cmd_list, daemon):
+        # all the commands are sent at once, the daemon replies to them in order
+        syslog.syslog(syslog.LOG_DEBUG, 'VTYSH CMD: %s daemon: %s' % (cmd_list, daemon))
+        sock = self.client_socks.get(daemon, None)
+        if sock is None:
+            syslog.syslog(syslog.LOG_ERR, 'daemon %s is not connected' % daemon)
+            return None
+        try:
+            self.__send_data(sock, ''.join(cmd + '\0' for cmd in cmd_list))
+        except socket.error as msg:
+            syslog.syslog(syslog.LOG_ERR, 'failed to send command to frr daemon: %s' % msg)
+            return None
+        return sock
+    def __read_command_list_replies(self, sock, cmd_count, daemon):
+        ret_codes = []
+        buf = b''
+        while len(ret_codes) < cmd_count:
+            idx = buf.find(b'\0\0\0')
+            if idx < 0 or len(buf) < idx + 4:
+                try:
+                    rd_msg = sock.recv(16384)
+                except socket.timeout:
+                    syslog.syslog(syslog.LOG_ERR, 'socket reading timeout')
+                    rd_msg = b''
+                if len(rd_msg) == 0:
+                    syslog.syslog(syslog.LOG_ERR, 'failed to get reply from frr daemon')
+                    return ret_codes + [None] * (cmd_count - len(ret_codes))
+                buf += rd_msg
+                continue
+            ret_code = buf[idx + 3]
+            if ret_code != 0:
+                syslog.syslog(syslog.LOG_DEBUG, '[%s] command return code: %d' % (daemon, ret_code))
+                syslog.syslog(syslog.LOG_DEBUG, buf[:idx].decode())
+            ret_codes.append(ret_code)
+            buf = buf[idx + 4:]
+        return ret_codes
+    def __proc_command_list(self, cmd_list, daemon):
+        sock = self.__send_command_list(cmd_list, daemon)
+        if sock is None:
+            return None
+        return self.__read_command_list_replies(sock, len(cmd_list), daemon)
+    # commands entering a configuration node: the daemon is out of the node of their context lines after them
+    NODE_CMD_PATTERN = re.compile(r'(router|address-family|route-map|vrf|interface|bfd|peer|profile|vni|ip sla|key chain|segment-routing|line)(\s|$)')
+    def begin_transaction(self):
+        """Keep the daemons in configuration mode between the vtysh commands, until end_transaction() is called.
+        The context lines a command shares with the previous command for a daemon are not sent again.
+        The lock is held for the whole transaction: vtysh commands of clients of the proxy socket wait
+        until it ends, i.e. for a whole drain of the config DB updates, or the config replay at start.
+        The commands themselves still go one by one, the handlers check the result of each of them.
+        """
+        self.lock.acquire()
+        if self.transaction is None:
+            self.transaction = {'depth': 0, 'start': time.monotonic(), 'commands': 0, 'context': {}}
+        self.transaction['depth'] += 1
+    def end_transaction(self):
+        try:
+            self.transaction['depth'] -= 1
+            if self.transaction['depth'] > 0:
+                return
+            transaction = self.transaction
+            self.transaction = None
+            # daemons in configuration mode
+            for daemon in transaction['context']:
+                self.__proc_command_list(['end'], daemon)
+            if transaction['commands'] > 0:
+                syslog.syslog(syslog.LOG_INFO, 'VTYSH transaction of %d commands to %s done in %.1f ms' %
+                              (transaction['commands'], sorted(transaction['context']),
+                               (time.monotonic() - transaction['start']) * 1000))
+        finally:
+            self.lock.release()
+    def __daemon_cmd_list(self, daemon, cmd_list):
+        # return the number of leading commands the daemon doesn't run again, and the commands to send to it
+        if self.transaction is None:
+            return 0, cmd_list + ['end']
+        context = self.transaction['context']
+        if daemon in context and cmd_list[0] == 'configure terminal' and context[daemon] == cmd_list[:-1]:
+            return len(cmd_list) - 1, cmd_list[-1:]
+        if daemon in context:
+            # leave the node of the previous command
+            return -1, ['end'] + cmd_list
+        return 0, cmd_list
+    def __update_daemon_context(self, daemon, cmd_list, succ):
+        if self.transaction is None:
+            return
+        context = self.transaction['context']
+        if 'configure terminal' not in cmd_list:
+            context.pop(daemon, None)
+        elif succ and cmd_list[0] == 'configure terminal' and self.NODE_CMD_PATTERN.match(cmd_list[-1]) is None:
+            context[daemon] = cmd_list[:-1]
+        else:
+            # in configuration mode, in an unknown node
+            context[daemon] = None
     def run_vtysh_command(self, table, command, daemons):
         if not command.startswith(self.VTYSH_MARK):
             syslog.syslog(syslog.LOG_ERR, 'command %s is not for vtysh config' % command)
             return False
         cmd_line = command[len(self.VTYSH_MARK):]
-        cmd_list = re.findall(r"-c\s+'([^']+)'\s*", cmd_line)
-        cmd_list.append('end')
+        cmd_list = [cmd.strip() for cmd in re.findall(r"-c\s+'([^']+)'\s*", cmd_line)]
         if daemons is None:
             daemons = self.TABLE_DAEMON.get(table, None)
         if daemons is None:
-            daemons = self.__get_cmd_daemons(cmd_list)
+            daemons = self.__get_cmd_daemons(cmd_list + ['end'])
         if daemons is None or len(daemons) == 0:
             syslog.syslog(syslog.LOG_ERR, 'no common daemon list found for given commands')
             return False
-        ret_val = True
         with self.lock:
-            for cmd in cmd_list:
-                succ, _ = self.__proc_command(cmd.strip(), daemons)
-                if not succ:
-                    ret_val = False
-        return ret_val
+            # the commands are sent to all the daemons before any reply is read, the daemons run them
+            # concurrently
+            sent = []
+            for daemon in daemons:
+                skip_cnt, daemon_cmd_list = self.__daemon_cmd_list(daemon, cmd_list)
+                sock = self.__send_command_list(daemon_cmd_list, daemon)
+                if sock is not None:
+                    sent.append((daemon, sock, skip_cnt, len(daemon_cmd_list)))
+            # a command is successful if at least one daemon ran it successfully
+            cmd_succ = None
+            for daemon, sock, skip_cnt, cmd_cnt in sent:
+                ret_codes = self.__read_command_list_replies(sock, cmd_cnt, daemon)
+                if skip_cnt < 0:
+                    # reply to the leading 'end'
+                    ret_codes = ret_codes[-skip_cnt:]
+                    skip_cnt = 0
+                ret_codes = [0] * skip_cnt + ret_codes
+                self.__update_daemon_context(daemon, cmd_list, all(ret_code == 0 for ret_code in ret_codes))
+                if cmd_succ is None:
+                    cmd_succ = [False] * len(ret_codes)
+                cmd_succ = [succ or ret_code == 0 for succ, ret_code in zip(cmd_succ, ret_codes)]
+            if self.transaction is not None:
+                self.transaction['commands'] += 1
+        return cmd_succ is not None and all(cmd_succ)
     @staticmethod
     def __read_all(sock, data_len):
         in_buf = io.StringIO()
@@ -523,6 +648,58 @@ class BGPKeyMapInfo:
         ret_str += ']'
         return ret_str
         
+class BGPKeyMapPlan(object):
+    """
+    Parsed form of the DB field spec of a key map entry. A spec is a field name,
+    a list of field names or a tuple of field names whose values are merged into
+    one argument. A name prefixed with '+' is optional, with '++' it is optional
+    and filled with '' when absent. '&' separates alternative field names.
+    """
+    __slots__ = ('db_field', 'key_map', 'fields', 'req_idx_list', 'opt_idx_list', 'merge_vals')
+    def __init__(self, db_field, key_map):
+        self.db_field = db_field
+        self.key_map = key_map
+        self.merge_vals = type(db_field) is tuple
+        if type(db_field) is not list and type(db_field) is not tuple:
+            db_field = [db_field]
+        fields = []
+        req_idx_list = []
+        opt_idx_list = set()
+        for idx, dkey in enumerate(db_field):
+            optional = False
+            if len(dkey) > 0 and dkey[0] == '+':
+                if len(dkey) > 1 and dkey[1] == '+':
+                    opt_idx_list.add(idx)
+                    dkey = dkey[2:]
+                else:
+                    dkey = dkey[1:]
+                optional = True
+            else:
+                req_idx_list.append(idx)
+            fields.append((tuple(dkey.split('&')), optional))
+        self.fields = tuple(fields)
+        self.req_idx_list = tuple(req_idx_list)
+        self.opt_idx_list = frozenset(opt_idx_list)
+    def get_key_lists(self, data):
+        """
+        Expand the spec against the changed data
+        :param data: field name ==> CachedDataWithOp
+        :return: list of all combinations of the field names found in data, None if a mandatory field is missing
+        """
+        key_list_list = [[]]
+        for keys, optional in self.fields:
+            key_list = [k for k in keys if isinstance(data.get(k), CachedDataWithOp)]
+            if len(key_list) == 0:
+                if not optional:
+                    return None
+                key_list = [None]
+            if len(key_list) == 1:
+                for k_lst in key_list_list:
+                    k_lst.append(key_list[0])
+            else:
+                key_list_list = [k_lst + [k] for k_lst in key_list_list for k in key_list]
+        return key_list_list
+
 class BGPKeyMapList(list):
     def __init__(self, key_map_list, table_name, table_key = None):
         super(BGPKeyMapList, self).__init__()
@@ -558,6 +735,7 @@ class BGPKeyMapList(list):
                     except ValueError:
                         pass
             super(BGPKeyMapList, self).append((db_field, BGPKeyMapInfo(cmd_str, hdl_func, hdl_data)))
+        self.plans = tuple(BGPKeyMapPlan(db_field, key_map) for db_field, key_map in self)
     def __eq__(self, other):
         return super(BGPKeyMapList, self).__eq__(other) and self.table_name == other.table_name and self.table_key == other.table_key
     def __ne__(self, other):
@@ -644,59 +822,13 @@ class BGPKeyMapList(list):
         start_idx = len(upper_vals)
         ret_val = False
         run_cmd_cnt = 0
-        for db_field, key_map in self:
-            merge_vals = False
-            if type(db_field) is not list and type(db_field) is not tuple:
-                db_field = [db_field]
-            elif type(db_field) is tuple:
-                db_field = list(db_field)
-                merge_vals = True
-
-            idx = 0
-            req_idx_list = []
-            key_list_list = []
-            opt_idx_list = set()
-            run_cmd = True
-            for dkey in db_field:
-                optional = False
-                if len(dkey) > 0 and dkey[0] == '+':
-                    if len(dkey) > 1 and dkey[1] == '+':
-                        opt_idx_list.add(idx)
-                        dkey = dkey[2:]
-                    else:
-                        dkey = dkey[1:]
-                    optional = True
-                else:
-                    req_idx_list.append(idx)
-                key_list = []
-                for k in dkey.split('&'):
-                    if k in data and isinstance(data[k], CachedDataWithOp):
-                        key_list.append(k)
-                if not optional and len(key_list) == 0:
-                    run_cmd = False
-                    break
-                if len(key_list) == 0:
-                    if len(key_list_list) == 0:
-                        key_list_list.append([None])
-                    else:
-                        for k_lst in key_list_list:
-                            k_lst.append(None)
-                else:
-                    new_list = []
-                    if len(key_list_list) == 0:
-                        for k in key_list:
-                            key_list_list.append([k])
-                    else:
-                        for k_lst in key_list_list:
-                            if len(key_list) == 1:
-                                k_lst.append(key_list[0])
-                            else:
-                                for k in key_list:
-                                    new_list.append(k_lst + [k])
-                    if len(new_list) > 0:
-                        key_list_list = new_list
-                idx += 1
-            if not run_cmd:
+        for plan in self.plans:
+            key_map = plan.key_map
+            merge_vals = plan.merge_vals
+            req_idx_list = plan.req_idx_list
+            opt_idx_list = plan.opt_idx_list
+            key_list_list = plan.get_key_lists(data)
+            if key_list_list is None:
                 continue
 
             cmd_list_list = []
@@ -1455,26 +1587,48 @@ class ExtConfigDBConnector(ConfigDBConnector):
             if type(val) is list and key not in self.nosort_attrs.get(table, set()):
                 val.sort()
         return data
-    def sub_msg_handler(self, msg_item):
-        if msg_item['type'] == 'pmessage':
-            key = msg_item['channel'].split(':', 1)[1]
+    def get_msg_key(self, msg_item):
+        """Return the CONFIG_DB key a keyspace notification is about, None if it is not about a handled table."""
+        if not msg_item or msg_item.get('type') != 'pmessage':
+            return None
+        channel = msg_item['channel']
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        key = channel.split(':', 1)[1]
+        table = key.split(self.TABLE_NAME_SEPARATOR, 1)[0]
+        if table == key or table not in self.handlers:
+            return None
+        return key
+    def dispatch(self, key_list):
+        """Read the entries of the notified keys with one pipelined round trip and fire their handlers in order.
+        """
+        client = self.get_redis_client(self.db_name)
+        if hasattr(client, 'pipeline'):
+            pipe = client.pipeline(transaction = False)
+            for key in key_list:
+                pipe.hgetall(key)
+            raw_data_list = pipe.execute()
+        else:
+            raw_data_list = [client.hgetall(key) for key in key_list]
+        for key, raw_data in zip(key_list, raw_data_list):
+            (table, row) = key.split(self.TABLE_NAME_SEPARATOR, 1)
             try:
-                (table, row) = key.split(self.TABLE_NAME_SEPARATOR, 1)
-                if table in self.handlers:
-                    client = self.get_redis_client(self.db_name)
-                    data = self.raw_to_typed(client.hgetall(key), table)
-                    super(ExtConfigDBConnector, self)._ConfigDBConnector__fire(table, row, data)
-            except ValueError:
-                pass    #Ignore non table-formated redis entries
+                data = self.raw_to_typed(raw_data, table)
+                self._ConfigDBConnector__fire(table, row, data)
             except Exception as e:
                 syslog.syslog(syslog.LOG_ERR, '[bgp cfgd] Failed handling config DB update with exception:' + str(e))
                 logging.exception(e)
-    def listen(self):
-        """Start listen Redis keyspace events and will trigger corresponding handlers when content of a table changes.
+    def listen(self, table_list = None):
+        """Start listen Redis keyspace events of the tables and will trigger corresponding handlers when content of a table changes.
         """
+        if table_list is None:
+            table_list = list(self.handlers)
         self.pubsub = self.get_redis_client(self.db_name).pubsub()
-        self.pubsub.psubscribe(**{"__keyspace@{}__:*".format(self.get_dbid(self.db_name)): self.sub_msg_handler})
-        self.sub_thread = self.pubsub.run_in_thread(sleep_time = 0.01)
+        dbid = self.get_dbid(self.db_name)
+        for table in table_list:
+            self.pubsub.psubscribe("__keyspace@{}__:{}{}*".format(dbid, table, self.TABLE_NAME_SEPARATOR))
+        self.sub_thread = KeyspaceListener(self)
+        self.sub_thread.start()
     @staticmethod
     def get_table_key(table, key):
         return table + '&&' + key
@@ -1487,6 +1641,53 @@ class ExtConfigDBConnector(ConfigDBConnector):
                 ret_data[table_key] = data
         return ret_data
 
+class KeyspaceListener(threading.Thread):
+    """Thread reading the keyspace notifications of ExtConfigDBConnector.
+
+    Notifications are collected until none arrives for DEBOUNCE_TIME, or for at most MAX_BATCH_TIME.
+    The several notifications of one entry update are coalesced into one read of the entry. Keys are
+    dispatched in the order of their first notification in the batch. While nothing changes, the
+    thread is blocked reading the subscription socket.
+    """
+    DEBOUNCE_TIME = 0.02
+    MAX_BATCH_TIME = 0.5
+    IDLE_TIMEOUT = 1.0
+    def __init__(self, config_db):
+        super(KeyspaceListener, self).__init__(name = 'CONFIG_DB keyspace listener')
+        self.daemon = True
+        self.config_db = config_db
+        self.running = True
+    def stop(self):
+        self.running = False
+    def collect(self):
+        key_list = {}
+        timeout = self.IDLE_TIMEOUT
+        deadline = None
+        while self.running:
+            msg_item = self.config_db.pubsub.get_message(timeout = timeout)
+            if not msg_item:
+                break
+            key = self.config_db.get_msg_key(msg_item)
+            if key is not None:
+                key_list.setdefault(key, None)
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + self.MAX_BATCH_TIME
+            if now >= deadline:
+                break
+            timeout = min(self.DEBOUNCE_TIME, deadline - now)
+        return list(key_list)
+    def run(self):
+        while self.running:
+            try:
+                key_list = self.collect()
+                if key_list:
+                    self.config_db.dispatch(key_list)
+            except Exception as e:
+                syslog.syslog(syslog.LOG_ERR, '[bgp cfgd] Failed reading config DB notifications with exception:' + str(e))
+                logging.exception(e)
+                time.sleep(self.IDLE_TIMEOUT)
+
 class CommunityList:
     MATCH_ALL = 0
     MATCH_ANY = 1
@@ -2060,6 +2261,13 @@ class BGPConfigDaemon:
             pass
         return False
 
+    # tables replayed first in unified mode: VRFs and globals, the sets route-maps match on,
+    # route-maps, then peer groups and neighbors. The other tables follow in handler order
+    REPLAY_TABLE_ORDER = ['VRF', 'DEVICE_METADATA', 'BGP_GLOBALS', 'BGP_GLOBALS_AF',
+                          'PREFIX_SET', 'PREFIX', 'COMMUNITY_SET', 'EXTENDED_COMMUNITY_SET', 'AS_PATH_SET',
+                          'TAG_SET', 'NEIGHBOR_SET', 'NEXTHOP_SET', 'ROUTE_MAP',
+                          'BGP_PEER_GROUP', 'BGP_PEER_GROUP_AF', 'BGP_NEIGHBOR', 'BGP_NEIGHBOR_AF']
+
     def __init__(self):
         self.config_db = ExtConfigDBConnector({'STATIC_ROUTE': {'nexthop', 'ifname', 'distance', 'nexthop-vrf', 'blackhole', 'track'}})
         try:
@@ -2236,30 +2444,89 @@ class BGPConfigDaemon:
             ('IGMP_INTERFACE', self.bgp_table_handler_common),
             ('IGMP_INTERFACE_QUERY', self.bgp_table_handler_common)
         ]
+        # key maps are compiled once, events only look them up
+        self.key_maps = self.compile_key_maps()
         self.bgp_message = queue.Queue(0)
+        start_time = time.monotonic()
         self.table_data_cache = self.config_db.get_table_data([tbl for tbl, _ in self.table_handler_list])
         syslog.syslog(syslog.LOG_DEBUG, 'Init Cached DB data')
         for key, entry in self.table_data_cache.items():
             syslog.syslog(syslog.LOG_DEBUG, '  %-20s : %s' % (key, entry))
         if self.config_mode == "unified":
-            for table, _ in self.table_handler_list:
-                table_list = self.config_db.get_table(table)
-                for key, data in table_list.items():
+            self.__replay_config(start_time)
+
+    def __replay_config(self, start_time):
+        """Apply the config DB snapshot read at start to FRR, in one vtysh transaction.
+        The entries go through the table handlers in dependency order and each of them still runs its
+        own vtysh commands, whose results the handlers check. The transaction only keeps every daemon
+        in one configuration session and drops the context lines the commands share, FRR does not get
+        a single configuration block.
+        """
+        replay_data = {}
+        for table_key, entry in self.table_data_cache.items():
+            table, key = table_key.split('&&', 1)
+            replay_data.setdefault(table, []).append((key, entry))
+        table_list = [table for table in self.REPLAY_TABLE_ORDER if table in replay_data]
+        table_list += [table for table, _ in self.table_handler_list if table in replay_data and table not in table_list]
+        entry_cnt = 0
+        if bgpd_client is not None:
+            bgpd_client.begin_transaction()
+        try:
+            for table in table_list:
+                # sorted keys keep the entries of a VRF together, their commands share the context lines
+                for key, data in sorted(replay_data[table], key = lambda entry: entry[0]):
                     syslog.syslog(syslog.LOG_DEBUG, 'config replay for table {} key {}'.format(table, key))
                     upd_data = {}
                     for upd_key, upd_val in data.items():
-                        upd_data[upd_key] = CachedDataWithOp(upd_val, CachedDataWithOp.OP_ADD)
-                    self.bgp_message.put((self.config_db.serialize_key(key), False, table, upd_data))
-                    upd_data_list = []
-                    self.__update_bgp(upd_data_list)
-                    for table1, key1, data1 in upd_data_list:
-                        table_key = ExtConfigDBConnector.get_table_key(table1, key1)
-                        self.__update_cache_data(table_key, data1)
+                        upd_data[upd_key] = CachedDataWithOp(copy.deepcopy(upd_val), CachedDataWithOp.OP_ADD)
+                    self.bgp_message.put((key, False, table, upd_data))
+                    entry_cnt += 1
+                # messages the table adds for dependent tables are handled before the next table
+                upd_data_list = []
+                self.__update_bgp_messages(upd_data_list)
+                for table1, key1, data1 in upd_data_list:
+                    table_key = ExtConfigDBConnector.get_table_key(table1, key1)
+                    self.__update_cache_data(table_key, data1)
+        finally:
+            if bgpd_client is not None:
+                bgpd_client.end_transaction()
+        syslog.syslog(syslog.LOG_INFO, 'config replay of %d entries of %d tables converged in %.1f ms' %
+                      (entry_cnt, len(table_list), (time.monotonic() - start_time) * 1000))
 
     def subscribe_all(self):
         for table, hdlr in self.table_handler_list:
             self.config_db.subscribe(table, hdlr)
 
+    @classmethod
+    def compile_key_maps(cls):
+        """
+        Compile the key maps of every table, for each table key the entries of a map could be selected by
+        :return: (table, frozenset of table key items) ==> BGPKeyMapList
+        """
+        key_maps = {}
+        for table, key_map_list in cls.tbl_to_key_map.items():
+            fld_keys = {}
+            for key_map in key_map_list:
+                if len(key_map) < 2:
+                    continue
+                fld_name, fld_key = BGPKeyMapList.get_map_field_key(key_map[0])
+                if fld_name is not None:
+                    fld_keys.setdefault(fld_name, set()).add(fld_key)
+            fld_names = sorted(fld_keys)
+            for fld_vals in itertools.product(*[[None] + sorted(fld_keys[name]) for name in fld_names]):
+                tbl_key = {name: val for name, val in zip(fld_names, fld_vals) if val is not None}
+                key_maps[(table, frozenset(tbl_key.items()))] = BGPKeyMapList(key_map_list, table, tbl_key)
+        return key_maps
+
+    def __get_key_map(self, table, tbl_key):
+        map_key = (table, frozenset(tbl_key.items()) if tbl_key else frozenset())
+        key_map = self.key_maps.get(map_key)
+        if key_map is None:
+            # table key not referred by the key map, compile it on first use
+            key_map = BGPKeyMapList(self.tbl_to_key_map[table], table, tbl_key)
+            self.key_maps[map_key] = key_map
+        return key_map
+
     @staticmethod
     def __run_command(table, command, daemons = None):
         return g_run_command(table, command, True, daemons)
@@ -2539,6 +2806,16 @@ class BGPConfigDaemon:
         return cmd_suffix, None
 
     def __update_bgp(self, data_list):
+        # the commands of the drain are run in one vtysh transaction
+        if bgpd_client is not None:
+            bgpd_client.begin_transaction()
+        try:
+            self.__update_bgp_messages(data_list)
+        finally:
+            if bgpd_client is not None:
+                bgpd_client.end_transaction()
+
+    def __update_bgp_messages(self, data_list):
         while not self.bgp_message.empty():
             key, del_table, table, data = self.bgp_message.get()
             if table == 'STATIC_ROUTE' and len(key.split('|')) == 1:
@@ -2580,7 +2857,7 @@ class BGPConfigDaemon:
                     if new_key is not None:
                         key = new_key
                         tbl_key = {'ip_prefix': ('ipv4' if af_id == socket.AF_INET else 'ipv6')}
-                key_map = BGPKeyMapList(self.tbl_to_key_map[table], table, tbl_key)
+                key_map = self.__get_key_map(table, tbl_key)
             else:
                 key_map = None
             if table == 'BGP_GLOBALS':
@@ -3772,7 +4049,7 @@ class BGPConfigDaemon:
 
     def start(self):
         self.subscribe_all()
-        self.config_db.listen()
+        self.config_db.listen([table for table, _ in self.table_handler_list])
     def stop(self):
         self.config_db.sub_thread.stop()
         if self.config_db.sub_thread.is_alive():
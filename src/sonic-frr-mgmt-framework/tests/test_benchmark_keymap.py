@@ -0,0 +1,65 @@
+"""Per-event cost of BGP_NEIGHBOR_AF, ROUTE_MAP and STATIC_ROUTE updates with
+key maps compiled at daemon start, compared with rebuilding the key map of the
+table on every event.
+
+Run with: pytest tests/test_benchmark_keymap.py -m benchmark --benchmark-only
+"""
+import itertools
+from unittest.mock import MagicMock, NonCallableMagicMock, patch
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+swsscommon_module_mock = MagicMock(ConfigDBConnector = NonCallableMagicMock)
+mockmapping = {'swsscommon.swsscommon': swsscommon_module_mock}
+
+class UncachedKeyMaps(dict):
+    """ Key map store which never hits, every event builds its key map """
+    def get(self, key, default = None):
+        return default
+    def __setitem__(self, key, value):
+        pass
+
+def nbr_af_event(idx):
+    return ('BGP_NEIGHBOR_AF', 'default|10.0.0.1|ipv4_unicast',
+            {'admin_status': 'true', 'route_map_in': 'rm%d' % idx, 'max_prefix_limit': str(100 + idx),
+             'max_prefix_warning_threshold': '80', 'send_default_route': 'true'})
+
+def route_map_event(idx):
+    return ('ROUTE_MAP', 'map1|10',
+            {'route_operation': 'permit', 'set_med': str(10 + idx), 'match_tag': '5', 'set_local_pref': '200'})
+
+def static_route_event(idx):
+    return ('STATIC_ROUTE', 'default|10.1.0.0/24', {'nexthop': '10.0.0.%d' % (2 + idx), 'distance': '10'})
+
+@pytest.fixture
+def daemon():
+    with patch.dict('sys.modules', **mockmapping):
+        from frrcfgd import frrcfgd
+        with patch.object(frrcfgd, 'g_run_command', return_value = True):
+            daemon = frrcfgd.BGPConfigDaemon()
+            handlers = dict(daemon.table_handler_list)
+            handlers['BGP_GLOBALS']('BGP_GLOBALS', 'default', {'local_asn': '100'})
+            handlers['BGP_NEIGHBOR']('BGP_NEIGHBOR', 'default|10.0.0.1', {'asn': '200'})
+            yield daemon
+
+def run_events(daemon, benchmark, event_gen):
+    handlers = dict(daemon.table_handler_list)
+    # alternate between two values so that every event changes the config
+    events = itertools.cycle([event_gen(0), event_gen(1)])
+    def update():
+        table, key, data = next(events)
+        handlers[table](table, key, dict(data))
+    benchmark(update)
+
+@pytest.mark.parametrize('event_gen', [nbr_af_event, route_map_event, static_route_event],
+                         ids = ['BGP_NEIGHBOR_AF', 'ROUTE_MAP', 'STATIC_ROUTE'])
+@pytest.mark.parametrize('compiled', [True, False], ids = ['compiled', 'per_event'])
+def test_key_map_event(benchmark, daemon, event_gen, compiled):
+    if not compiled:
+        daemon.key_maps = UncachedKeyMaps()
+    benchmark.group = event_gen.__name__
+    run_events(daemon, benchmark, event_gen)
@@ -10,14 +10,71 @@ mockmapping = {'swsscommon.swsscommon': swsscommon_module_mock}
 def test_contructor():
     from frrcfgd.frrcfgd import BGPConfigDaemon
     daemon = BGPConfigDaemon()
+    daemon.config_db.get_redis_client.return_value.pubsub.return_value.get_message.return_value = None
     daemon.start()
     for table, hdlr in daemon.table_handler_list:
         daemon.config_db.subscribe.assert_any_call(table, hdlr)
-    daemon.config_db.pubsub.psubscribe.assert_called_once()
+    # one keyspace pattern per handled table
+    assert daemon.config_db.pubsub.psubscribe.call_count == len(daemon.table_handler_list)
+    assert daemon.config_db.sub_thread.is_alive()
     daemon.stop()
-    daemon.config_db.sub_thread.stop.assert_called()
-    daemon.config_db.sub_thread.is_alive.assert_called_once()
-    daemon.config_db.sub_thread.join.assert_called_once()
+    assert not daemon.config_db.sub_thread.is_alive()
+
+@patch.dict('sys.modules', **mockmapping)
+def test_keyspace_listener():
+    from frrcfgd.frrcfgd import ExtConfigDBConnector, KeyspaceListener
+    config_db = ExtConfigDBConnector()
+    config_db.TABLE_NAME_SEPARATOR = '|'
+    config_db.handlers = {'BGP_NEIGHBOR': None, 'ROUTE_MAP': None}
+    def notification(key):
+        return {'type': 'pmessage', 'channel': '__keyspace@4__:' + key, 'data': 'hset'}
+    config_db.pubsub = MagicMock()
+    config_db.pubsub.get_message.side_effect = [
+        {'type': 'psubscribe', 'channel': '__keyspace@4__:BGP_NEIGHBOR|*', 'data': 1},
+        notification('ROUTE_MAP|map1|10'),
+        notification('BGP_NEIGHBOR|default|10.0.0.1'),
+        notification('ROUTE_MAP|map1|10'),
+        notification('PORT|Ethernet0'),
+        None,
+    ]
+    listener = KeyspaceListener(config_db)
+    assert listener.collect() == ['ROUTE_MAP|map1|10', 'BGP_NEIGHBOR|default|10.0.0.1']
+    client = config_db.get_redis_client.return_value
+    client.pipeline.return_value.execute.return_value = [{'route_operation': 'permit'}, {}]
+    fired = []
+    config_db.raw_to_typed = lambda raw, table: raw if raw else None
+    config_db._ConfigDBConnector__fire = lambda table, row, data: fired.append((table, row, data))
+    config_db.dispatch(['ROUTE_MAP|map1|10', 'BGP_NEIGHBOR|default|10.0.0.1'])
+    assert client.pipeline.return_value.hgetall.call_count == 2
+    client.hgetall.assert_not_called()
+    assert fired == [('ROUTE_MAP', 'map1|10', {'route_operation': 'permit'}),
+                     ('BGP_NEIGHBOR', 'default|10.0.0.1', None)]
+
+@patch.dict('sys.modules', **mockmapping)
+def test_unified_config_replay():
+    from frrcfgd import frrcfgd
+    config = {'DEVICE_METADATA': {'localhost': {'docker_routing_config_mode': 'unified'}},
+              'BGP_NEIGHBOR': {('default', '10.0.0.1'): {'asn': '200'}},
+              'ROUTE_MAP': {('map1', '10'): {'route_operation': 'permit', 'set_med': '10'}},
+              'BGP_GLOBALS': {'default': {'local_asn': '100'}}}
+    get_table = MagicMock(side_effect = lambda table: copy.deepcopy(config.get(table, {})))
+    serialize_key = lambda key: '|'.join(key) if isinstance(key, tuple) else key
+    with patch.object(frrcfgd.ExtConfigDBConnector, 'get_table', get_table, create = True), \
+         patch.object(frrcfgd.ExtConfigDBConnector, 'serialize_key', staticmethod(serialize_key), create = True), \
+         patch.object(frrcfgd.ExtConfigDBConnector, 'get_entry',
+                      lambda self, table, key: config.get(table, {}).get(key, {}), create = True), \
+         patch.object(frrcfgd, 'g_run_command', return_value = True) as run_cmd, \
+         patch.object(frrcfgd, 'bgpd_client') as bgpd_client:
+        daemon = frrcfgd.BGPConfigDaemon()
+    # the snapshot read at start is replayed, the tables are not read again
+    read_tables = [c[0][0] for c in get_table.call_args_list]
+    assert read_tables.count('BGP_NEIGHBOR_AF') == 1
+    assert read_tables.count('BGP_NEIGHBOR') == 2
+    tables = [c[0][0] for c in run_cmd.call_args_list]
+    assert tables.index('BGP_GLOBALS') < tables.index('ROUTE_MAP') < tables.index('BGP_NEIGHBOR')
+    assert bgpd_client.begin_transaction.call_count == 1
+    assert bgpd_client.end_transaction.call_count == 1
+    assert daemon.table_data_cache['ROUTE_MAP&&map1|10'] == config['ROUTE_MAP'][('map1', '10')]
 
 class CmdMapTestInfo:
     data_buf = {}
@@ -1,4 +1,8 @@
+import os
+import shutil
 import socket
+import tempfile
+import threading
 import pytest
 from unittest.mock import MagicMock, NonCallableMagicMock, patch
 
@@ -18,6 +22,7 @@ with patch.dict('sys.modules', **mockmapping):
     from frrcfgd.frrcfgd import AggregateAddr
     from frrcfgd.frrcfgd import IpNextHop
     from frrcfgd.frrcfgd import IpNextHopSet
+    from frrcfgd.frrcfgd import BgpdClientMgr
 
 def test_data_with_op():
     data = CachedDataWithOp()
@@ -234,3 +239,104 @@ def test_nexthop_set():
             test_set.add(IpNextHop(af, bkh_list[idx], ip_list[idx] if af == socket.AF_INET else ip6_list[idx],
                                    None, intf_list[idx], tag_list[idx], None, vrf_list[idx]))
         assert(nh_set == test_set)
+
+class FakeVtyDaemon(object):
+    """ vty socket of a FRR daemon, which fails the commands containing 'bad' """
+    def __init__(self, vty_dir, name, replies=None):
+        self.commands = []
+        self.replies = replies or {}  # command -> output, other commands output "output of <command>"
+        self.path = os.path.join(vty_dir, '%s.vty' % name)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        self.sock.listen(1)
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def serve(self):
+        conn, _ = self.sock.accept()
+        buf = b''
+        while True:
+            data = conn.recv(4096)
+            if not data:
+                return
+            buf += data
+            while b'\0' in buf:
+                command, buf = buf.split(b'\0', 1)
+                command = command.decode()
+                self.commands.append(command)
+                rc = 2 if 'bad' in command else 0
+                output = self.replies.get(command, 'output of ' + command)
+                conn.sendall(output.encode() + b'\0\0\0' + bytes([rc]))
+
+@pytest.fixture
+def vty_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path)
+
+def get_bgpd_client(daemons, vty_dir=None):
+    with patch.object(BgpdClientMgr, '_BgpdClientMgr__create_frr_client', return_value=True), \
+         patch.object(BgpdClientMgr, '_BgpdClientMgr__create_proxy_socket'):
+        client = BgpdClientMgr()
+    client.client_socks = {}
+    fake_daemons = {}
+    for daemon in daemons:
+        fake_daemons[daemon] = FakeVtyDaemon(vty_dir, daemon)
+        client.client_socks[daemon] = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.client_socks[daemon].connect(fake_daemons[daemon].path)
+    return client, fake_daemons
+
+def test_bgpd_client_cmd_daemons():
+    client, _ = get_bgpd_client([])
+    get_daemons = client._BgpdClientMgr__get_cmd_daemons
+    assert(get_daemons(['show ip route vrf all']) == ['zebra'])
+    assert(get_daemons(['show ip ospf neighbor']) == ['ospfd'])
+    assert(get_daemons(['router bgp 100', 'neighbor 10.0.0.1 remote-as 200']) == ['bgpd'])
+    assert(get_daemons(['show ip route', 'show bfd peers']) == [])
+    # cached by the leading words
+    assert(len(client.cmd_daemon_cache) == 4)
+    assert(get_daemons(['show ip route 10.0.0.0/8']) == ['zebra'])
+    assert(len(client.cmd_daemon_cache) == 4)
+
+def test_bgpd_client_transaction(vty_dir):
+    client, fake_daemons = get_bgpd_client(['bgpd', 'zebra'], vty_dir)
+    cmd_prefix = "vtysh -c 'configure terminal' -c 'router bgp 100' "
+    assert(client.run_vtysh_command('BGP_NEIGHBOR', cmd_prefix + "-c 'neighbor 10.0.0.1 remote-as 200'", None))
+    assert(fake_daemons['bgpd'].commands == ['configure terminal', 'router bgp 100', 'neighbor 10.0.0.1 remote-as 200', 'end'])
+    del fake_daemons['bgpd'].commands[:]
+    client.begin_transaction()
+    assert(client.run_vtysh_command('BGP_NEIGHBOR', cmd_prefix + "-c 'neighbor 10.0.0.1 remote-as 200'", None))
+    assert(client.run_vtysh_command('BGP_NEIGHBOR', cmd_prefix + "-c 'neighbor 10.0.0.2 remote-as 200'", None))
+    assert(not client.run_vtysh_command('BGP_NEIGHBOR', cmd_prefix + "-c 'bad 10.0.0.3'", None))
+    # a failed command doesn't fail the next one
+    assert(client.run_vtysh_command('BGP_NEIGHBOR', cmd_prefix + "-c 'address-family ipv4 unicast'", None))
+    assert(client.run_vtysh_command('BGP_NEIGHBOR', cmd_prefix + "-c 'neighbor 10.0.0.4 remote-as 200'", None))
+    assert(client.run_vtysh_command('ROUTE_MAP', "vtysh -c 'configure terminal' -c 'route-map map1 permit 10'", ['zebra']))
+    client.end_transaction()
+    assert(fake_daemons['bgpd'].commands == [
+        'configure terminal', 'router bgp 100', 'neighbor 10.0.0.1 remote-as 200',
+        'neighbor 10.0.0.2 remote-as 200',
+        'bad 10.0.0.3',
+        # the node of a failed command is unknown
+        'end', 'configure terminal', 'router bgp 100', 'address-family ipv4 unicast',
+        # the previous command entered the address-family node
+        'end', 'configure terminal', 'router bgp 100', 'neighbor 10.0.0.4 remote-as 200',
+        'end'])
+    assert(fake_daemons['zebra'].commands == ['configure terminal', 'route-map map1 permit 10', 'end'])
+    assert(client.transaction is None)
+    for sock in client.client_socks.values():
+        sock.close()
+
+def test_bgpd_client_all_daemons(vty_dir):
+    client, fake_daemons = get_bgpd_client(['bgpd', 'zebra', 'staticd'], vty_dir)
+    # sent to every daemon before any reply is read
+    assert(client.run_vtysh_command('ROUTE_MAP', "vtysh -c 'configure terminal' -c 'route-map map1 permit 10'",
+                                    ['bgpd', 'zebra', 'staticd']))
+    assert(not client.run_vtysh_command('ROUTE_MAP', "vtysh -c 'configure terminal' -c 'bad map1'",
+                                        ['bgpd', 'zebra', 'staticd']))
+    for daemon in ['bgpd', 'zebra', 'staticd']:
+        assert(fake_daemons[daemon].commands == ['configure terminal', 'route-map map1 permit 10', 'end',
+                                                 'configure terminal', 'bad map1', 'end'])
+    for sock in client.client_socks.values():
+        sock.close()
@@ -44,6 +44,14 @@ class SonicYang(SonicYangExtMixin):
         # below dict will store preProcessed yang objects, which may be needed by
         # all yang modules, such as grouping.
         self.preProcessedYang = dict()
+        # yang modules whose libyang schema is not loaded yet, module name to file.
+        # Filled when the yang models are loaded from the cache.
+        self.pendingYangModules = dict()
+        # translators of yang lists and containers, see _getTranslator()
+        self.translators = dict()
+        # tables validated on the whole data tree by an incremental patchData(), see
+        # _getFullValidationTables()
+        self.fullValidationTables = None
         # element path for CONFIG DB. An example for this list could be:
         # ['PORT', 'Ethernet0', 'speed']
         self.elementPath = []
@@ -57,6 +65,20 @@ class SonicYang(SonicYangExtMixin):
     def __del__(self):
         pass
 
+    """
+    ctx: the libyang context. The schema of the yang modules whose loading was
+    deferred (see _loadSchemaModules()) is loaded before the context is handed
+    out, so users of ctx always see the schema of all modules.
+    """
+    @property
+    def ctx(self):
+        self._loadSchemaModules()
+        return self._ctx
+
+    @ctx.setter
+    def ctx(self, ctx):
+        self._ctx = ctx
+
     def sysLog(self, debug=syslog.LOG_INFO, msg=None, doPrint=False):
         # log debug only if enabled
         if self.DEBUG == False and debug == syslog.LOG_DEBUG:
@@ -80,7 +102,7 @@ class SonicYang(SonicYangExtMixin):
     """
     def _load_schema_module(self, yang_file):
         try:
-            return self.ctx.parse_module_path(yang_file, ly.LYS_IN_YANG)
+            return self._ctx.parse_module_path(yang_file, ly.LYS_IN_YANG)
         except Exception as e:
             self.sysLog(msg="Failed to load yang module file: " + yang_file, debug=syslog.LOG_ERR, doPrint=True)
             self.fail(e)
@@ -169,7 +191,7 @@ class SonicYang(SonicYangExtMixin):
     returns: returns (context, root) if no error,  or Exception if failed
     """
     def _load_data_model(self, yang_dir, yang_files, data_files, output=None):
-        if (self.ctx is None):
+        if (self._ctx is None):
             self.ctx = ly.Context(yang_dir)
 
         try:
@@ -4,10 +4,24 @@
 from __future__ import print_function
 import yang as ly
 import syslog
+import hashlib
+import os
+import pickle
+import re
+import sys
+import tempfile
+import xmltodict
+from copy import deepcopy
 from json import dump, dumps, loads
 from xmltodict import parse
 from glob import glob
 
+# Cache of the preprocessed YANG models (yJson, groupings, table to module map),
+# keyed on a digest of the yang files. Bump the version when the cached objects change.
+YANG_CACHE_VERSION = 2
+# Directory of the cache. The cache is disabled unless this is set.
+YANG_CACHE_DIR_ENV = 'SONIC_YANG_CACHE_DIR'
+
 Type_1_list_maps_model = [
     'DSCP_TO_TC_MAP_LIST',
     'DOT1P_TO_TC_MAP_LIST',
@@ -34,6 +48,34 @@ LEAF_LIST_WITH_STRING_VALUE_DICT = {
     ('PORT', 'adv_interface_types'): ',',
 }
 
+"""
+Converters of leaf values used by the translators compiled in
+SonicYangExtMixin._getTranslator()
+"""
+def _uintValue(val):
+    return int(str(val), 10)
+
+def _boolValue(val):
+    return 'true' if val else 'false'
+
+def _leafListXlator(convert, separator):
+    def xlate(value):
+        if separator is not None and isinstance(value, str):
+            # For field defined as leaf-list but has string value in CONFIG DB, need do special handling here. For exampe:
+            # port.adv_speeds in CONFIG DB has value "100,1000,10000", it shall be transferred to [100,1000,10000] as YANG value here to
+            # make it align with its YANG definition.
+            value = (x.strip() for x in value.split(separator))
+        return [convert(v) for v in value]
+    return xlate
+
+def _leafListRevXlator(separator):
+    def revXlate(value):
+        if separator is not None and isinstance(value, list):
+            # e.g. port.adv_speeds is [10,100,1000] in YANG, need to convert it into a string for CONFIG DB: "10,100,1000"
+            return separator.join(str(x) for x in value)
+        return [str(v) for v in value]
+    return revXlate
+
 """
 This is the Exception thrown out of all public function of this class.
 """
@@ -45,12 +87,24 @@ class SonicYangExtMixin:
 
     """
     load all YANG models, create JSON of yang models. (Public function)
+    When the preprocessed models are found in the cache, the libyang schema of
+    a module is only loaded when data of its tables is loaded, or when ctx is
+    used.
     """
     def loadYangModel(self):
 
         try:
+            # translators are compiled again for the new models
+            self.translators = dict()
+            self.fullValidationTables = None
             # get all files
-            self.yangFiles = glob(self.yang_dir +"/*.yang")
+            yangFiles = glob(self.yang_dir +"/*.yang")
+            cacheFile = self._getYangCacheFile(yangFiles)
+            if self._loadYangCache(cacheFile):
+                self.sysLog(syslog.LOG_DEBUG, "Yang Models loaded from cache {}".format(cacheFile))
+                return True
+
+            self.yangFiles = yangFiles
             # load yang modules
             for file in self.yangFiles:
                 m = self._load_schema_module(file)
@@ -69,6 +123,7 @@ class SonicYangExtMixin:
             self._loadJsonYangModel()
             # create a map from config DB table to yang container
             self._createDBTableToModuleMap()
+            self._storeYangCache(cacheFile, yangFiles)
         except Exception as e:
             self.sysLog(msg="Yang Models Load failed:{}".format(str(e)), \
                 debug=syslog.LOG_ERR, doPrint=True)
@@ -76,6 +131,122 @@ class SonicYangExtMixin:
 
         return True
 
+    """
+    Return the path of the cache file of the given yang files, None if the
+    cache is disabled (YANG_CACHE_DIR_ENV is not set) or its directory is not
+    writable. The file name is a
+    digest of the yang files, of the preprocessing code and of the cache version.
+    """
+    def _getYangCacheFile(self, yangFiles):
+
+        cacheDir = os.environ.get(YANG_CACHE_DIR_ENV)
+        if not cacheDir:
+            return None
+        try:
+            os.makedirs(cacheDir, 0o700, exist_ok=True)
+        except OSError:
+            return None
+        if not os.access(cacheDir, os.W_OK | os.X_OK):
+            return None
+
+        digest = hashlib.sha256("{}|{}".format(YANG_CACHE_VERSION, sys.version).encode('utf-8'))
+        # the preprocessing code is part of the key, entries do not survive an upgrade
+        codeFiles = [os.path.abspath(__file__), xmltodict.__file__]
+        for file in sorted(codeFiles + yangFiles):
+            with open(file, 'rb') as f:
+                digest.update(os.path.basename(file).encode('utf-8'))
+                digest.update(hashlib.sha256(f.read()).digest())
+
+        return os.path.join(cacheDir, digest.hexdigest() + '.pickle')
+
+    """
+    Load the preprocessed yang models from the cache file. The libyang schema of
+    the modules is loaded later, see _loadSchemaModules().
+    Returns: True if the models are loaded, False on a cache miss.
+    """
+    def _loadYangCache(self, cacheFile):
+
+        if cacheFile is None or not os.path.isfile(cacheFile):
+            return False
+        try:
+            # only trust cache files written by ourselves
+            if os.stat(cacheFile).st_uid != os.geteuid():
+                return False
+            with open(cacheFile, 'rb') as f:
+                cache = pickle.load(f)
+            if cache.get('version') != YANG_CACHE_VERSION:
+                return False
+        except Exception as e:
+            self.sysLog(msg="Ignore Yang cache {}:{}".format(cacheFile, str(e)), \
+                debug=syslog.LOG_WARNING)
+            return False
+
+        self.yangFiles = cache['yangFiles']
+        self.yJson = cache['yJson']
+        self.preProcessedYang = cache['preProcessedYang']
+        self.confDbYangMap = cache['confDbYangMap']
+        self.pendingYangModules = dict(cache['modulePaths'])
+
+        return True
+
+    """
+    Store the preprocessed yang models in the cache file.
+    """
+    def _storeYangCache(self, cacheFile, yangFiles):
+
+        if cacheFile is None:
+            return
+        modulePaths = dict()
+        for file in yangFiles:
+            modulePaths[file.split('/')[-1].split('.')[0]] = file
+        cache = {
+            'version': YANG_CACHE_VERSION,
+            'yangFiles': self.yangFiles,
+            'yJson': self.yJson,
+            'preProcessedYang': self.preProcessedYang,
+            'confDbYangMap': self.confDbYangMap,
+            'modulePaths': modulePaths
+        }
+
+        try:
+            # several processes may load the models at the same time, never
+            # let a reader see a partially written file
+            fd, tmpFile = tempfile.mkstemp(dir=os.path.dirname(cacheFile), prefix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(cache, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmpFile, cacheFile)
+        except (IOError, OSError, pickle.PicklingError) as e:
+            self.sysLog(msg="Could not store Yang cache {}:{}".format(cacheFile, str(e)), \
+                debug=syslog.LOG_WARNING)
+            try:
+                os.remove(tmpFile)
+            except OSError:
+                pass
+
+        return
+
+    """
+    Load the libyang schema of the yang modules whose loading was deferred
+    because the models came from the cache. Data is always parsed and validated
+    against the schema of all modules, so this is done before the first use of
+    the libyang context, see the ctx property.
+    """
+    def _loadSchemaModules(self):
+
+        while self.pendingYangModules:
+            module = next(iter(self.pendingYangModules))
+            file = self.pendingYangModules.pop(module)
+            m = self._load_schema_module(file)
+            if m is not None:
+                self.sysLog(msg="module: {} is loaded successfully".format(m.name()))
+            else:
+                raise(Exception("Could not load module {}".format(file)))
+
+        return
+
     """
     load JSON schema format from yang models
     """
@@ -246,14 +417,15 @@ class SonicYangExtMixin:
 
     Input:
     tableKey: Config DB Primary Key, Example tableKey = "Vlan111|2a04:5555:45:6709::1/64"
-    keys: key string from YANG list, i.e. 'vlan_name ip-prefix'.
+    keys: key string from YANG list, i.e. 'vlan_name ip-prefix', or the list of
+          its keys.
 
     Return:
     KeyDict = {"vlan_name": "Vlan111", "ip-prefix": "2a04:5555:45:6709::1/64"}
     """
     def _extractKey(self, tableKey, keys):
 
-        keyList = keys.split()
+        keyList = keys.split() if isinstance(keys, str) else keys
         # get the value groups
         value = tableKey.split("|")
         # match lens
@@ -392,46 +564,66 @@ class SonicYangExtMixin:
 
         return leafDict
 
+    def _getTranslator(self, model, table):
+        '''
+            Get the translator of a yang list or container of a config DB table.
+            Translators are compiled on first use after each model load, so that
+            the leafDict and the type of each leaf are not looked up for every
+            config DB entry.
+
+            Parameters:
+                model (dict): json format of yang list or container.
+                table (str): config DB table, this table is being translated.
+
+            Returns:
+                 translator (dict): {
+                    'leafDict': leafDict of the model, see _createLeafDict(),
+                    'xlate': {leaf name: function converting config DB value to yang value},
+                    'revXlate': {leaf name: function converting yang value to config DB value},
+                    'keyList': list of keys of the yang list, None for a container
+                 }
+        '''
+        translator = self.translators.get((table, id(model)))
+        if translator is not None:
+            return translator
+
+        leafDict = self._createLeafDict(model, table)
+        xlate = dict()
+        revXlate = dict()
+        for name, leaf in leafDict.items():
+            type = leaf.get('type', dict()).get('@name', '')
+            # TODO: find type of leafref from schema node
+            # TODO: find type in sonic-head, as of now, all are enumeration
+            convert = _uintValue if 'uint' in type else str
+            if leaf['__isleafList']:
+                separator = LEAF_LIST_WITH_STRING_VALUE_DICT.get((table, name))
+                xlate[name] = _leafListXlator(convert, separator)
+                revXlate[name] = _leafListRevXlator(separator)
+            else:
+                xlate[name] = convert
+                revXlate[name] = _boolValue if type == 'boolean' else str
+
+        listKeys = model.get('key')
+        translator = {
+            'leafDict': leafDict,
+            'xlate': xlate,
+            'revXlate': revXlate,
+            'keyList': listKeys['@value'].split() if listKeys else None
+        }
+        # model stays referenced by confDbYangMap, its id is not reused
+        self.translators[(table, id(model))] = translator
+
+        return translator
+
     """
     Convert a string from Config DB value to Yang Value based on type of the
     key in Yang model.
     @model : A List of Leafs in Yang model list
     """
-    def _findYangTypedValue(self, key, value, leafDict):
-
-        # convert config DB string to yang Type
-        def _yangConvert(val):
-            # Convert everything to string
-            val = str(val)
-            # find type of this key from yang leaf
-            type = leafDict[key]['type']['@name']
-
-            if 'uint' in type:
-                vValue = int(val, 10)
-            # TODO: find type of leafref from schema node
-            elif 'leafref' in type:
-                vValue = val
-            #TODO: find type in sonic-head, as of now, all are enumeration
-            elif 'stypes:' in type:
-                vValue = val
-            else:
-                vValue = val
-            return vValue
-
-        # if it is a leaf-list do it for each element
-        if leafDict[key]['__isleafList']:
-            vValue = list()
-            if isinstance(value, str) and (self.elementPath[0], self.elementPath[-1]) in LEAF_LIST_WITH_STRING_VALUE_DICT:
-                # For field defined as leaf-list but has string value in CONFIG DB, need do special handling here. For exampe:
-                # port.adv_speeds in CONFIG DB has value "100,1000,10000", it shall be transferred to [100,1000,10000] as YANG value here to
-                # make it align with its YANG definition.
-                value = (x.strip() for x in value.split(LEAF_LIST_WITH_STRING_VALUE_DICT[(self.elementPath[0], self.elementPath[-1])]))
-            for v in value:
-                vValue.append(_yangConvert(v))
-        else:
-            vValue = _yangConvert(value)
+    def _findYangTypedValue(self, key, value, translator):
 
-        return vValue
+        # KeyError if key is not a leaf of the model
+        return translator['xlate'][key](value)
 
     """
     Xlate a Type 1 map list
@@ -494,13 +686,13 @@ class SonicYangExtMixin:
         inner_clist = model.get('list')
         if inner_clist:
             inner_listKey = inner_clist['key']['@value']
-            inner_leafDict = self._createLeafDict(inner_clist, table)
+            inner_leafDict = self._getTranslator(inner_clist, table)['leafDict']
             for lkey in inner_leafDict:
                 if inner_listKey != lkey:
                     inner_listVal = lkey
 
         # get keys from YANG model list itself
-        listKeys = model['key']['@value']
+        listKeys = self._getTranslator(model, table)['keyList']
         self.sysLog(msg="xlateList keyList:{}".format(listKeys))
         primaryKeys = list(config.keys())
         for pkey in primaryKeys:
@@ -557,26 +749,30 @@ class SonicYangExtMixin:
         #This is done to improve performance of mapping from values of TABLEs in
         #config DB to leaf in YANG LIST.
 
-        leafDict = self._createLeafDict(model, table)
+        translator = self._getTranslator(model, table)
         # get keys from YANG model list itself
-        listKeys = model['key']['@value']
+        listKeys = translator['keyList']
         self.sysLog(msg="xlateList keyList:{}".format(listKeys))
         primaryKeys = list(config.keys())
         for pkey in primaryKeys:
             try:
                 self.elementPath.append(pkey)
                 vKey = None
-                self.sysLog(syslog.LOG_DEBUG, "xlateList Extract pkey:{}".\
-                    format(pkey))
+                # debug logs are formatted only when enabled, this loop runs
+                # for every entry of the table
+                if self.DEBUG:
+                    self.sysLog(syslog.LOG_DEBUG, "xlateList Extract pkey:{}".\
+                        format(pkey))
                 # Find and extracts key from each dict in config
                 keyDict = self._extractKey(pkey, listKeys)
                 # fill rest of the values in keyDict
                 for vKey in config[pkey]:
                     self.elementPath.append(vKey)
-                    self.sysLog(syslog.LOG_DEBUG, "xlateList vkey {}".format(vKey))
+                    if self.DEBUG:
+                        self.sysLog(syslog.LOG_DEBUG, "xlateList vkey {}".format(vKey))
                     try:
                         keyDict[vKey] = self._findYangTypedValue(vKey, \
-                                            config[pkey][vKey], leafDict)
+                                            config[pkey][vKey], translator)
                     finally:
                         self.elementPath.pop()
                 yang.append(keyDict)
@@ -675,14 +871,15 @@ class SonicYangExtMixin:
                 self._xlateContainerInContainer(modelContainer, yang, configC, table)
 
         ## Handle other leaves in container,
-        leafDict = self._createLeafDict(model, table)
+        translator = self._getTranslator(model, table)
+        leafDict = translator['leafDict']
         vKeys = list(configC.keys())
         for vKey in vKeys:
             #vkey must be a leaf\leaf-list\choice in container
             if leafDict.get(vKey):
                 self.elementPath.append(vKey)
                 self.sysLog(syslog.LOG_DEBUG, "xlateContainer vkey {}".format(vKey))
-                yang[vKey] = self._findYangTypedValue(vKey, configC[vKey], leafDict)
+                yang[vKey] = self._findYangTypedValue(vKey, configC[vKey], translator)
                 self.elementPath.pop()
                 # delete entry from copy of config
                 del configC[vKey]
@@ -742,7 +939,7 @@ class SonicYangExtMixin:
     def _createKey(self, entry, keys):
 
         keyDict = dict()
-        keyList = keys.split()
+        keyList = keys.split() if isinstance(keys, str) else keys
         keyV = ""
 
         for key in keyList:
@@ -764,29 +961,9 @@ class SonicYangExtMixin:
     key in Yang model.
     @model : A List of Leafs in Yang model list
     """
-    def _revFindYangTypedValue(self, key, value, leafDict):
-
-        # convert yang Type to config DB string
-        def _revYangConvert(val):
-            # config DB has only strings, thank god for that :), wait not yet!!!
-            return str(val)
+    def _revFindYangTypedValue(self, key, value, translator):
 
-        # if it is a leaf-list do it for each element
-        if leafDict[key]['__isleafList']:
-            if isinstance(value, list) and (self.elementPath[0], self.elementPath[-1]) in LEAF_LIST_WITH_STRING_VALUE_DICT:
-                # For field defined as leaf-list but has string value in CONFIG DB, we need do special handling here:
-                # e.g. port.adv_speeds is [10,100,1000] in YANG, need to convert it into a string for CONFIG DB: "10,100,1000"
-                vValue = LEAF_LIST_WITH_STRING_VALUE_DICT[(self.elementPath[0], self.elementPath[-1])].join((_revYangConvert(x) for x in value))
-            else:
-                vValue = list()
-                for v in value:
-                    vValue.append(_revYangConvert(v))
-        elif leafDict[key]['type']['@name'] == 'boolean':
-            vValue = 'true' if value else 'false'
-        else:
-            vValue = _revYangConvert(value)
-
-        return vValue
+        return translator['revXlate'][key](value)
 
     """
     Rev xlate from <TABLE>_LIST to table in config DB
@@ -836,7 +1013,7 @@ class SonicYangExtMixin:
 
     def _revXlateType1MapList(self, model, yang, config, table):
         # get keys from YANG model list itself
-        listKeys = model['key']['@value']
+        listKeys = self._getTranslator(model, table)['keyList']
         # create a dict to map each key under primary key with a dict yang model.
         # This is done to improve performance of mapping from values of TABLEs in
         # config DB to leaf in YANG LIST.
@@ -845,7 +1022,7 @@ class SonicYangExtMixin:
         inner_clist = model.get('list')
         if inner_clist:
             inner_listKey = inner_clist['key']['@value']
-            inner_leafDict = self._createLeafDict(inner_clist, table)
+            inner_leafDict = self._getTranslator(inner_clist, table)['leafDict']
             for lkey in inner_leafDict:
                 if inner_listKey != lkey:
                     inner_listVal = lkey
@@ -876,19 +1053,20 @@ class SonicYangExtMixin:
            self._revXlateType1MapList(model, yang, config, table)
            return
 
+        # translator maps each key under primary key with a converter of the
+        # leaf in yang model. It is compiled once, to improve performance of
+        # mapping from values of TABLEs in config DB to leaf in YANG LIST.
+        translator = self._getTranslator(model, table)
         # get keys from YANG model list itself
-        listKeys = model['key']['@value']
-        # create a dict to map each key under primary key with a dict yang model.
-        # This is done to improve performance of mapping from values of TABLEs in
-        # config DB to leaf in YANG LIST.
-        leafDict = self._createLeafDict(model, table)
+        listKeys = translator['keyList']
 
         # list with name <NAME>_LIST should be removed,
         if "_LIST" in model['@name']:
             for entry in yang:
                 # create key of config DB table
                 pkey, pkeydict = self._createKey(entry, listKeys)
-                self.sysLog(syslog.LOG_DEBUG, "revXlateList pkey:{}".format(pkey))
+                if self.DEBUG:
+                    self.sysLog(syslog.LOG_DEBUG, "revXlateList pkey:{}".format(pkey))
                 self.elementPath.append(pkey)
                 config[pkey]= dict()
                 # fill rest of the entries
@@ -896,7 +1074,7 @@ class SonicYangExtMixin:
                     if key not in pkeydict:
                         self.elementPath.append(key)
                         config[pkey][key] = self._revFindYangTypedValue(key, \
-                            entry[key], leafDict)
+                            entry[key], translator)
                         self.elementPath.pop()
                 self.elementPath.pop()
 
@@ -952,13 +1130,14 @@ class SonicYangExtMixin:
                 self._revXlateContainerInContainer(modelContainer, yang, config, table)
 
         ## Handle other leaves in container,
-        leafDict = self._createLeafDict(model, table)
+        translator = self._getTranslator(model, table)
+        leafDict = translator['leafDict']
         for vKey in yang:
             #vkey must be a leaf\leaf-list\choice in container
             if leafDict.get(vKey):
                 self.sysLog(syslog.LOG_DEBUG, "revXlateContainer vkey {}".format(vKey))
                 self.elementPath.append(vKey)
-                config[vKey] = self._revFindYangTypedValue(vKey, yang[vKey], leafDict)
+                config[vKey] = self._revFindYangTypedValue(vKey, yang[vKey], translator)
                 self.elementPath.pop()
 
         return
@@ -1185,6 +1364,335 @@ class SonicYangExtMixin:
         return True
 
 
+    """
+    Find a container in YANG Container
+    c = container
+    cName = container name
+    return: container if found else None
+    """
+    def _findYangContainer(self, container, cName):
+
+        ccontainer = container.get('container')
+        if isinstance(ccontainer, dict):
+            ccontainer = [ccontainer]
+        for c in ccontainer or []:
+            if c['@name'] == cName:
+                return c
+
+        return None
+
+    """
+    Collect the conditions of the must and when statements of a schema node
+    of the compiled libyang schema and of the nodes below it, return True if
+    the nodes also have constraints between list entries. Groupings, refines
+    and augments are already resolved in the compiled schema.
+    """
+    def _findSchemaConstraints(self, schemaNode, conditions):
+
+        LYS_CONTAINER = 1
+        LYS_LEAF = 4
+        LYS_LEAFLIST = 8
+        LYS_LIST = 16
+        crossEntry = False
+        for snode in schemaNode.tree_dfs():
+            nodetype = snode.nodetype()
+            if nodetype not in (LYS_CONTAINER, LYS_LEAF, LYS_LEAFLIST, LYS_LIST):
+                # choice, case and uses nodes have when statements only
+                when = snode.subtype().when()
+                if when is not None:
+                    conditions.append(when.cond())
+                continue
+            node = snode.subtype()
+            for must in node.must():
+                conditions.append(must.expr())
+            when = node.when()
+            if when is not None:
+                conditions.append(when.cond())
+            if nodetype == LYS_LIST and (node.unique_size() or node.min() or node.max()):
+                crossEntry = True
+            elif nodetype == LYS_LEAFLIST and (node.min() or node.max()):
+                crossEntry = True
+
+        return crossEntry
+
+    """
+    Return the tables whose changes are validated on the whole data tree by
+    an incremental patchData(): the tables with must or when statements or with
+    constraints between their entries, and the tables named in a must or when
+    condition. Incremental validation can not see the data these constraints
+    depend on. The constraints are read from the compiled libyang schema.
+    """
+    def _getFullValidationTables(self):
+
+        if self.fullValidationTables is not None:
+            return self.fullValidationTables
+
+        tables = set()
+        allConditions = list()
+        for table, cmap in self.confDbYangMap.items():
+            if 'topLevelContainer' not in cmap:
+                continue
+            module = cmap['module']
+            schemaNode = self._find_schema_node("/{}:{}/{}:{}".format(module, \
+                cmap['topLevelContainer'], module, cmap['container']['@name']))
+            if schemaNode is None:
+                # not a data node of the schema, check it on the whole tree
+                tables.add(table)
+                continue
+            conditions = list()
+            if self._findSchemaConstraints(schemaNode, conditions) or len(conditions):
+                tables.add(table)
+            allConditions.extend(conditions)
+
+        conditions = '\n'.join(allConditions)
+        for table, cmap in self.confDbYangMap.items():
+            if 'topLevelContainer' in cmap and \
+                re.search(r'\b{}\b'.format(re.escape(table)), conditions):
+                tables.add(table)
+
+        self.fullValidationTables = tables
+        return tables
+
+    """
+    Find xpath of the entry of a config DB table key in the data tree.
+    return: xpath if the entry exists else None
+    """
+    def _findXpathEntry(self, table, key):
+
+        module, topc, container = self._getModuleTLCcontainer(table)
+        xpath = "/" + module + ":" + topc + "/" + container['@name']
+        # key of a container table, i.e. DEVICE_METADATA|localhost
+        if self._findYangContainer(container, key) is not None:
+            xpath = xpath + "/" + key
+            return xpath if self._find_data_node(xpath) is not None else None
+
+        clists = container.get('list')
+        if isinstance(clists, dict):
+            clists = [clists]
+        for clist in clists or []:
+            listKeys = clist['key']['@value'].split()
+            try:
+                keyDict = self._extractKey(key, listKeys)
+            except Exception:
+                # key does not match this list
+                continue
+            entryXpath = self._findXpathList(xpath, clist, \
+                [keyDict[k] for k in listKeys])
+            if self._find_data_node(entryXpath) is not None:
+                return entryXpath
+
+        return None
+
+    """
+    Translate an entry of a config DB table to Yang json.
+    return: list of (xpath, yang model, yang json) of the yang list and
+            container entries the config DB entry maps to.
+    """
+    def _xlateEntryToYang(self, table, key, entry):
+
+        yangJ = dict()
+        self._xlateConfigDBtoYang({table: {key: deepcopy(entry)}}, yangJ)
+        module, topc, container = self._getModuleTLCcontainer(table)
+        xpath = "/" + module + ":" + topc + "/" + container['@name']
+        tableJ = yangJ[module+":"+topc][topc+":"+container['@name']]
+
+        entries = list()
+        for name, value in tableJ.items():
+            if isinstance(value, list):
+                clist = self._findYangList(container, name)
+                listKeys = clist['key']['@value'].split()
+                for entryJ in value:
+                    entries.append((self._findXpathList(xpath, clist, \
+                        [str(entryJ[k]) for k in listKeys]), clist, entryJ))
+            else:
+                entries.append((xpath + "/" + name, \
+                    self._findYangContainer(container, name), value))
+
+        return entries
+
+    """
+    Add an entry of a yang list or container to the data tree, from its Yang
+    json.
+    """
+    def _addYangEntry(self, xpath, model, entryJ):
+
+        # keys of list entries are created from the predicates of the xpath
+        listKeys = model['key']['@value'].split() if model.get('key') else []
+        self._add_data_node(xpath, "")
+        for name, value in entryJ.items():
+            if name in listKeys:
+                continue
+            if isinstance(value, dict):
+                self._addYangEntry(xpath + "/" + name, \
+                    self._findYangContainer(model, name), value)
+            elif isinstance(value, list) and len(value) and isinstance(value[0], dict):
+                # inner list, i.e. Type 1 list maps
+                ilist = self._findYangList(model, name)
+                iKeys = ilist['key']['@value'].split()
+                for iEntryJ in value:
+                    self._addYangEntry(self._findXpathList(xpath, ilist, \
+                        [str(iEntryJ[k]) for k in iKeys]), ilist, iEntryJ)
+            elif isinstance(value, list):
+                for item in value:
+                    self._add_data_node(xpath + "/" + name, item)
+            else:
+                self._add_data_node(xpath + "/" + name, value)
+
+        return
+
+    """
+    Find the entries which refer to leafs of an entry of the data tree.
+    return: list of xpaths of the referring entries
+    """
+    def _findEntryDependencies(self, xpath):
+
+        LYS_LEAF = 4
+        entries = list()
+        node = self._find_data_node(xpath)
+        for dnode in node.tree_dfs():
+            if dnode.schema().nodetype() != LYS_LEAF:
+                continue
+            for dep in self.find_data_dependencies(dnode.path()):
+                entries.append(self._get_parent_data_xpath(dep))
+
+        return entries
+
+    """
+    Find the entries of the data tree a leafref value points to.
+    return: list of xpaths of the entries
+    """
+    def _findLeafrefTargets(self, snode, value):
+
+        stype = snode.subtype().type()
+        if stype.base() != ly.LY_TYPE_LEAFREF:
+            return []
+        target = stype.info().lref().target()
+        quote = '"' if "'" in value else "'"
+        node_set = self.root.find_path("{}[.={}{}{}]".format(target.path(), \
+            quote, value, quote))
+        if node_set is None:
+            return []
+
+        return [dnode.parent().path() for dnode in node_set.data()]
+
+    """
+    Validate entries of the data tree in a tree of their own, together with
+    the entries their leafrefs point to. Data outside of this tree is not seen
+    by the validation, so a failure is checked again on the whole data tree,
+    which fails with the same error as loading the data does.
+    """
+    def _validateEntries(self, xpaths):
+
+        LYS_LEAF = 4
+        LYS_LEAFLIST = 8
+        tree = None
+        done = set()
+        while len(xpaths):
+            xpath = xpaths.pop()
+            if xpath in done:
+                continue
+            done.add(xpath)
+            node = self._find_data_node(xpath)
+            if node is None:
+                # deleted by the patch
+                continue
+            for dnode in node.tree_dfs():
+                snode = dnode.schema()
+                if snode.nodetype() not in (LYS_LEAF, LYS_LEAFLIST):
+                    continue
+                value = dnode.subtype().value_str()
+                if tree is None:
+                    tree = ly.Data_Node(self.ctx, dnode.path(), value, 0, \
+                        ly.LYD_PATH_OPT_UPDATE)
+                else:
+                    tree.new_path(self.ctx, dnode.path(), value, 0, \
+                        ly.LYD_PATH_OPT_UPDATE)
+                xpaths.extend(self._findLeafrefTargets(snode, value))
+
+        if tree is None:
+            return
+        try:
+            self._validate_data(tree, self.ctx)
+        except Exception as e:
+            self.sysLog(msg="Validation of patched entries failed, validate "
+                "data tree:{}".format(str(e)))
+            self.validate_data_tree()
+
+        return
+
+    """
+    patchData: apply a patch of config DB tables to the data tree created by
+    loadData() and validate it. The whole data tree is validated, unless
+    incremental is set: then only the patched entries, the entries referring
+    to them and the entries their leafrefs point to are validated, and changes
+    of tables in must, when or cross entry constraints are still validated on
+    the whole data tree. (Public)
+    input:    configdbPatch - config DB json of the changed tables. An entry set
+              to None is deleted, a table set to None is deleted, any other
+              entry replaces the entry of the same key.
+              incremental - validate only the entries affected by the patch.
+    returns:  True - success. On failure the data tree is dropped, as with
+              loadData(), and SonicYangException is raised.
+    """
+    def patchData(self, configdbPatch, incremental=False):
+
+       try:
+          if self.root is None:
+              raise Exception("Data is not loaded")
+          patch = dict()
+          for table, entries in configdbPatch.items():
+              if table in self.confDbYangMap:
+                  patch[table] = entries
+              elif entries is None:
+                  self.tablesWithOutYang.pop(table, None)
+              else:
+                  tableWithOutYang = self.tablesWithOutYang.setdefault(table, dict())
+                  for key, entry in entries.items():
+                      if entry is None:
+                          tableWithOutYang.pop(key, None)
+                      else:
+                          tableWithOutYang[key] = entry
+          fullValidation = not incremental or \
+              bool(self._getFullValidationTables() & set(patch))
+
+          xpaths = list()
+          for table, entries in patch.items():
+              if entries is None:
+                  module, topc, container = self._getModuleTLCcontainer(table)
+                  xpath = "/" + module + ":" + topc + "/" + container['@name']
+                  if self._find_data_node(xpath) is None:
+                      continue
+                  xpaths.extend(self._findEntryDependencies(xpath))
+                  if not self._deleteNode(xpath=xpath):
+                      raise Exception('_deleteNode failed for {}'.format(xpath))
+                  continue
+              for key, entry in entries.items():
+                  self.sysLog(msg="patchData {}|{}".format(table, key))
+                  xpath = self._findXpathEntry(table, key)
+                  if xpath is not None:
+                      xpaths.extend(self._findEntryDependencies(xpath))
+                      if not self._deleteNode(xpath=xpath):
+                          raise Exception('_deleteNode failed for {}'.format(xpath))
+                  if entry is None:
+                      continue
+                  for xpath, model, entryJ in self._xlateEntryToYang(table, key, entry):
+                      self._addYangEntry(xpath, model, entryJ)
+                      xpaths.append(xpath)
+
+          if fullValidation:
+              self.validate_data_tree()
+          else:
+              self._validateEntries(xpaths)
+
+       except Exception as e:
+           self.root = None
+           self.sysLog(msg="Data Loading Failed:{}".format(str(e)), \
+            debug=syslog.LOG_ERR, doPrint=True)
+           raise SonicYangException("Data Loading Failed\n{}".format(str(e)))
+
+       return True
+
+
     def XlateYangToConfigDB(self, yang_data):
         config_db_json = dict()
         self.xlateJson = yang_data
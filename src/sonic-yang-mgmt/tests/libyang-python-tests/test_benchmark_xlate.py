@@ -0,0 +1,74 @@
+"""Translation of a large synthetic config DB to YANG json and back, with the
+SONiC YANG models.
+
+Run with: pytest tests/libyang-python-tests/test_benchmark_xlate.py -m benchmark --benchmark-only
+"""
+import copy
+import pytest
+import sonic_yang as sy
+
+pytest.importorskip('pytest_benchmark')
+
+pytestmark = pytest.mark.benchmark
+
+YANG_DIR = "/usr/local/yang-models/"
+NUM_PORTS = 4096
+NUM_ACL_RULES = 8192
+
+def synthetic_config_db():
+    config = {'PORT': {}, 'INTERFACE': {}, 'ACL_TABLE': {}, 'ACL_RULE': {}}
+    for i in range(NUM_PORTS):
+        port = 'Ethernet{}'.format(i)
+        config['PORT'][port] = {
+            'alias': 'etp{}'.format(i),
+            'lanes': '{}'.format(i),
+            'speed': '100000',
+            'mtu': '9100',
+            'admin_status': 'up',
+            'adv_speeds': '25000,50000,100000'
+        }
+        config['INTERFACE'][port] = {}
+        config['INTERFACE']['{}|10.{}.{}.0/31'.format(port, i // 256, i % 256)] = {}
+    config['ACL_TABLE']['DATAACL'] = {
+        'policy_desc': 'DATAACL',
+        'type': 'L3',
+        'stage': 'ingress',
+        'ports': ['Ethernet{}'.format(i) for i in range(NUM_PORTS)]
+    }
+    for i in range(NUM_ACL_RULES):
+        config['ACL_RULE']['DATAACL|RULE_{}'.format(i)] = {
+            'PRIORITY': str(9999 - i % 9999),
+            'PACKET_ACTION': 'DROP',
+            'IP_TYPE': 'IPV4',
+            'SRC_IP': '10.{}.{}.1/32'.format(i // 256 % 256, i % 256),
+            'IP_PROTOCOL': '6',
+            'L4_DST_PORT': str(1024 + i % 60000)
+        }
+    return config
+
+@pytest.fixture(scope='module')
+def syc():
+    syc = sy.SonicYang(YANG_DIR, print_log_enabled=False)
+    syc.loadYangModel()
+    return syc
+
+def test_xlate_config_db(benchmark, syc):
+    config = synthetic_config_db()
+    def xlate(jIn):
+        yangJ = dict()
+        syc._xlateConfigDBtoYang(jIn, yangJ)
+        return yangJ
+    yangJ = benchmark.pedantic(xlate, setup=lambda: ((copy.deepcopy(config),), {}), rounds=5)
+    assert len(yangJ) == 3
+
+def test_rev_xlate_config_db(benchmark, syc):
+    config = synthetic_config_db()
+    yangJ = dict()
+    syc._xlateConfigDBtoYang(copy.deepcopy(config), yangJ)
+    def revXlate():
+        syc.xlateJson = yangJ
+        syc.revXlateJson = dict()
+        syc._revXlateYangtoConfigDB(yangJ, syc.revXlateJson)
+        return syc.revXlateJson
+    cDbJson = benchmark.pedantic(revXlate, rounds=5)
+    assert cDbJson == config
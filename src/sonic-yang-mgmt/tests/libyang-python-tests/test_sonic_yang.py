@@ -2,9 +2,12 @@ import sys
 import os
 import pytest
 import sonic_yang as sy
+import sonic_yang_ext as sye
 import json
+import copy
 import glob
 import logging
+from unittest import mock
 from ijson import items as ijson_itmes
 
 test_path = os.path.dirname(os.path.abspath(__file__))
@@ -266,13 +269,22 @@ class Test_SonicYang(object):
     on Real SONiC Yang models. Mainly tests  for translation and reverse
     translation.
     """
-    @pytest.fixture(autouse=True, scope='class')
-    def sonic_yang_data(self):
+    @pytest.fixture(scope='class', params=['yang_files', 'yang_cache'])
+    def sonic_yang_data(self, request, tmp_path_factory):
         sonic_yang_dir = "/usr/local/yang-models/"
         sonic_yang_test_file = "../sonic-yang-models/tests/files/sample_config_db.json"
 
-        syc = sy.SonicYang(sonic_yang_dir)
-        syc.loadYangModel()
+        # the tests run with the models loaded from the yang files, and with
+        # the models loaded from the cache, whose schema is loaded on demand
+        cache_dir = ''
+        if request.param == 'yang_cache':
+            cache_dir = str(tmp_path_factory.mktemp('yang_cache'))
+        with mock.patch.dict(os.environ, {sye.YANG_CACHE_DIR_ENV: cache_dir}):
+            if cache_dir:
+                sy.SonicYang(sonic_yang_dir).loadYangModel()
+            syc = sy.SonicYang(sonic_yang_dir)
+            syc.loadYangModel()
+        assert bool(syc.pendingYangModules) == bool(cache_dir)
 
         sonic_yang_data = dict()
         sonic_yang_data['yang_dir'] = sonic_yang_dir
@@ -381,5 +393,230 @@ class Test_SonicYang(object):
 
         return
 
+    def test_yang_model_cache(self, sonic_yang_data, tmp_path, monkeypatch):
+        # models loaded from the cache translate and validate config as the
+        # models loaded from the yang files, the libyang schema of all modules
+        # is loaded before data is parsed
+        yang_dir = sonic_yang_data['yang_dir']
+        test_file = sonic_yang_data['test_file']
+
+        # the cache is disabled unless its directory is set
+        monkeypatch.delenv(sye.YANG_CACHE_DIR_ENV, raising=False)
+        syc = sy.SonicYang(yang_dir)
+        assert syc._getYangCacheFile(['a.yang']) is None
+
+        monkeypatch.setenv(sye.YANG_CACHE_DIR_ENV, str(tmp_path))
+        syc = sy.SonicYang(yang_dir)
+        syc.loadYangModel()
+        assert len(syc.pendingYangModules) == 0
+        assert len(os.listdir(str(tmp_path))) == 1
+
+        sycCached = sy.SonicYang(yang_dir)
+        sycCached.loadYangModel()
+        assert len(sycCached.pendingYangModules) == len(syc.yangFiles)
+        assert sycCached.yangFiles == syc.yangFiles
+        assert sorted(sycCached.confDbYangMap) == sorted(syc.confDbYangMap)
+
+        jIn = json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON'))
+        syc.loadData(copy.deepcopy(jIn))
+        sycCached.loadData({'PORT': copy.deepcopy(jIn['PORT']), \
+            'MACSEC_PROFILE': copy.deepcopy(jIn['MACSEC_PROFILE'])})
+        assert len(sycCached.pendingYangModules) == 0
+        assert sycCached.ctx.get_module('sonic-acl') is not None
+        sycCached.validate_data_tree()
+
+        sycCached.loadData(copy.deepcopy(jIn))
+        assert sycCached.xlateJson == syc.xlateJson
+        sycCached.validate_data_tree()
+
+        return
+
+    def test_patch_data(self, sonic_yang_data):
+        # a patch applied to the loaded data tree gives the same data as
+        # loading the patched config, an invalid patch fails as loading the
+        # patched config does
+        test_file = sonic_yang_data['test_file']
+        syc = sonic_yang_data['syc']
+
+        jIn = json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON'))
+        patch = {
+            'VLAN_MEMBER': {
+                'Vlan111|Ethernet0': {'tagging_mode': 'tagged'},
+                'Vlan111|Ethernet1': None
+            },
+            'PORT': {
+                'Ethernet0': dict(jIn['PORT']['Ethernet0'], mtu='1500')
+            },
+            'UNKNOWN_TABLE': {'key': {'field': 'value'}}
+        }
+        jPatched = copy.deepcopy(jIn)
+        jPatched['VLAN_MEMBER']['Vlan111|Ethernet0'] = {'tagging_mode': 'tagged'}
+        del jPatched['VLAN_MEMBER']['Vlan111|Ethernet1']
+        jPatched['PORT']['Ethernet0']['mtu'] = '1500'
+
+        syc.loadData(copy.deepcopy(jPatched))
+        expected = syc.getData()
+
+        syc.loadData(copy.deepcopy(jIn))
+        assert syc.patchData(copy.deepcopy(patch)) == True
+        assert syc.getData() == expected
+        assert syc.tablesWithOutYang == {'UNKNOWN_TABLE': {'key': {'field': 'value'}}}
+
+        # Ethernet0 is referred by VLAN_MEMBER
+        syc.loadData(copy.deepcopy(jIn))
+        with pytest.raises(sy.SonicYangException):
+            syc.patchData({'PORT': {'Ethernet0': None}})
+        assert syc.root is None
+        with pytest.raises(sy.SonicYangException):
+            syc.patchData({'PORT': {'Ethernet0': None}})
+
+        return
+
+    def patch_result(self, syc, jIn, patch, incremental=False):
+        syc.loadData(copy.deepcopy(jIn))
+        try:
+            syc.patchData(copy.deepcopy(patch), incremental=incremental)
+        except sy.SonicYangException as e:
+            return str(e)
+        return syc.getData()
+
+    def test_patch_data_incremental(self, sonic_yang_data):
+        # with incremental, a patch of a table without must, when or cross
+        # entry constraints is validated on the patched entries, with the same
+        # result as validating the whole data tree
+        test_file = sonic_yang_data['test_file']
+        syc = sonic_yang_data['syc']
+
+        jIn = json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON'))
+        fullValidationTables = syc._getFullValidationTables()
+        assert 'PORT' in fullValidationTables
+        assert 'DEVICE_NEIGHBOR' not in fullValidationTables
+
+        neighbor = dict(jIn['DEVICE_NEIGHBOR']['Ethernet112'])
+        valid = {'DEVICE_NEIGHBOR': {'Ethernet112': dict(neighbor, local_port='Ethernet112')}}
+        # local_port is a leafref to a port which does not exist
+        invalid = {'DEVICE_NEIGHBOR': {'Ethernet112': dict(neighbor, local_port='Ethernet999')}}
+        for patch, isValid in ((valid, True), (invalid, False)):
+            with mock.patch.object(syc, '_validateEntries') as validateEntries:
+                expected = self.patch_result(syc, jIn, patch)
+            # the whole data tree is validated by default
+            validateEntries.assert_not_called()
+            assert isinstance(expected, dict) == isValid
+
+            with mock.patch.object(syc, '_validateEntries', \
+                    wraps=syc._validateEntries) as validateEntries, \
+                mock.patch.object(syc, 'validate_data_tree', \
+                    wraps=syc.validate_data_tree) as validateDataTree:
+                assert self.patch_result(syc, jIn, patch, incremental=True) == expected
+            validateEntries.assert_called_once()
+            # the whole data tree is validated only when the patched entries fail
+            assert validateDataTree.call_count == (0 if isValid else 1)
+
+        return
+
+    def test_patch_data_partial_pass_full_fail(self, sonic_yang_data):
+        # incremental patches the patched entries alone would pass, but the
+        # whole data tree does not, fail as loading the patched config does
+        test_file = sonic_yang_data['test_file']
+        syc = sonic_yang_data['syc']
+
+        jIn = json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON'))
+        fullValidationTables = syc._getFullValidationTables()
+        # the asn of BGP_INTERNAL_NEIGHBOR must be the bgp_asn of
+        # DEVICE_METADATA, in a refine of the uses of the neighbor grouping
+        assert 'BGP_INTERNAL_NEIGHBOR' in fullValidationTables
+        assert 'DEVICE_METADATA' in fullValidationTables
+        assert 'VLAN' not in fullValidationTables
+        assert 'VLAN_MEMBER' not in fullValidationTables
+
+        metadata = dict(jIn['DEVICE_METADATA']['localhost'], bgp_asn='65100')
+        asnPatch = {'DEVICE_METADATA': {'localhost': metadata}}
+        # Vlan111 is the target of the leafrefs of VLAN_MEMBER
+        vlanPatch = {'VLAN': {'Vlan111': None}}
+        for patch in (asnPatch, vlanPatch):
+            jPatched = copy.deepcopy(jIn)
+            for table, entries in patch.items():
+                for key, entry in entries.items():
+                    if entry is None:
+                        del jPatched[table][key]
+                    else:
+                        jPatched[table][key] = entry
+            with pytest.raises(sy.SonicYangException):
+                syc.loadData(copy.deepcopy(jPatched))
+
+            syc.loadData(copy.deepcopy(jIn))
+            with pytest.raises(sy.SonicYangException):
+                syc.patchData(copy.deepcopy(patch), incremental=True)
+            assert syc.root is None
+
+        return
+
+    def test_full_validation_tables_schema(self, tmp_path):
+        # constraints are read from the compiled schema, where groupings,
+        # nested uses and refines are resolved
+        yang = """
+module sonic-test {
+    namespace "http://github.com/sonic-net/sonic-test";
+    prefix tst;
+
+    grouping neighbor {
+        leaf asn { type uint32; }
+    }
+    grouping inner {
+        leaf b { type string; must "../a != ''"; }
+    }
+    grouping outer {
+        leaf a { type string; }
+        uses inner;
+    }
+
+    container sonic-test {
+        container TEST_TABLE {
+            list TEST_TABLE_LIST {
+                key "name";
+                leaf name { type string; }
+                uses neighbor {
+                    refine asn {
+                        must "current() = /tst:sonic-test/tst:OTHER_TABLE/tst:asn";
+                    }
+                }
+            }
+        }
+        container OTHER_TABLE {
+            leaf asn { type uint32; }
+        }
+        container NESTED_TABLE {
+            list NESTED_TABLE_LIST {
+                key "name";
+                leaf name { type string; }
+                uses outer;
+            }
+        }
+        container UNIQUE_TABLE {
+            list UNIQUE_TABLE_LIST {
+                key "name";
+                unique "asn";
+                leaf name { type string; }
+                uses neighbor;
+            }
+        }
+        container PLAIN_TABLE {
+            list PLAIN_TABLE_LIST {
+                key "name";
+                leaf name { type string; }
+                uses neighbor;
+            }
+        }
+    }
+}
+"""
+        (tmp_path / 'sonic-test.yang').write_text(yang)
+        syc = sy.SonicYang(str(tmp_path) + '/')
+        syc.loadYangModel()
+        assert syc._getFullValidationTables() == \
+            {'TEST_TABLE', 'OTHER_TABLE', 'NESTED_TABLE', 'UNIQUE_TABLE'}
+
+        return
+
     def teardown_class(self):
         pass